@@ -0,0 +1,110 @@
+"""
+Classifier Features Benchmark - Sparse CSR feature assembly vs. the previous densified TF-IDF matrix
+
+Before assemble_features, training and inference both called toarray() on the
+TF-IDF block and np.hstack-ed it with the numerical columns, so every row cost
+the full vocabulary in float64 however few terms it had. This fits vectorizers
+of increasing vocabulary size on a synthetic corpus and reports, for the dense
+and the sparse path, the training matrix size, the peak memory and time to
+assemble it, and milliseconds per single-message prediction. Dense assembly is
+skipped (its size still reported) past --dense-limit-mb.
+
+Usage:
+    python benchmarks/bench_classifier_features.py --vocab-sizes 10000 100000 --rows 5000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import StandardScaler
+from src.ml.models.mental_health_classifier import assemble_features
+
+COMMON_WORDS = 10
+RARE_WORDS = 30
+
+def synthetic_corpus(rows: int, vocab_size: int, seed: int = 7):
+    """Messages of Zipf-distributed common words plus uniformly drawn rare ones, with 6 numerical columns and 9 labels"""
+    rng = np.random.default_rng(seed)
+    weights = 1.0 / np.arange(1, vocab_size + 1)
+    common = rng.choice(vocab_size, size=(rows, COMMON_WORDS), p=weights / weights.sum())
+    rare = rng.integers(0, vocab_size, size=(rows, RARE_WORDS))
+    texts = [' '.join(f"w{word}" for word in message) for message in np.hstack([common, rare])]
+    numerical = rng.normal(5, 2, size=(rows, 6))
+    labels = rng.integers(0, 9, size=rows)
+    return texts, numerical, labels
+
+def dense_features(text_matrix, numerical):
+    """The previous assembly"""
+    return np.hstack([text_matrix.toarray(), numerical])
+
+def csr_bytes(matrix) -> int:
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+def measure_assembly(func, *args):
+    """(result, peak MB, seconds) of one call"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak / 2 ** 20, elapsed
+
+def time_per_request(func, repeat: int) -> float:
+    """Mean milliseconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sparse classifier feature assembly')
+    parser.add_argument('--vocab-sizes', type=int, nargs='+', default=[10000, 100000], help='TF-IDF max_features')
+    parser.add_argument('--rows', type=int, default=5000, help='training messages')
+    parser.add_argument('--dense-limit-mb', type=float, default=1024, help='skip dense assembly above this size')
+    parser.add_argument('--repeat', type=int, default=200, help='predictions per measurement')
+    args = parser.parse_args()
+
+    print(f"{'vocab':>8}{'features':>10}{'path':>8}{'matrix MB':>12}{'peak MB':>10}{'assemble s':>12}{'predict ms':>12}")
+    for vocab_size in args.vocab_sizes:
+        texts, numerical, labels = synthetic_corpus(args.rows, vocab_size)
+        vectorizer = TfidfVectorizer(max_features=vocab_size)
+        text_matrix = vectorizer.fit_transform(texts)
+        features = text_matrix.shape[1] + numerical.shape[1]
+        scaler = StandardScaler()
+        numerical_scaled = scaler.fit_transform(numerical)
+
+        sparse_matrix, sparse_peak, sparse_seconds = measure_assembly(assemble_features, text_matrix, numerical_scaled)
+        model = RandomForestClassifier(n_estimators=50, random_state=42, n_jobs=1).fit(sparse_matrix, labels)
+        message, message_numerical = texts[0], numerical[:1]
+
+        def predict_dense():
+            row = dense_features(vectorizer.transform([message]), scaler.transform(message_numerical))
+            return model.predict_proba(row)
+
+        def predict_sparse():
+            row = assemble_features(vectorizer.transform([message]), scaler.transform(message_numerical))
+            return model.predict_proba(row)
+
+        dense_mb = args.rows * features * 8 / 2 ** 20
+        if dense_mb <= args.dense_limit_mb:
+            dense_matrix, dense_peak, dense_seconds = measure_assembly(dense_features, text_matrix, numerical_scaled)
+            del dense_matrix
+            dense = f"{dense_mb:>12.1f}{dense_peak:>10.1f}{dense_seconds:>12.3f}"
+        else:
+            dense = f"{dense_mb:>12.1f}{'skipped':>10}{'skipped':>12}"
+        print(f"{vocab_size:>8}{features:>10}{'dense':>8}{dense}{time_per_request(predict_dense, args.repeat):>12.3f}")
+        print(f"{vocab_size:>8}{features:>10}{'sparse':>8}{csr_bytes(sparse_matrix) / 2 ** 20:>12.1f}"
+              f"{sparse_peak:>10.1f}{sparse_seconds:>12.3f}{time_per_request(predict_sparse, args.repeat):>12.3f}")
+
+if __name__ == '__main__':
+    main()
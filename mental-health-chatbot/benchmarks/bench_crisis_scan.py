@@ -0,0 +1,92 @@
+"""
+Crisis Scan Benchmark - Single-pass scanner vs. the previous per-component keyword scans
+
+Before the shared scanner, every message was checked for crisis language four
+times: substring lists in the GPT handler, sentiment analyzer and recommendation
+engine, plus the crisis regexes in the intent detector. This replays that work
+against one scan_for_crisis call and reports microseconds per message, with the
+scanner's memoization both cold and warm.
+
+Usage:
+    python benchmarks/bench_crisis_scan.py --repeat 2000
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.nlp.crisis_detection import scan_for_crisis, _scan
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data', 'crisis_corpus.json')
+
+GPT_KEYWORDS = [
+    'suicide', 'kill myself', 'end it all', 'not worth living',
+    'hurt myself', 'self harm', 'cut myself', 'overdose',
+    'jump off', 'hang myself', 'die', 'death', 'dead'
+]
+SENTIMENT_PHRASES = [
+    'kill myself', 'end it all', 'not worth living', 'better off dead',
+    'hurt myself', 'suicide', 'overdose', 'jump off', 'hang myself',
+    'want to die', 'don\'t want to live', 'no point', 'hopeless',
+    'can\'t go on', 'give up', 'end my life', 'take my life'
+]
+ENGINE_KEYWORDS = ['suicide', 'kill myself', 'end it all', 'not worth living']
+INTENT_PATTERNS = [
+    r'\b(kill myself|suicide|end it all|not worth living)\b',
+    r'\b(hurt myself|self harm|cut myself|overdose)\b',
+    r'\b(jump off|hang myself|die|death|dead)\b',
+    r'\b(better off dead|want to die|end my life)\b'
+]
+
+def legacy_scan(text: str) -> bool:
+    """The four independent scans each message used to go through"""
+    text_lower = text.lower()
+    gpt = [keyword for keyword in GPT_KEYWORDS if keyword in text_lower]
+    sentiment = sum(1 for phrase in SENTIMENT_PHRASES if phrase in text_lower)
+    engine = any(keyword in text_lower for keyword in ENGINE_KEYWORDS)
+    intent = sum(1 for pattern in INTENT_PATTERNS if re.search(pattern, text_lower))
+    return bool(gpt or sentiment or engine or intent)
+
+def time_per_message(func, messages, repeat: int) -> float:
+    """Mean microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            func(message)
+    return (time.perf_counter() - start) / (repeat * len(messages)) * 1e6
+
+def cold_scan(text: str):
+    _scan.cache_clear()
+    return scan_for_crisis(text)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the single-pass crisis scanner')
+    parser.add_argument('--repeat', type=int, default=1000, help='passes over the corpus')
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        corpus = json.load(f)
+    messages = corpus['crisis'] + corpus['non_crisis']
+
+    results = {
+        'legacy (4 scans)': time_per_message(legacy_scan, messages, args.repeat),
+        'single pass (cold)': time_per_message(cold_scan, messages, args.repeat),
+        'single pass (memoized)': time_per_message(scan_for_crisis, messages, args.repeat)
+    }
+
+    print(f"{len(messages)} messages x {args.repeat} passes")
+    for name, micros in results.items():
+        print(f"{name:<26}{micros:>8.2f} us/message")
+
+    for label, texts, expected in (('recall', corpus['crisis'], True), ('specificity', corpus['non_crisis'], False)):
+        legacy = sum(1 for text in texts if legacy_scan(text) == expected) / len(texts)
+        current = sum(1 for text in texts if scan_for_crisis(text).is_crisis == expected) / len(texts)
+        print(f"{label:<26}legacy {legacy:.2f}  single pass {current:.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Recommendation Scoring Benchmark - Vectorized catalog scoring vs. the previous per-item Python loop
+
+Before the feature matrix, every candidate was scored by a Python function doing
+string containment checks on its content, and the list was sorted twice. This
+builds synthetic catalogs of increasing size from the shipped catalog (same
+conditions, random tags) and reports milliseconds per request for the legacy
+loop and for RecommendationEngine._rank_candidates.
+
+Usage:
+    python benchmarks/bench_recommendation_scoring.py --sizes 1000 10000 50000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.ml.models.recommendation_catalog import RecommendationCatalog, load_catalog
+from src.ml.models.recommendation_engine import RecommendationEngine
+
+PROFILE = {
+    'mental_health_status': 'anxiety',
+    'mood_score': 3,
+    'stress_level': 8,
+    'preferences': {'likes_exercise': True, 'likes_social': True}
+}
+CONTEXT = {'current_mood': 'negative', 'time_of_day': 'evening', 'available_time': 30}
+
+def synthetic_catalog(size: int, seed: int = 7) -> RecommendationCatalog:
+    """Catalog of ``size`` chat items cloned from the shipped ones with shuffled tags"""
+    rng = random.Random(seed)
+    base = load_catalog()
+    chat_items = [item for item in base.items if 'chat' in item.when['context']]
+    tags = sorted({tag for item in base.items for tag in item.tags})
+    items = []
+    for item_id in range(size):
+        template = chat_items[item_id % len(chat_items)]
+        items.append(template._replace(
+            id=item_id,
+            key=f"{template.key}_{item_id}",
+            tags=frozenset(rng.sample(tags, 2)),
+            priority=rng.randint(1, 3)
+        ))
+    return RecommendationCatalog(items, base.types)
+
+def legacy_rank(recommendations, user_profile, current_context):
+    """The previous _prioritize_recommendations with _calculate_personalization_score"""
+    preferences = user_profile.get('preferences', {})
+    current_mood = current_context.get('current_mood', 'neutral')
+    mental_health_status = user_profile.get('mental_health_status', 'healthy')
+    recommendations.sort(key=lambda x: x.get('priority', 3))
+    for rec in recommendations:
+        score = 0.5
+        rec_type = rec.get('type', '')
+        if rec_type == 'physical_activity' and preferences.get('likes_exercise', False):
+            score += 0.3
+        if rec_type == 'meditation' and preferences.get('likes_meditation', False):
+            score += 0.3
+        if rec_type == 'social_connection' and preferences.get('likes_social', False):
+            score += 0.3
+        if 'mood' in rec_type and current_mood in rec.get('content', '').lower():
+            score += 0.2
+        if mental_health_status in rec.get('content', '').lower():
+            score += 0.2
+        rec['personalization_score'] = min(score, 1.0)
+    recommendations.sort(key=lambda x: (x.get('priority', 3), -x.get('personalization_score', 0)))
+    return recommendations[:5]
+
+def time_per_request(func, repeat: int) -> float:
+    """Mean milliseconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark vectorized recommendation scoring')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000], help='catalog sizes')
+    parser.add_argument('--repeat', type=int, default=50, help='requests per measurement')
+    args = parser.parse_args()
+
+    print(f"{'items':>8}{'candidates':>12}{'legacy ms':>12}{'vectorized ms':>16}")
+    for size in args.sizes:
+        engine = RecommendationEngine()
+        engine.catalog = synthetic_catalog(size)
+        candidate_ids = frozenset(range(size))
+        rendered = engine.catalog.render(candidate_ids, PROFILE)
+
+        legacy = time_per_request(lambda: legacy_rank([dict(rec) for rec in rendered], PROFILE, CONTEXT), args.repeat)
+        vectorized = time_per_request(lambda: engine._rank_candidates(candidate_ids, PROFILE, CONTEXT, 5), args.repeat)
+        print(f"{size:>8}{len(candidate_ids):>12}{legacy:>12.3f}{vectorized:>16.3f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""
+Chat Load Test - Drives the chat API with concurrent virtual users
+
+Each virtual user starts an anonymous session and sends a series of messages,
+waiting for every reply. The report covers throughput, latency percentiles per
+endpoint, error rates and the per-stage timings returned by the message endpoint.
+
+Usage:
+    python benchmarks/mock_openai_server.py &
+    OPENAI_API_KEY=sk-mock OPENAI_BASE_URL=http://localhost:8100/v1 gunicorn -w 4 -b :5000 "src.web.app:create_app()"
+    python benchmarks/chat_load_test.py --base-url http://localhost:5000 --users 20 --messages 5
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any
+
+import requests
+
+MESSAGES = [
+    "Hi there",
+    "I feel anxious about work lately",
+    "I can't sleep at night",
+    "I've been feeling really down this week",
+    "My exams are stressing me out",
+    "Can you recommend something to help me relax?",
+    "I had an argument with my partner and feel awful",
+    "Thanks, that helps a bit",
+    "I feel lonely since I moved to a new city",
+    "How can I stop overthinking everything?"
+]
+
+class Results:
+    """Thread-safe collection of request samples"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples: List[Dict[str, Any]] = []
+
+    def add(self, endpoint: str, latency: float, status: int, timings: Dict[str, float] = None):
+        with self.lock:
+            self.samples.append({'endpoint': endpoint, 'latency': latency, 'status': status, 'timings': timings or {}})
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """Mean and percentiles in milliseconds"""
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean_ms': round(sum(values) / len(values), 1),
+        'p50_ms': round(percentile(values, 50), 1),
+        'p90_ms': round(percentile(values, 90), 1),
+        'p95_ms': round(percentile(values, 95), 1),
+        'p99_ms': round(percentile(values, 99), 1),
+        'max_ms': round(max(values), 1)
+    }
+
+
+def timed_post(session: requests.Session, url: str, payload: Dict[str, Any], timeout: float):
+    """POST JSON and return (response or None, latency in ms)"""
+    start = time.perf_counter()
+    try:
+        response = session.post(url, json=payload, timeout=timeout)
+    except requests.RequestException:
+        response = None
+    return response, (time.perf_counter() - start) * 1000
+
+
+def virtual_user(user_index: int, args, results: Results, stop_at: float):
+    """Run one virtual user's conversation"""
+    session = requests.Session()
+    rng = random.Random(user_index)
+
+    response, latency = timed_post(session, f"{args.base_url}/chat/api/session/start", {'anonymous': True}, args.timeout)
+    status = response.status_code if response is not None else 0
+    results.add('session_start', latency, status)
+    if status != 200:
+        return
+
+    session_id = response.json()['session_id']
+    url = f"{args.base_url}/chat/api/session/{session_id}/message"
+
+    for _ in range(args.messages):
+        if time.time() >= stop_at:
+            break
+
+        response, latency = timed_post(session, url, {'message': rng.choice(MESSAGES)}, args.timeout)
+        status = response.status_code if response is not None else 0
+        timings = {}
+        if status == 200:
+            try:
+                timings = response.json().get('timings', {})
+            except ValueError:
+                pass
+        results.add('message', latency, status, timings)
+
+        if args.think_time:
+            time.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+def build_report(results: Results, elapsed: float, args) -> Dict[str, Any]:
+    """Aggregate samples into a report"""
+    samples = results.samples
+    report = {
+        'users': args.users,
+        'messages_per_user': args.messages,
+        'elapsed_seconds': round(elapsed, 2),
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'error_rate': round(sum(1 for s in samples if s['status'] != 200) / len(samples), 4) if samples else 0.0,
+        'status_codes': {},
+        'endpoints': {},
+        'stages': {}
+    }
+
+    for sample in samples:
+        key = str(sample['status'] or 'connection_error')
+        report['status_codes'][key] = report['status_codes'].get(key, 0) + 1
+
+    for endpoint in ('session_start', 'message'):
+        latencies = [s['latency'] for s in samples if s['endpoint'] == endpoint and s['status'] == 200]
+        report['endpoints'][endpoint] = summarize(latencies)
+
+    stage_values: Dict[str, List[float]] = {}
+    for sample in samples:
+        for stage, value in sample['timings'].items():
+            stage_values.setdefault(stage, []).append(value)
+    report['stages'] = {stage: summarize(values) for stage, values in sorted(stage_values.items())}
+
+    return report
+
+
+def print_report(report: Dict[str, Any]):
+    """Print a human-readable report"""
+    print(f"\nUsers: {report['users']}  Requests: {report['requests']}  Elapsed: {report['elapsed_seconds']}s")
+    print(f"Throughput: {report['throughput_rps']} req/s  Error rate: {report['error_rate'] * 100:.2f}%")
+    print(f"Status codes: {report['status_codes']}")
+
+    header = f"{'':<20}{'count':>8}{'mean':>10}{'p50':>10}{'p90':>10}{'p95':>10}{'p99':>10}{'max':>10}"
+    for title, rows in (('Endpoint latency (ms)', report['endpoints']), ('Server stages (ms)', report['stages'])):
+        print(f"\n{title}")
+        print(header)
+        for name, stats in rows.items():
+            if not stats.get('count'):
+                continue
+            print(f"{name:<20}{stats['count']:>8}{stats['mean_ms']:>10}{stats['p50_ms']:>10}{stats['p90_ms']:>10}"
+                  f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['max_ms']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent load test for the chat API')
+    parser.add_argument('--base-url', default='http://localhost:5000')
+    parser.add_argument('--users', type=int, default=10, help='concurrent virtual users')
+    parser.add_argument('--messages', type=int, default=5, help='messages per user')
+    parser.add_argument('--think-time', type=float, default=0.0, help='mean seconds between messages')
+    parser.add_argument('--ramp-up', type=float, default=0.0, help='seconds over which users start')
+    parser.add_argument('--duration', type=float, default=0.0, help='stop sending after this many seconds (0 = no limit)')
+    parser.add_argument('--timeout', type=float, default=60.0, help='per-request timeout')
+    parser.add_argument('--json-out', help='write the report as JSON to this file')
+    args = parser.parse_args()
+
+    results = Results()
+    started = time.time()
+    stop_at = started + args.duration if args.duration else float('inf')
+
+    with ThreadPoolExecutor(max_workers=args.users) as executor:
+        for i in range(args.users):
+            executor.submit(virtual_user, i, args, results, stop_at)
+            if args.ramp_up:
+                time.sleep(args.ramp_up / args.users)
+
+    report = build_report(results, time.time() - started, args)
+    print_report(report)
+
+    if args.json_out:
+        with open(args.json_out, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+"""
+Mock OpenAI/Pinecone Server - Local stand-in for load testing without network access
+
+Speaks enough of the OpenAI chat-completions (including streaming) and embeddings
+wire formats, and of the Pinecone data-plane upsert/query API, for the app's
+clients to work unchanged. Latency is drawn from a log-normal distribution per
+endpoint and a configurable share of calls fail with 500 or 429.
+
+Usage:
+    python benchmarks/mock_openai_server.py --port 8100 --chat-latency-ms 800 --error-rate 0.01
+
+    export OPENAI_API_KEY=sk-mock OPENAI_BASE_URL=http://localhost:8100/v1
+    export PINECONE_API_KEY=mock PINECONE_HOST=http://localhost:8100
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any
+
+import numpy as np
+
+EMBEDDING_DIMENSION = 1536
+
+CANNED_REPLIES = [
+    "Thank you for sharing that with me. It sounds like you're carrying a lot right now. What feels most pressing for you today?",
+    "That sounds really difficult, and it makes sense that you feel this way. Would it help to talk through what happened?",
+    "I'm glad you reached out. Sometimes a few slow, deep breaths can help us feel a little more grounded. Would you like to try one together?",
+    "It's completely understandable to feel overwhelmed. What has helped you cope with similar feelings in the past?"
+]
+
+RECOMMENDATIONS_REPLY = """1. Box Breathing
+Type: exercise
+Description: Breathe in for four counts, hold for four, out for four and hold for four.
+Instructions: Repeat the cycle for five minutes in a quiet place.
+Priority: 4
+Duration: 5 minutes
+
+2. Evening Walk
+Type: activity
+Description: A short walk outdoors helps release tension.
+Instructions: Walk at a comfortable pace without your phone.
+Priority: 3
+Duration: 20 minutes"""
+
+class MockState:
+    """Server configuration, Pinecone vectors and request counters"""
+
+    def __init__(self, args):
+        self.args = args
+        self.vectors: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.lock = threading.Lock()
+        self.counters: Dict[str, int] = {}
+
+    def latency(self, median_ms: float) -> float:
+        """Sample a log-normal latency in seconds"""
+        if median_ms <= 0:
+            return 0.0
+        return random.lognormvariate(math.log(median_ms / 1000.0), self.args.latency_sigma)
+
+    def count(self, name: str):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+
+def embed(text: str) -> List[float]:
+    """Deterministic unit vector for a text"""
+    rng = np.random.default_rng(zlib.crc32(text.encode('utf-8')))
+    vector = rng.standard_normal(EMBEDDING_DIMENSION)
+    return (vector / np.linalg.norm(vector)).round(6).tolist()
+
+
+def matches_filter(metadata: Dict[str, Any], filter_dict: Dict[str, Any]) -> bool:
+    """Equality-only subset of the Pinecone metadata filter language"""
+    for key, condition in (filter_dict or {}).items():
+        expected = condition.get('$eq') if isinstance(condition, dict) else condition
+        if metadata.get(key) != expected:
+            return False
+    return True
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Routes OpenAI and Pinecone requests"""
+
+    protocol_version = 'HTTP/1.1'
+    state: MockState = None
+
+    def log_message(self, format, *args):
+        if self.state.args.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        if self.path == '/stats':
+            with self.state.lock:
+                self._send_json(200, dict(self.state.counters))
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'{}')
+
+        routes = {
+            '/v1/chat/completions': (self._chat_completions, self.state.args.chat_latency_ms),
+            '/v1/embeddings': (self._embeddings, self.state.args.embedding_latency_ms),
+            '/vectors/upsert': (self._pinecone_upsert, self.state.args.pinecone_latency_ms),
+            '/query': (self._pinecone_query, self.state.args.pinecone_latency_ms),
+            '/describe_index_stats': (self._pinecone_stats, self.state.args.pinecone_latency_ms)
+        }
+        route = routes.get(self.path.split('?')[0])
+        if not route:
+            self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+            return
+
+        handler, median_ms = route
+        self.state.count(self.path)
+
+        roll = random.random()
+        if roll < self.state.args.rate_limit_rate:
+            self.state.count('429')
+            time.sleep(self.state.latency(median_ms) * 0.1)
+            self._send_json(429, {'error': {'message': 'Rate limit reached (mock)', 'type': 'requests', 'code': 'rate_limit_exceeded'}},
+                            {'Retry-After': '1'})
+            return
+        if roll < self.state.args.rate_limit_rate + self.state.args.error_rate:
+            self.state.count('500')
+            time.sleep(self.state.latency(median_ms))
+            self._send_json(500, {'error': {'message': 'Internal server error (mock)', 'type': 'server_error'}})
+            return
+
+        handler(body, median_ms)
+
+    def _chat_completions(self, body: Dict[str, Any], median_ms: float):
+        prompt = str((body.get('messages') or [{}])[-1].get('content', ''))
+        reply = RECOMMENDATIONS_REPLY if 'recommendations' in prompt else random.choice(CANNED_REPLIES)
+        prompt_tokens = sum(len(str(m.get('content', ''))) for m in body.get('messages', [])) // 4
+        completion_tokens = len(reply) // 4
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        model = body.get('model', 'gpt-4')
+
+        if body.get('stream'):
+            self._stream_chat(completion_id, model, reply, median_ms)
+            return
+
+        time.sleep(self.state.latency(median_ms))
+        self._send_json(200, {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': reply},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        })
+
+    def _stream_chat(self, completion_id: str, model: str, reply: str, median_ms: float):
+        """Send the reply as SSE chunks; the sampled latency is split into time to first token and generation"""
+        total = self.state.latency(median_ms)
+        words = reply.split(' ')
+        time.sleep(total * 0.3)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        for i, word in enumerate(words):
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': {'content': word if i == 0 else ' ' + word}, 'finish_reason': None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            time.sleep(total * 0.7 / len(words))
+
+        final = {
+            'id': completion_id,
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]
+        }
+        self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+    def _embeddings(self, body: Dict[str, Any], median_ms: float):
+        inputs = body.get('input', '')
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        time.sleep(self.state.latency(median_ms))
+        tokens = sum(len(str(text)) for text in inputs) // 4
+        self._send_json(200, {
+            'object': 'list',
+            'data': [{'object': 'embedding', 'index': i, 'embedding': embed(str(text))} for i, text in enumerate(inputs)],
+            'model': body.get('model', 'text-embedding-ada-002'),
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}
+        })
+
+    def _pinecone_upsert(self, body: Dict[str, Any], median_ms: float):
+        namespace = body.get('namespace', '')
+        vectors = body.get('vectors', [])
+        with self.state.lock:
+            store = self.state.vectors.setdefault(namespace, {})
+            for vector in vectors:
+                store[vector['id']] = vector
+
+        time.sleep(self.state.latency(median_ms))
+        self._send_json(200, {'upsertedCount': len(vectors)})
+
+    def _pinecone_query(self, body: Dict[str, Any], median_ms: float):
+        namespace = body.get('namespace', '')
+        top_k = int(body.get('topK', 10))
+        query = np.asarray(body.get('vector') or [], dtype=np.float32)
+
+        with self.state.lock:
+            candidates = [v for v in self.state.vectors.get(namespace, {}).values()
+                          if matches_filter(v.get('metadata', {}), body.get('filter'))]
+
+        matches = []
+        if candidates and query.size:
+            matrix = np.asarray([v['values'] for v in candidates], dtype=np.float32)
+            scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-9)
+            for index in np.argsort(-scores)[:top_k]:
+                match = {'id': candidates[index]['id'], 'score': float(scores[index]), 'values': []}
+                if body.get('includeMetadata'):
+                    match['metadata'] = candidates[index].get('metadata', {})
+                matches.append(match)
+
+        time.sleep(self.state.latency(median_ms))
+        self._send_json(200, {'matches': matches, 'namespace': namespace})
+
+    def _pinecone_stats(self, body: Dict[str, Any], median_ms: float):
+        with self.state.lock:
+            namespaces = {name: {'vectorCount': len(vectors)} for name, vectors in self.state.vectors.items()}
+        self._send_json(200, {
+            'namespaces': namespaces,
+            'dimension': EMBEDDING_DIMENSION,
+            'indexFullness': 0.0,
+            'totalVectorCount': sum(ns['vectorCount'] for ns in namespaces.values())
+        })
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local mock OpenAI and Pinecone server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--chat-latency-ms', type=float, default=800, help='median chat completion latency')
+    parser.add_argument('--embedding-latency-ms', type=float, default=60, help='median embedding latency')
+    parser.add_argument('--pinecone-latency-ms', type=float, default=30, help='median Pinecone upsert/query latency')
+    parser.add_argument('--latency-sigma', type=float, default=0.4, help='log-normal sigma (tail heaviness)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of calls failing with 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='share of calls failing with 429')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    MockHandler.state = MockState(args)
+    server = ThreadingHTTPServer((args.host, args.port), MockHandler)
+    server.daemon_threads = True
+    print(f"Mock OpenAI/Pinecone server listening on http://{args.host}:{args.port}")
+    print(f"  OPENAI_BASE_URL=http://{args.host}:{args.port}/v1  PINECONE_HOST=http://{args.host}:{args.port}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
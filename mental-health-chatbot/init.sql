@@ -10,6 +10,11 @@ CREATE DATABASE IF NOT EXISTS mental_health_chatbot;
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 CREATE EXTENSION IF NOT EXISTS "pg_trgm";
 
+-- Upgrade tables created before these columns existed (db.create_all only creates missing tables)
+ALTER TABLE IF EXISTS recommendations ADD COLUMN IF NOT EXISTS cadence VARCHAR(10);
+ALTER TABLE IF EXISTS recommendations ADD COLUMN IF NOT EXISTS catalog_key VARCHAR(100);
+ALTER TABLE IF EXISTS recommendations ADD COLUMN IF NOT EXISTS valid_for DATE;
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_users_username ON users(username);
@@ -35,6 +40,8 @@ CREATE INDEX IF NOT EXISTS idx_notifications_unread ON notifications(id) WHERE i
 CREATE INDEX IF NOT EXISTS idx_mood_entries_user_date ON mood_entries(user_id, created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_messages_session_time ON messages(session_id, created_at);
 CREATE INDEX IF NOT EXISTS idx_assessments_user_type ON assessments(user_id, assessment_type);
+CREATE INDEX IF NOT EXISTS idx_token_usage_model_time ON token_usage(model, created_at);
+CREATE INDEX IF NOT EXISTS idx_recommendations_user_cadence ON recommendations(user_id, cadence, valid_for);
 
 -- Grant permissions (adjust as needed for your setup)
 GRANT ALL PRIVILEGES ON DATABASE mental_health_chatbot TO postgres;
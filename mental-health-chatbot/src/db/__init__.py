@@ -5,4 +5,4 @@ Database Module - Handles all database operations
 from .database import db
 from .models import *
 
-__all__ = ['db', 'User', 'ChatSession', 'Message', 'MoodEntry', 'Assessment', 'Recommendation', 'Notification']
\ No newline at end of file
+__all__ = ['db', 'User', 'ChatSession', 'Message', 'MoodEntry', 'Assessment', 'Recommendation', 'Notification', 'TokenUsage']
\ No newline at end of file
@@ -197,14 +197,38 @@ class Recommendation(db.Model):
     is_completed = db.Column(db.Boolean, default=False)
     completed_at = db.Column(db.DateTime, nullable=True)
     feedback = db.Column(db.Text, nullable=True)
+    cadence = db.Column(db.String(10), nullable=True)  # 'daily' or 'weekly' when precomputed, else None
+    catalog_key = db.Column(db.String(100), nullable=True)  # Recommendation catalog item the row was rendered from
+    valid_for = db.Column(db.Date, nullable=True)  # Day (daily) or week start (weekly) a precomputed row applies to
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     
+    __table_args__ = (
+        db.Index('idx_recommendations_user_cadence', 'user_id', 'cadence', 'valid_for'),
+    )
+    
     def mark_completed(self, feedback=None):
         """Mark recommendation as completed"""
         self.is_completed = True
         self.completed_at = datetime.now(timezone.utc)
         if feedback:
             self.feedback = feedback
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'id': self.id,
+            'type': self.recommendation_type,
+            'title': self.title,
+            'description': self.description,
+            'content': self.content,
+            'priority': self.priority,
+            'is_completed': self.is_completed,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'cadence': self.cadence,
+            'catalog_key': self.catalog_key,
+            'valid_for': self.valid_for.isoformat() if self.valid_for else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
 
 class Notification(db.Model):
     """User notifications and reminders"""
@@ -260,4 +284,44 @@ class UserAchievement(db.Model):
     
     def set_metadata(self, metadata_dict):
         """Set achievement metadata from dictionary"""
-        self.achievement_metadata = json.dumps(metadata_dict)
\ No newline at end of file
+        self.achievement_metadata = json.dumps(metadata_dict)
+
+class TokenUsage(db.Model):
+    """Append-only ledger of LLM calls for spend and capacity planning"""
+    __tablename__ = 'token_usage'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # Nullable for anonymous sessions
+    session_id = db.Column(db.String(100), nullable=True)
+    model = db.Column(db.String(50), nullable=False)
+    route = db.Column(db.String(20), nullable=True)  # Model route: 'crisis', 'clinical', 'supportive', 'light', 'recommendations'
+    conversation_type = db.Column(db.String(50), nullable=False)
+    prompt_tokens = db.Column(db.Integer, default=0)
+    completion_tokens = db.Column(db.Integer, default=0)
+    total_tokens = db.Column(db.Integer, default=0)
+    latency_ms = db.Column(db.Float, default=0.0)
+    attempts = db.Column(db.Integer, default=1)
+    streamed = db.Column(db.Boolean, default=False)
+    estimated = db.Column(db.Boolean, default=False)  # Token counts estimated rather than reported by the API
+    cost_usd = db.Column(db.Float, default=0.0)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), index=True)
+    
+    def to_dict(self):
+        """Convert to dictionary"""
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'session_id': self.session_id,
+            'model': self.model,
+            'route': self.route,
+            'conversation_type': self.conversation_type,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'total_tokens': self.total_tokens,
+            'latency_ms': self.latency_ms,
+            'attempts': self.attempts,
+            'streamed': self.streamed,
+            'estimated': self.estimated,
+            'cost_usd': self.cost_usd,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
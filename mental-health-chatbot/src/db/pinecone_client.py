@@ -6,8 +6,9 @@ import os
 import json
 from typing import List, Dict, Any, Optional
 from pinecone import Pinecone, ServerlessSpec
-import openai
-from openai import OpenAI
+from src.nlp.openai_client import get_openai_client
+from src.nlp.rate_limiter import get_rate_limiter
+from src.nlp.resilience import Deadline
 
 class PineconeClient:
     """Pinecone client for vector database operations"""
@@ -17,6 +18,8 @@ class PineconeClient:
         self.api_key = os.environ.get('PINECONE_API_KEY')
         self.environment = os.environ.get('PINECONE_ENVIRONMENT', 'us-east-1')
         self.index_name = os.environ.get('PINECONE_INDEX_NAME', 'mental-health-embeddings')
+        self.embedding_timeout = float(os.environ.get('OPENAI_EMBEDDING_TIMEOUT', '10'))
+        self.min_budget = float(os.environ.get('PINECONE_MIN_BUDGET', '0.5'))
         
         if not self.api_key:
             print("Warning: PINECONE_API_KEY not found. Pinecone features will be disabled.")
@@ -28,11 +31,12 @@ class PineconeClient:
         # Initialize Pinecone
         self.pc = Pinecone(api_key=self.api_key)
         
-        # Initialize OpenAI client for embeddings
-        self.openai_client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+        # Shared pooled OpenAI client for embeddings
+        self.openai_client = get_openai_client()
         
-        # Get or create index
-        self.index = self._get_or_create_index()
+        # Connect straight to a known index host (e.g. a local stand-in), else get or create it
+        host = os.environ.get('PINECONE_HOST')
+        self.index = self.pc.Index(self.index_name, host=host) if host else self._get_or_create_index()
     
     def _get_or_create_index(self):
         """Get existing index or create new one"""
@@ -56,15 +60,28 @@ class PineconeClient:
             print(f"Error creating Pinecone index: {e}")
             return None
     
-    def generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for text using OpenAI"""
+    def generate_embedding(self, text: str, deadline: Deadline = None) -> List[float]:
+        """Generate embedding for text using OpenAI, within ``deadline`` when given"""
         if not self.openai_client:
             return []
+        
+        timeout = self.embedding_timeout
+        if deadline is not None:
+            if deadline.remaining() < self.min_budget:
+                print("Embedding skipped: request deadline nearly exhausted")
+                return []
+            timeout = min(timeout, deadline.remaining())
             
+        # Roughly 4 characters per token; shed rather than queue behind chat traffic
+        if not get_rate_limiter().acquire('embeddings', len(text) // 4 + 1, max_wait=1.0):
+            print("Embedding skipped: OpenAI rate limit budget exhausted")
+            return []
+        
         try:
             response = self.openai_client.embeddings.create(
                 model="text-embedding-ada-002",
-                input=text
+                input=text,
+                timeout=timeout
             )
             return response.data[0].embedding
         except Exception as e:
@@ -105,13 +122,14 @@ class PineconeClient:
     def search_similar(self, 
                       query: str, 
                       top_k: int = 5,
-                      filter_dict: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        """Search for similar vectors"""
+                      filter_dict: Dict[str, Any] = None,
+                      deadline: Deadline = None) -> List[Dict[str, Any]]:
+        """Search for similar vectors; returns no results rather than overrun ``deadline``"""
         if not self.index:
             return []
             
         try:
-            query_embedding = self.generate_embedding(query)
+            query_embedding = self.generate_embedding(query, deadline)
             if not query_embedding:
                 return []
             
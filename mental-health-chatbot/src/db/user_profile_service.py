@@ -0,0 +1,352 @@
+"""
+User Profile Service - Per-user recommendation features materialized from mood, assessment and recommendation history
+"""
+
+import os
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Iterable
+from sqlalchemy import event, func, and_, inspect
+from .database import db
+from .models import MoodEntry, Assessment, Recommendation
+from src.nlp.recommendation_cache import MemoryEntryStore, RedisEntryStore, REDIS_AVAILABLE, get_user_recommendation_cache
+
+# Mood entry columns averaged over the rolling window
+MOOD_FEATURES = ('mood_score', 'stress_level', 'sleep_hours', 'energy_level')
+# Assessment severities that make the assessed condition the user's status
+CLINICAL_SEVERITIES = {'moderate', 'moderately severe', 'moderately_severe', 'severe'}
+ASSESSMENT_CONDITIONS = {'PHQ-9': 'depression', 'GAD-7': 'anxiety'}
+# Users per grouped query when loading in bulk, to keep IN lists bounded
+LOAD_CHUNK_SIZE = 500
+# Session.info key holding profile changes flushed but not yet committed
+PENDING_CHANGES_KEY = 'user_profile_changes'
+
+def _utcnow() -> datetime:
+    """Naive UTC now, matching how created_at columns are stored"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    if value is None:
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat()
+
+def empty_profile(user_id: int) -> Dict[str, Any]:
+    """Stored profile of a user with no history.
+
+    Mood features are kept as window sums and counts rather than averages so a
+    new entry can be folded in without re-reading the window.
+    """
+    return {
+        'user_id': user_id,
+        'computed_at': time.time(),
+        'mood_entries': 0,
+        'sums': {feature: 0.0 for feature in MOOD_FEATURES},
+        'counts': {feature: 0 for feature in MOOD_FEATURES},
+        'last_mood_at': None,
+        'assessment_type': None,
+        'severity_level': None,
+        'assessed_at': None,
+        'completed_types': {},
+        'completed_items': {}
+    }
+
+def mental_health_status(severity_level: Optional[str], assessment_type: Optional[str],
+                         stress_level: Optional[float]) -> str:
+    """Status from the latest assessment, or from sustained stress when no assessment flags a condition"""
+    if severity_level in CLINICAL_SEVERITIES and assessment_type in ASSESSMENT_CONDITIONS:
+        return ASSESSMENT_CONDITIONS[assessment_type]
+    if stress_level is not None and stress_level >= 7:
+        return 'stress'
+    return 'healthy'
+
+def profile_features(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Recommendation features of a stored profile; averages are None without entries in the window"""
+    features = {'user_id': profile['user_id'], 'mood_entries': profile['mood_entries']}
+    for feature in MOOD_FEATURES:
+        count = profile['counts'][feature]
+        features[feature] = round(profile['sums'][feature] / count, 2) if count else None
+
+    completed_types = profile['completed_types']
+    features.update({
+        'last_mood_at': profile['last_mood_at'],
+        'assessment_type': profile['assessment_type'],
+        'severity_level': profile['severity_level'],
+        'assessed_at': profile['assessed_at'],
+        'mental_health_status': mental_health_status(
+            profile['severity_level'], profile['assessment_type'], features['stress_level']),
+        'completed_types': dict(completed_types),
+        'completed_items': dict(profile['completed_items']),
+        'activities_completed': sorted(completed_types, key=lambda name: (-completed_types[name], name))
+    })
+    return features
+
+
+class UserProfileService:
+    """Materialized user profiles, read in O(1) and kept current by the writes that change them.
+
+    A profile holds rolling mood, stress, sleep and energy over the last
+    ``window_days``, the latest assessment and counts of completed
+    recommendations by type and by catalog item. Missing profiles are loaded from the database with one
+    grouped query per table for any number of users. Committed inserts are
+    folded into cached profiles incrementally; edits and deletes drop the
+    profile so the next read reloads it. Profiles are reloaded after
+    ``refresh_after`` seconds so entries leave the window.
+    """
+
+    def __init__(self, storage_url: str = 'memory://', window_days: int = 14,
+                 refresh_after: float = 6 * 3600):
+        """Initialize user profile service"""
+        self.window_days = window_days
+        self.refresh_after = refresh_after
+        self.memory_store = MemoryEntryStore()
+        self.store = self.memory_store
+        self.backend = 'memory'
+        if storage_url.startswith('redis') and REDIS_AVAILABLE:
+            self.store = RedisEntryStore(storage_url)
+            self.backend = 'redis'
+
+        self._lock = threading.Lock()
+        self._metrics = {'hits': 0, 'misses': 0, 'expired': 0, 'loaded': 0,
+                         'incremental_updates': 0, 'invalidations': 0}
+
+    def get(self, user_id: int) -> Dict[str, Any]:
+        """Features for one user, loading the profile when it is missing or due for a refresh (needs an app context then)"""
+        profile = self._get_profile(user_id)
+        if profile is None:
+            self._increment('misses')
+            return self.load_many([user_id])[user_id]
+        if time.time() - profile['computed_at'] > self.refresh_after:
+            self._increment('expired')
+            return self.load_many([user_id])[user_id]
+        self._increment('hits')
+        return profile_features(profile)
+
+    def load_many(self, user_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """Load and cache profiles for many users, returning their features"""
+        user_ids = list(dict.fromkeys(user_ids))
+        features = {}
+        for start in range(0, len(user_ids), LOAD_CHUNK_SIZE):
+            for user_id, profile in self._query_profiles(user_ids[start:start + LOAD_CHUNK_SIZE]).items():
+                self._set_profile(user_id, profile)
+                features[user_id] = profile_features(profile)
+        self._increment('loaded', len(features))
+        return features
+
+    def apply_mood_entry(self, user_id: int, values: Dict[str, Any], created_at: Optional[datetime]):
+        """Fold a new mood entry into the user's cached profile"""
+        def update(profile):
+            profile['mood_entries'] += 1
+            for feature in MOOD_FEATURES:
+                if values.get(feature) is not None:
+                    profile['sums'][feature] += float(values[feature])
+                    profile['counts'][feature] += 1
+            created = _timestamp(created_at) or _timestamp(_utcnow())
+            profile['last_mood_at'] = max(profile['last_mood_at'] or created, created)
+        self._update(user_id, update)
+
+    def apply_assessment(self, user_id: int, assessment_type: str, severity_level: str,
+                         created_at: Optional[datetime]):
+        """Make a new assessment the user's latest"""
+        def update(profile):
+            created = _timestamp(created_at) or _timestamp(_utcnow())
+            if profile['assessed_at'] is None or created >= profile['assessed_at']:
+                profile.update(assessment_type=assessment_type, severity_level=severity_level, assessed_at=created)
+        self._update(user_id, update)
+
+    def apply_completion(self, user_id: int, recommendation_type: str, catalog_key: Optional[str] = None):
+        """Count a completed recommendation"""
+        def update(profile):
+            completed_types = profile['completed_types']
+            completed_types[recommendation_type] = completed_types.get(recommendation_type, 0) + 1
+            if catalog_key:
+                completed_items = profile['completed_items']
+                completed_items[catalog_key] = completed_items.get(catalog_key, 0) + 1
+        self._update(user_id, update)
+
+    def invalidate(self, user_id: int):
+        """Drop a user's profile so the next read reloads it"""
+        self._increment('invalidations')
+        self._set_profile(user_id, None)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get hit/miss and update counters"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        lookups = metrics['hits'] + metrics['misses'] + metrics['expired']
+        metrics['hit_rate'] = metrics['hits'] / lookups if lookups else 0.0
+        metrics['backend'] = self.backend
+        return metrics
+
+    def _update(self, user_id: int, update):
+        """Apply an incremental change to a cached profile; uncached users are loaded with the change on their next read"""
+        profile = self._get_profile(user_id)
+        if profile is None:
+            return
+        update(profile)
+        self._set_profile(user_id, profile)
+        self._increment('incremental_updates')
+
+    def _query_profiles(self, user_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Profiles for a chunk of users from three grouped queries"""
+        profiles = {user_id: empty_profile(user_id) for user_id in user_ids}
+        since = _utcnow() - timedelta(days=self.window_days)
+
+        mood_columns = [func.count(MoodEntry.id), func.max(MoodEntry.created_at)]
+        for feature in MOOD_FEATURES:
+            column = getattr(MoodEntry, feature)
+            mood_columns += [func.sum(column), func.count(column)]
+        mood_rows = (db.session.query(MoodEntry.user_id, *mood_columns)
+                     .filter(MoodEntry.user_id.in_(user_ids), MoodEntry.created_at >= since)
+                     .group_by(MoodEntry.user_id))
+        for user_id, entries, last_mood_at, *aggregates in mood_rows:
+            profile = profiles[user_id]
+            profile['mood_entries'] = entries
+            profile['last_mood_at'] = _timestamp(last_mood_at)
+            for position, feature in enumerate(MOOD_FEATURES):
+                profile['sums'][feature] = float(aggregates[2 * position] or 0.0)
+                profile['counts'][feature] = aggregates[2 * position + 1]
+
+        latest = (db.session.query(Assessment.user_id, func.max(Assessment.created_at).label('created_at'))
+                  .filter(Assessment.user_id.in_(user_ids))
+                  .group_by(Assessment.user_id)
+                  .subquery())
+        assessment_rows = (db.session.query(Assessment.user_id, Assessment.assessment_type,
+                                            Assessment.severity_level, Assessment.created_at)
+                           .join(latest, and_(Assessment.user_id == latest.c.user_id,
+                                              Assessment.created_at == latest.c.created_at))
+                           .order_by(Assessment.id))
+        for user_id, assessment_type, severity_level, created_at in assessment_rows:
+            profiles[user_id].update(assessment_type=assessment_type, severity_level=severity_level,
+                                     assessed_at=_timestamp(created_at))
+
+        completion_rows = (db.session.query(Recommendation.user_id, Recommendation.recommendation_type,
+                                            Recommendation.catalog_key, func.count(Recommendation.id))
+                           .filter(Recommendation.user_id.in_(user_ids), Recommendation.is_completed.is_(True))
+                           .group_by(Recommendation.user_id, Recommendation.recommendation_type,
+                                     Recommendation.catalog_key))
+        for user_id, recommendation_type, catalog_key, completed in completion_rows:
+            completed_types = profiles[user_id]['completed_types']
+            completed_types[recommendation_type] = completed_types.get(recommendation_type, 0) + completed
+            if catalog_key:
+                profiles[user_id]['completed_items'][catalog_key] = completed
+
+        return profiles
+
+    def _key(self, user_id: int) -> str:
+        return f"profile:v2:{user_id}"
+
+    def _get_profile(self, user_id: int) -> Optional[Dict[str, Any]]:
+        try:
+            return self.store.get(self._key(user_id))
+        except Exception as e:
+            print(f"User profile store unavailable, using in-memory store: {e}")
+            self.store = self.memory_store
+            self.backend = 'memory'
+            return self.memory_store.get(self._key(user_id))
+
+    def _set_profile(self, user_id: int, profile: Optional[Dict[str, Any]]):
+        """Store a profile, or drop it when ``profile`` is None"""
+        expire_seconds = self.refresh_after * 2
+        try:
+            if profile is None:
+                self.store.delete(self._key(user_id))
+            else:
+                self.store.set(self._key(user_id), profile, expire_seconds)
+        except Exception as e:
+            print(f"User profile store unavailable, using in-memory store: {e}")
+            self.store = self.memory_store
+            self.backend = 'memory'
+            if profile is None:
+                self.memory_store.delete(self._key(user_id))
+            else:
+                self.memory_store.set(self._key(user_id), profile, expire_seconds)
+
+    def _increment(self, metric: str, amount: int = 1):
+        with self._lock:
+            self._metrics[metric] += amount
+
+
+def _collect_profile_changes(session, flush_context):
+    """Record profile-relevant rows of a flush; they are applied once the transaction commits"""
+    changes = session.info.setdefault(PENDING_CHANGES_KEY, [])
+    for obj in session.new:
+        if isinstance(obj, MoodEntry):
+            values = {feature: getattr(obj, feature) for feature in MOOD_FEATURES}
+            changes.append(('mood_entry', obj.user_id, values, obj.created_at))
+        elif isinstance(obj, Assessment):
+            changes.append(('assessment', obj.user_id, obj.assessment_type, obj.severity_level, obj.created_at))
+        elif isinstance(obj, Recommendation) and obj.is_completed:
+            changes.append(('completion', obj.user_id, obj.recommendation_type, obj.catalog_key))
+
+    for obj in session.dirty:
+        if isinstance(obj, (MoodEntry, Assessment)) and session.is_modified(obj):
+            changes.append(('invalidate', obj.user_id))
+        elif isinstance(obj, Recommendation):
+            added, _, deleted = inspect(obj).attrs.is_completed.history
+            if added and added[0] and not (deleted and deleted[0]):
+                changes.append(('completion', obj.user_id, obj.recommendation_type, obj.catalog_key))
+            elif deleted and deleted[0]:
+                changes.append(('invalidate', obj.user_id))
+
+    for obj in session.deleted:
+        if isinstance(obj, (MoodEntry, Assessment, Recommendation)):
+            changes.append(('invalidate', obj.user_id))
+
+def _apply_profile_changes(session):
+    changes = session.info.pop(PENDING_CHANGES_KEY, None)
+    if not changes:
+        return
+
+    service = get_user_profile_service()
+    for kind, user_id, *details in changes:
+        try:
+            if kind == 'mood_entry':
+                service.apply_mood_entry(user_id, *details)
+            elif kind == 'assessment':
+                service.apply_assessment(user_id, *details)
+            elif kind == 'completion':
+                service.apply_completion(user_id, *details)
+            else:
+                service.invalidate(user_id)
+        except Exception as e:
+            print(f"Error updating profile for user {user_id}: {e}")
+
+    # Every change above is an input to the user's recommendations
+    recommendation_cache = get_user_recommendation_cache()
+    for user_id in {user_id for _, user_id, *_ in changes}:
+        try:
+            recommendation_cache.invalidate(user_id)
+        except Exception as e:
+            print(f"Error invalidating recommendations for user {user_id}: {e}")
+
+def _discard_profile_changes(session, previous_transaction):
+    session.info.pop(PENDING_CHANGES_KEY, None)
+
+def register_profile_listeners(session=None):
+    """Keep profiles current from every commit on the app's database session"""
+    session = session or db.session
+    if not event.contains(session, 'after_flush', _collect_profile_changes):
+        event.listen(session, 'after_flush', _collect_profile_changes)
+        event.listen(session, 'after_commit', _apply_profile_changes)
+        event.listen(session, 'after_soft_rollback', _discard_profile_changes)
+
+
+# Initialize global user profile service
+user_profile_service = None
+_user_profile_service_lock = threading.Lock()
+
+def get_user_profile_service() -> UserProfileService:
+    """Get global user profile service instance"""
+    global user_profile_service
+    if user_profile_service is None:
+        with _user_profile_service_lock:
+            if user_profile_service is None:
+                user_profile_service = UserProfileService(
+                    storage_url=os.environ.get('USER_PROFILE_STORE_URL') or os.environ.get('REDIS_URL', 'memory://'),
+                    window_days=int(os.environ.get('USER_PROFILE_WINDOW_DAYS', '14')),
+                    refresh_after=float(os.environ.get('USER_PROFILE_REFRESH_SECONDS', str(6 * 3600)))
+                )
+    return user_profile_service
@@ -0,0 +1,184 @@
+"""
+Collaborative Filter - Item factors learned from recommendation completions, scored by folding users in
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional, Iterable, Tuple, Sequence
+import numpy as np
+from scipy import sparse
+
+MODEL_PATH = 'data/models/collaborative_filter.npz'
+
+# Aggregated interactions read per chunk while training
+TRAINING_CHUNK_SIZE = 100000
+
+class CollaborativeModel:
+    """Truncated SVD of the user x item completion matrix (PureSVD).
+
+    Only the item factors V are kept. A user is folded in from their own
+    completions x at request time, so scores are x V V^T: two small dot
+    products, and nothing per user is stored or retrained.
+    """
+
+    def __init__(self, item_keys: Sequence[str], item_factors: np.ndarray, singular_values: np.ndarray):
+        """Initialize collaborative model"""
+        self.item_keys = tuple(item_keys)
+        self.item_factors = np.asarray(item_factors, dtype=np.float32)
+        self.singular_values = np.asarray(singular_values, dtype=np.float32)
+        self.positions = {key: position for position, key in enumerate(self.item_keys)}
+
+    @property
+    def factors(self) -> int:
+        return self.item_factors.shape[1]
+
+    def aligned_to(self, item_keys: Sequence[str]) -> np.ndarray:
+        """Item factors in the order of ``item_keys``; items the model never saw get zero rows"""
+        aligned = np.zeros((len(item_keys), self.factors), dtype=np.float32)
+        for position, key in enumerate(item_keys):
+            model_position = self.positions.get(key)
+            if model_position is not None:
+                aligned[position] = self.item_factors[model_position]
+        return aligned
+
+    def save(self, path: str = None):
+        """Write the model to an .npz file"""
+        path = path or os.environ.get('COLLABORATIVE_MODEL_PATH', MODEL_PATH)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez(path, item_keys=np.array(self.item_keys), item_factors=self.item_factors,
+                 singular_values=self.singular_values)
+
+
+def interaction_weight(completions: np.ndarray) -> np.ndarray:
+    """Implicit-feedback strength of repeated completions; repeats count with diminishing returns"""
+    return np.log1p(completions).astype(np.float64)
+
+def item_gram_matrix(interactions: Iterable[Tuple[int, str, int]], item_keys: Sequence[str],
+                     chunk_size: int = TRAINING_CHUNK_SIZE) -> Tuple[np.ndarray, int]:
+    """X^T X of the completion matrix, built a chunk of users at a time.
+
+    ``interactions`` are (user_id, item_key, completions) sorted by user; chunks
+    are only cut between users, so summing the per-chunk products is exact and
+    memory stays at one chunk plus an items x items matrix however many users
+    there are. Returns the matrix and the number of users seen.
+    """
+    positions = {key: position for position, key in enumerate(item_keys)}
+    gram = np.zeros((len(item_keys), len(item_keys)), dtype=np.float64)
+    users = 0
+    user_ids: List[int] = []
+    items: List[int] = []
+    counts: List[int] = []
+
+    def flush():
+        nonlocal users
+        if not user_ids:
+            return
+        user_index, rows = np.unique(np.asarray(user_ids), return_inverse=True)
+        chunk = sparse.csr_matrix((interaction_weight(np.asarray(counts)), (rows, np.asarray(items))),
+                                  shape=(len(user_index), len(item_keys)))
+        gram[:] += (chunk.T @ chunk).toarray()
+        users += len(user_index)
+        user_ids.clear()
+        items.clear()
+        counts.clear()
+
+    for user_id, item_key, completions in interactions:
+        position = positions.get(item_key)
+        if position is None or not completions:
+            continue
+        if len(user_ids) >= chunk_size and user_id != user_ids[-1]:
+            flush()
+        user_ids.append(user_id)
+        items.append(position)
+        counts.append(completions)
+    flush()
+    return gram, users
+
+def train_collaborative_model(interactions: Iterable[Tuple[int, str, int]], item_keys: Sequence[str],
+                              factors: int = 8, chunk_size: int = TRAINING_CHUNK_SIZE) -> Optional[CollaborativeModel]:
+    """Fit item factors from (user_id, item_key, completions) sorted by user, or None without enough signal.
+
+    The right singular vectors of X are the eigenvectors of X^T X, so the
+    truncated SVD comes from an items x items eigendecomposition instead of
+    factorizing the users x items matrix itself.
+    """
+    gram, users = item_gram_matrix(interactions, item_keys, chunk_size)
+    eigenvalues, eigenvectors = np.linalg.eigh(gram)
+    top = np.argsort(eigenvalues)[::-1][:factors]
+    top = top[eigenvalues[top] > 1e-9]
+    if users < 2 or not len(top):
+        return None
+    return CollaborativeModel(item_keys, eigenvectors[:, top], np.sqrt(eigenvalues[top]))
+
+def completion_interactions(chunk_size: int = TRAINING_CHUNK_SIZE) -> Iterable[Tuple[int, str, int]]:
+    """Completions per (user, catalog item) from the Recommendation table, streamed in user order (needs an app context)"""
+    from src.db.models import Recommendation, db
+
+    query = (db.session.query(Recommendation.user_id, Recommendation.catalog_key, db.func.count(Recommendation.id))
+             .filter(Recommendation.is_completed.is_(True), Recommendation.catalog_key.isnot(None))
+             .group_by(Recommendation.user_id, Recommendation.catalog_key)
+             .order_by(Recommendation.user_id))
+    return query.yield_per(chunk_size)
+
+def load_collaborative_model(path: str = None) -> Optional[CollaborativeModel]:
+    """Load a trained model, or None when none has been trained yet"""
+    path = path or os.environ.get('COLLABORATIVE_MODEL_PATH', MODEL_PATH)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            return CollaborativeModel(data['item_keys'].tolist(), data['item_factors'], data['singular_values'])
+    except Exception as e:
+        print(f"Error loading collaborative model from {path}: {e}")
+        return None
+
+
+class CollaborativeScorer:
+    """A model's item factors aligned to catalog ids, for scoring users by catalog position"""
+
+    def __init__(self, model: CollaborativeModel, catalog):
+        """Initialize collaborative scorer"""
+        self.model = model
+        self.by_key = catalog.by_key
+        self.item_factors = model.aligned_to([item.key for item in catalog.items])
+        # Catalog items the model has interactions for; only these get a collaborative score
+        self.known = np.any(self.item_factors != 0, axis=1)
+
+    def score(self, completed_items: Dict[str, int]) -> Optional[np.ndarray]:
+        """Scores in [0, 1] for every catalog item, or None when the user has no usable completions.
+
+        Items the user already completed score 0, so the blend never favours them over new ones.
+        """
+        positions, counts = [], []
+        for key, completions in completed_items.items():
+            position = self.by_key.get(key)
+            if position is not None and completions:
+                positions.append(position)
+                counts.append(completions)
+        if not positions:
+            return None
+
+        weights = interaction_weight(np.asarray(counts)).astype(np.float32)
+        user_factors = weights @ self.item_factors[positions]
+        scores = self.item_factors @ user_factors
+        scores[positions] = 0.0
+        peak = scores.max()
+        if peak <= 0:
+            return None
+        return np.clip(scores / peak, 0.0, 1.0)
+
+
+# Initialize global collaborative model
+collaborative_model = None
+_collaborative_model_loaded = False
+_collaborative_model_lock = threading.Lock()
+
+def get_collaborative_model() -> Optional[CollaborativeModel]:
+    """Get global collaborative model instance, or None when no model has been trained"""
+    global collaborative_model, _collaborative_model_loaded
+    if not _collaborative_model_loaded:
+        with _collaborative_model_lock:
+            if not _collaborative_model_loaded:
+                collaborative_model = load_collaborative_model()
+                _collaborative_model_loaded = True
+    return collaborative_model
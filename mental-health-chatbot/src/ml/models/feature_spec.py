@@ -0,0 +1,110 @@
+"""
+Feature Spec - Versioned numerical feature schema shared by classifier training and serving
+"""
+
+import os
+import json
+from typing import Dict, List, Any, Optional, Sequence, Mapping, NamedTuple
+import numpy as np
+
+# Bump when column semantics change in a way a saved model cannot follow
+FEATURE_SPEC_VERSION = 1
+
+class FeatureColumn(NamedTuple):
+    """One numerical column: the record key it is read from, the value used when missing, and its clip range"""
+    name: str
+    default: float
+    low: float
+    high: float
+
+# Columns the mental health classifier is trained and served on, in order
+MENTAL_HEALTH_FEATURES = (
+    FeatureColumn('mood_score', 5, 1, 10),
+    FeatureColumn('stress_level', 5, 1, 10),
+    FeatureColumn('sleep_hours', 8, 3, 12),
+    FeatureColumn('energy_level', 5, 1, 10),
+    FeatureColumn('social_activity', 5, 1, 10),
+    FeatureColumn('physical_activity', 5, 1, 10)
+)
+
+class FeatureSpec:
+    """Column order, defaults and transforms of a model's input, written next to the model.
+
+    A model's input is ``text_width`` TF-IDF columns followed by the numerical
+    columns. Training and serving both build the numerical block with fill(),
+    so the two cannot drift apart; the saved spec is what a loaded model is
+    served with, and check() rejects components it does not describe.
+    """
+
+    def __init__(self, columns: Sequence[FeatureColumn] = MENTAL_HEALTH_FEATURES, text_width: int = 0,
+                 version: int = FEATURE_SPEC_VERSION):
+        """Initialize feature spec"""
+        self.columns = tuple(FeatureColumn(*column) for column in columns)
+        self.text_width = text_width
+        self.version = version
+        self.names = tuple(column.name for column in self.columns)
+        self.defaults = np.array([column.default for column in self.columns], dtype=np.float64)
+        self.lows = np.array([column.low for column in self.columns], dtype=np.float64)
+        self.highs = np.array([column.high for column in self.columns], dtype=np.float64)
+
+    @property
+    def numerical_width(self) -> int:
+        return len(self.columns)
+
+    @property
+    def width(self) -> int:
+        return self.text_width + self.numerical_width
+
+    def fill(self, rows: Sequence[Optional[Mapping[str, Any]]], out: np.ndarray = None) -> np.ndarray:
+        """Numerical block for ``rows`` written into ``out`` (allocated when not given).
+
+        Missing rows and keys take the column default; every value is then
+        clipped to the column range in place.
+        """
+        if out is None:
+            out = np.empty((len(rows), self.numerical_width), dtype=np.float64)
+        out[:] = self.defaults
+        for position, row in enumerate(rows):
+            if row:
+                out[position] = [row.get(name, default) for name, default in zip(self.names, self.defaults)]
+        np.clip(out, self.lows, self.highs, out=out)
+        return out
+
+    def check(self, model, vectorizer, scaler) -> Optional[str]:
+        """Why the fitted components do not match this spec, or None when they do"""
+        if self.version != FEATURE_SPEC_VERSION:
+            return f"feature spec version {self.version}, expected {FEATURE_SPEC_VERSION}"
+        vocabulary = len(getattr(vectorizer, 'vocabulary_', ()))
+        if vocabulary != self.text_width:
+            return f"vectorizer has {vocabulary} terms, spec has {self.text_width}"
+        if getattr(scaler, 'n_features_in_', None) != self.numerical_width:
+            return f"scaler expects {getattr(scaler, 'n_features_in_', None)} columns, spec has {self.numerical_width}"
+        if getattr(model, 'n_features_in_', None) != self.width:
+            return f"model expects {getattr(model, 'n_features_in_', None)} features, spec has {self.width}"
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'text_width': self.text_width,
+            'columns': [column._asdict() for column in self.columns]
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'FeatureSpec':
+        columns: List[FeatureColumn] = [FeatureColumn(**column) for column in data['columns']]
+        return cls(columns, text_width=data['text_width'], version=data['version'])
+
+    def save(self, path: str):
+        """Write the spec as JSON"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> Optional['FeatureSpec']:
+        """Read a saved spec, or None when there is none"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
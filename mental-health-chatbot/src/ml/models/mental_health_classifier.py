@@ -7,32 +7,69 @@ import json
 import joblib
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Any, Tuple, Optional
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from typing import Dict, List, Any, Tuple, Optional, NamedTuple
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.svm import SVC
 from sklearn.model_selection import train_test_split, cross_val_score, GridSearchCV
 from sklearn.metrics import classification_report, confusion_matrix, accuracy_score
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.feature_extraction.text import TfidfVectorizer
+from src.ml.models.feature_spec import FeatureSpec
 import warnings
 warnings.filterwarnings('ignore')
 
+HIGH_RISK_CLASSES = ('severe_depression', 'severe_anxiety')
+MEDIUM_RISK_CLASSES = ('moderate_depression', 'moderate_anxiety', 'bipolar')
+RISK_LEVELS = np.array(['low', 'medium', 'high'])
+
+# Estimators that reject sparse input; every model_type trained here takes CSR directly
+DENSE_INPUT_ESTIMATORS = (HistGradientBoostingClassifier,)
+
+def assemble_features(*blocks) -> sparse.csr_matrix:
+    """Column-stack feature blocks (sparse or dense) into one CSR matrix.
+
+    The TF-IDF block stays sparse, so a row costs its non-zero terms plus the
+    few numerical columns rather than the whole vocabulary.
+    """
+    return sparse.hstack(blocks, format='csr')
+
+def estimator_input(model, features: sparse.csr_matrix):
+    """Features as ``model`` takes them: densified only for estimators that cannot use sparse input"""
+    if isinstance(model, DENSE_INPUT_ESTIMATORS):
+        return features.toarray()
+    return features
+
+class BatchPrediction(NamedTuple):
+    """Predictions for many records as columns; row i of every array belongs to record i"""
+    classes: np.ndarray
+    probabilities: np.ndarray
+    predicted_class: np.ndarray
+    confidence: np.ndarray
+    risk_level: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.predicted_class)
+
 class MentalHealthClassifier:
     """Multi-class mental health status classifier"""
     
-    def __init__(self, model_type: str = 'random_forest'):
+    def __init__(self, model_type: str = 'random_forest', max_features: int = 1000):
         """Initialize classifier"""
         self.model_type = model_type
+        self.max_features = max_features
         self.model = None
         self.vectorizer = None
         self.scaler = None
         self.label_encoder = None
+        self.feature_spec = None
         self.feature_names = None
         self.model_path = 'data/models/mental_health_classifier.pkl'
         self.vectorizer_path = 'data/models/mental_health_vectorizer.pkl'
         self.scaler_path = 'data/models/mental_health_scaler.pkl'
         self.label_encoder_path = 'data/models/mental_health_label_encoder.pkl'
+        self.feature_spec_path = 'data/models/mental_health_feature_spec.json'
         
         # Load existing model or train new one
         self._load_or_train_model()
@@ -46,57 +83,22 @@ class MentalHealthClassifier:
             return self._get_default_prediction()
         
         try:
-            # Process text features
-            text_vector = self.vectorizer.transform([' '.join(text_features)])
-            
-            # Process numerical features with enhanced set
-            if numerical_features and self.scaler:
-                numerical_array = np.array([[
-                    numerical_features.get('mood_score', 5),
-                    numerical_features.get('stress_level', 5),
-                    numerical_features.get('sleep_hours', 8),
-                    numerical_features.get('energy_level', 5),
-                    numerical_features.get('social_activity', 5),
-                    numerical_features.get('physical_activity', 5),
-                    numerical_features.get('appetite_score', 5),
-                    numerical_features.get('concentration_score', 5),
-                    numerical_features.get('motivation_score', 5),
-                    numerical_features.get('anxiety_level', 5)
-                ]])
-                numerical_scaled = self.scaler.transform(numerical_array)
-            else:
-                numerical_scaled = np.zeros((1, 10))
-            
-            # Process context features
-            context_vector = self._process_context_features(context_features) if context_features else np.zeros((1, 5))
-            
-            # Combine all features
-            combined_features = np.hstack([text_vector.toarray(), numerical_scaled, context_vector])
-            
-            # Make prediction
-            prediction = self.model.predict(combined_features)[0]
-            probabilities = self.model.predict_proba(combined_features)[0]
-            
-            # Get class labels
-            if self.label_encoder:
-                predicted_class = self.label_encoder.inverse_transform([prediction])[0]
-                class_probabilities = dict(zip(
-                    self.label_encoder.classes_,
-                    probabilities
-                ))
-            else:
-                predicted_class = f"class_{prediction}"
-                class_probabilities = {f"class_{i}": prob for i, prob in enumerate(probabilities)}
-            
-            # Enhanced risk assessment
-            risk_level = self._assess_enhanced_risk_level(predicted_class, max(probabilities), context_features)
+            batch = self.predict_batch([{
+                'text_features': text_features,
+                'numerical_features': numerical_features,
+                'context_features': context_features
+            }])
+            predicted_class = str(batch.predicted_class[0])
+            confidence = float(batch.confidence[0])
+            class_probabilities = {str(label): float(prob) for label, prob in zip(batch.classes, batch.probabilities[0])}
+            risk_level = str(batch.risk_level[0])
             
             # Generate personalized recommendations
             recommendations = self._get_enhanced_recommendations(predicted_class, context_features, numerical_features)
             
             return {
                 'predicted_class': predicted_class,
-                'confidence': max(probabilities),
+                'confidence': confidence,
                 'class_probabilities': class_probabilities,
                 'risk_level': risk_level,
                 'recommendations': recommendations,
@@ -109,6 +111,59 @@ class MentalHealthClassifier:
             print(f"Error in prediction: {e}")
             return self._get_default_prediction()
     
+    def predict_batch(self, records: List[Dict[str, Any]]) -> BatchPrediction:
+        """Predict many records at once, e.g. for population risk screening.
+
+        Each record holds the arguments of predict_mental_health_status
+        (``text_features``, ``numerical_features``, ``context_features``). All
+        records are laid out by the feature spec as one matrix and go through
+        the model in a single predict_proba; classes are its argmax and risk
+        levels are computed over the whole columns.
+        """
+        if not records or not self.model or not self.vectorizer:
+            default = self._get_default_prediction()
+            return BatchPrediction(
+                classes=np.array([default['predicted_class']]),
+                probabilities=np.ones((len(records), 1)),
+                predicted_class=np.full(len(records), default['predicted_class']),
+                confidence=np.full(len(records), default['confidence']),
+                risk_level=np.full(len(records), default['risk_level'])
+            )
+
+        features = self._feature_matrix([' '.join(record.get('text_features') or []) for record in records],
+                                        [record.get('numerical_features') for record in records])
+        probabilities = self.model.predict_proba(features)
+        predicted = self.model.classes_[probabilities.argmax(axis=1)]
+        confidence = probabilities.max(axis=1)
+
+        if self.label_encoder:
+            classes = self.label_encoder.inverse_transform(self.model.classes_)
+            predicted_class = self.label_encoder.inverse_transform(predicted)
+        else:
+            classes = np.array([f"class_{label}" for label in self.model.classes_])
+            predicted_class = np.array([f"class_{label}" for label in predicted])
+
+        stressful_events = np.array([
+            sum(1 for event in (record.get('context_features') or {}).get('recent_events', [])
+                if event.get('stress_level', 0) > 7)
+            for record in records
+        ], dtype=int)
+
+        return BatchPrediction(
+            classes=classes,
+            probabilities=probabilities,
+            predicted_class=predicted_class,
+            confidence=confidence,
+            risk_level=RISK_LEVELS[self._risk_codes(predicted_class, confidence, stressful_events)]
+        )
+    
+    def _feature_matrix(self, texts: List[str], numerical_rows: List[Optional[Dict[str, float]]]):
+        """Model input for ``texts`` and their numerical records, laid out by the feature spec"""
+        numerical = self.feature_spec.fill(numerical_rows)
+        # The buffer is ours, so it is standardized in place
+        numerical = self.scaler.transform(numerical, copy=False)
+        return estimator_input(self.model, assemble_features(self.vectorizer.transform(texts), numerical))
+    
     def predict_depression_severity(self, phq9_scores: List[int]) -> Dict[str, Any]:
         """Predict depression severity from PHQ-9 scores"""
         total_score = sum(phq9_scores)
@@ -228,9 +283,23 @@ class MentalHealthClassifier:
                 os.path.exists(self.scaler_path) and
                 os.path.exists(self.label_encoder_path)):
                 
-                self.model = joblib.load(self.model_path)
-                self.vectorizer = joblib.load(self.vectorizer_path)
-                self.scaler = joblib.load(self.scaler_path)
+                feature_spec = FeatureSpec.load(self.feature_spec_path)
+                if feature_spec is None:
+                    print("Existing model has no feature spec, retraining")
+                    return False
+                
+                model = joblib.load(self.model_path)
+                vectorizer = joblib.load(self.vectorizer_path)
+                scaler = joblib.load(self.scaler_path)
+                mismatch = feature_spec.check(model, vectorizer, scaler)
+                if mismatch:
+                    print(f"Existing model does not match its feature spec ({mismatch}), retraining")
+                    return False
+                
+                self.model = model
+                self.vectorizer = vectorizer
+                self.scaler = scaler
+                self.feature_spec = feature_spec
                 self.label_encoder = joblib.load(self.label_encoder_path)
                 return True
         except Exception as e:
@@ -250,15 +319,16 @@ class MentalHealthClassifier:
             y = training_data['labels']
             
             # Vectorize text features
-            self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
+            self.vectorizer = TfidfVectorizer(max_features=self.max_features, stop_words='english')
             X_text_vectorized = self.vectorizer.fit_transform(X_text)
+            self.feature_spec = FeatureSpec(text_width=len(self.vectorizer.vocabulary_))
             
-            # Scale numerical features
+            # Scale numerical features, laid out by the feature spec
             self.scaler = StandardScaler()
-            X_numerical_scaled = self.scaler.fit_transform(X_numerical)
+            X_numerical_scaled = self.scaler.fit_transform(self.feature_spec.fill(X_numerical))
             
             # Combine features
-            X_combined = np.hstack([X_text_vectorized.toarray(), X_numerical_scaled])
+            X_combined = assemble_features(X_text_vectorized, X_numerical_scaled)
             
             # Encode labels
             self.label_encoder = LabelEncoder()
@@ -282,10 +352,10 @@ class MentalHealthClassifier:
                 self.model = RandomForestClassifier(n_estimators=100, random_state=42)
             
             # Train model
-            self.model.fit(X_train, y_train)
+            self.model.fit(estimator_input(self.model, X_train), y_train)
             
             # Evaluate model
-            y_pred = self.model.predict(X_test)
+            y_pred = self.model.predict(estimator_input(self.model, X_test))
             accuracy = accuracy_score(y_test, y_pred)
             print(f"Model accuracy: {accuracy:.3f}")
             
@@ -295,6 +365,7 @@ class MentalHealthClassifier:
             joblib.dump(self.vectorizer, self.vectorizer_path)
             joblib.dump(self.scaler, self.scaler_path)
             joblib.dump(self.label_encoder, self.label_encoder_path)
+            self.feature_spec.save(self.feature_spec_path)
             
             print("Mental health classifier model trained and saved successfully")
             
@@ -304,6 +375,7 @@ class MentalHealthClassifier:
             self.vectorizer = None
             self.scaler = None
             self.label_encoder = None
+            self.feature_spec = None
     
     def _generate_synthetic_data(self) -> Dict[str, Any]:
         """Generate synthetic training data for mental health classification"""
@@ -399,23 +471,20 @@ class MentalHealthClassifier:
                     social_activity = np.random.normal(6, 2)
                     physical_activity = np.random.normal(6, 2)
                 
-                # Clip values to valid ranges
-                mood_score = max(1, min(10, mood_score))
-                stress_level = max(1, min(10, stress_level))
-                sleep_hours = max(3, min(12, sleep_hours))
-                energy_level = max(1, min(10, energy_level))
-                social_activity = max(1, min(10, social_activity))
-                physical_activity = max(1, min(10, physical_activity))
-                
-                numerical_features.append([
-                    mood_score, stress_level, sleep_hours, 
-                    energy_level, social_activity, physical_activity
-                ])
+                # Values are clipped to valid ranges by the feature spec
+                numerical_features.append({
+                    'mood_score': mood_score,
+                    'stress_level': stress_level,
+                    'sleep_hours': sleep_hours,
+                    'energy_level': energy_level,
+                    'social_activity': social_activity,
+                    'physical_activity': physical_activity
+                })
                 labels.append(category)
         
         return {
             'text_features': text_features,
-            'numerical_features': np.array(numerical_features),
+            'numerical_features': numerical_features,
             'labels': labels
         }
     
@@ -431,12 +500,9 @@ class MentalHealthClassifier:
     
     def _assess_risk_level(self, predicted_class: str, confidence: float) -> str:
         """Assess risk level based on prediction"""
-        high_risk_classes = ['severe_depression', 'severe_anxiety']
-        medium_risk_classes = ['moderate_depression', 'moderate_anxiety', 'bipolar']
-        
-        if predicted_class in high_risk_classes and confidence > 0.7:
+        if predicted_class in HIGH_RISK_CLASSES and confidence > 0.7:
             return 'high'
-        elif predicted_class in medium_risk_classes and confidence > 0.6:
+        elif predicted_class in MEDIUM_RISK_CLASSES and confidence > 0.6:
             return 'medium'
         else:
             return 'low'
@@ -531,36 +597,6 @@ class MentalHealthClassifier:
         }
         return recommendations.get(level, ['Stress management evaluation recommended'])
     
-    def _process_context_features(self, context_features: Dict[str, Any]) -> np.ndarray:
-        """Process context features for enhanced prediction"""
-        if not context_features:
-            return np.zeros((1, 5))
-        
-        # Extract context features
-        time_of_day = context_features.get('time_of_day', 'morning')
-        day_of_week = context_features.get('day_of_week', 'weekday')
-        recent_events = context_features.get('recent_events', [])
-        social_context = context_features.get('social_context', 'alone')
-        weather = context_features.get('weather', 'neutral')
-        
-        # Encode time of day (0-3)
-        time_encoding = {'morning': 0, 'afternoon': 1, 'evening': 2, 'night': 3}.get(time_of_day, 0)
-        
-        # Encode day of week (0-1)
-        day_encoding = 0 if day_of_week == 'weekday' else 1
-        
-        # Count recent stressful events
-        stressful_events = sum(1 for event in recent_events if event.get('stress_level', 0) > 5)
-        event_encoding = min(stressful_events / 3, 1)  # Normalize to 0-1
-        
-        # Encode social context (0-2)
-        social_encoding = {'alone': 0, 'with_friends': 1, 'with_family': 2}.get(social_context, 0)
-        
-        # Encode weather (0-2)
-        weather_encoding = {'sunny': 0, 'neutral': 1, 'rainy': 2}.get(weather, 1)
-        
-        return np.array([[time_encoding, day_encoding, event_encoding, social_encoding, weather_encoding]])
-    
     def _assess_enhanced_risk_level(self, predicted_class: str, confidence: float, context_features: Dict[str, Any] = None) -> str:
         """Enhanced risk assessment considering context and confidence"""
         base_risk = self._assess_risk_level(predicted_class, confidence)
@@ -578,6 +614,15 @@ class MentalHealthClassifier:
         
         return base_risk
     
+    @staticmethod
+    def _risk_codes(predicted_class: np.ndarray, confidence: np.ndarray, stressful_events: np.ndarray) -> np.ndarray:
+        """_assess_enhanced_risk_level over whole columns, as indices into RISK_LEVELS"""
+        high = np.isin(predicted_class, HIGH_RISK_CLASSES) & (confidence > 0.7)
+        medium = np.isin(predicted_class, MEDIUM_RISK_CLASSES) & (confidence > 0.6)
+        codes = np.where(high, 2, np.where(medium, 1, 0))
+        # More than two highly stressful recent events raises a non-high risk by one level
+        return np.where(~high & (stressful_events > 2), np.minimum(codes + 1, 2), codes)
+    
     def _get_enhanced_recommendations(self, predicted_class: str, context_features: Dict[str, Any] = None, numerical_features: Dict[str, float] = None) -> List[str]:
         """Get enhanced, personalized recommendations"""
         base_recommendations = self._get_class_recommendations(predicted_class)
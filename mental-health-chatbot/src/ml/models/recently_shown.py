@@ -0,0 +1,102 @@
+"""
+Recently Shown - Per-user ring of daily bitsets over catalog ids, for not repeating recommendations
+"""
+
+import os
+import threading
+from datetime import date
+from typing import Dict, Any, Optional, Iterable, FrozenSet
+from src.nlp.recommendation_cache import MemoryEntryStore, RedisEntryStore, REDIS_AVAILABLE
+
+class RecentlyShown:
+    """Which catalog items each user was shown in the last ``window_days`` days.
+
+    A user's record is ``window_days`` slots, one per day, each an integer used
+    as a bitset over catalog ids. Slots are reused round-robin by day, so a
+    record never grows past ``window_days`` x catalog size bits however long the
+    history is, and checking a candidate is a single bit test. Records remember
+    the catalog fingerprint; a changed catalog starts them over.
+    """
+
+    def __init__(self, storage_url: str = 'memory://', window_days: int = 7):
+        """Initialize recently shown filter"""
+        self.window_days = window_days
+        self.memory_store = MemoryEntryStore()
+        self.store = self.memory_store
+        self.backend = 'memory'
+        if storage_url.startswith('redis') and REDIS_AVAILABLE:
+            self.store = RedisEntryStore(storage_url)
+            self.backend = 'redis'
+
+    def shown_mask(self, user_id: Any, fingerprint: int, today: date = None) -> int:
+        """Bitset of catalog ids shown to the user within the window (0 when none or unknown)"""
+        record = self._get_record(user_id)
+        if not record or record['catalog'] != fingerprint:
+            return 0
+
+        first_day = (today or date.today()).toordinal() - self.window_days + 1
+        mask = 0
+        for day, day_mask in record['slots']:
+            if day >= first_day:
+                mask |= day_mask
+        return mask
+
+    def record(self, user_id: Any, item_ids: Iterable[int], fingerprint: int, today: date = None):
+        """Mark catalog ids as shown to the user today"""
+        day = (today or date.today()).toordinal()
+        record = self._get_record(user_id)
+        if not record or record['catalog'] != fingerprint or len(record['slots']) != self.window_days:
+            record = {'catalog': fingerprint, 'slots': [[0, 0] for _ in range(self.window_days)]}
+
+        slot = record['slots'][day % self.window_days]
+        if slot[0] != day:
+            slot[0], slot[1] = day, 0
+        for item_id in item_ids:
+            slot[1] |= 1 << item_id
+        self._set_record(user_id, record)
+
+    @staticmethod
+    def exclude(candidate_ids: FrozenSet[int], mask: int) -> FrozenSet[int]:
+        """Candidates whose bit is not set in ``mask``"""
+        if not mask:
+            return candidate_ids
+        return frozenset(item_id for item_id in candidate_ids if not mask >> item_id & 1)
+
+    def _key(self, user_id: Any) -> str:
+        return f"recent:v1:{user_id}"
+
+    def _get_record(self, user_id: Any) -> Optional[Dict[str, Any]]:
+        try:
+            return self.store.get(self._key(user_id))
+        except Exception as e:
+            print(f"Recently shown store unavailable, using in-memory store: {e}")
+            self.store = self.memory_store
+            self.backend = 'memory'
+            return self.memory_store.get(self._key(user_id))
+
+    def _set_record(self, user_id: Any, record: Dict[str, Any]):
+        expire_seconds = self.window_days * 24 * 3600
+        try:
+            self.store.set(self._key(user_id), record, expire_seconds)
+        except Exception as e:
+            print(f"Recently shown store unavailable, using in-memory store: {e}")
+            self.store = self.memory_store
+            self.backend = 'memory'
+            self.memory_store.set(self._key(user_id), record, expire_seconds)
+
+
+# Initialize global recently shown filter
+recently_shown = None
+_recently_shown_lock = threading.Lock()
+
+def get_recently_shown() -> RecentlyShown:
+    """Get global recently shown filter, kept in the same store as user profiles"""
+    global recently_shown
+    if recently_shown is None:
+        with _recently_shown_lock:
+            if recently_shown is None:
+                recently_shown = RecentlyShown(
+                    storage_url=os.environ.get('USER_PROFILE_STORE_URL') or os.environ.get('REDIS_URL', 'memory://'),
+                    window_days=int(os.environ.get('RECENTLY_SHOWN_DAYS', '7'))
+                )
+    return recently_shown
@@ -0,0 +1,250 @@
+"""
+Recommendation Catalog - Immutable, indexed catalog of recommendation templates loaded once from a data file
+"""
+
+import os
+import json
+import zlib
+import threading
+from types import MappingProxyType
+from bisect import bisect_right
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple, FrozenSet, Iterable
+import numpy as np
+
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), 'recommendation_catalog.json')
+
+# Facets an item's ``when`` conditions may constrain; every item must name its context
+FACETS = ('context', 'mood', 'stress', 'time_of_day', 'status', 'severity', 'activity_level', 'professional', 'profile')
+CONTEXTS = {'chat', 'emergency', 'daily', 'weekly'}
+# Conditions that become affinity columns of the feature matrix
+AFFINITY_FACETS = ('mood', 'stress', 'status')
+
+class CatalogItem(NamedTuple):
+    """One recommendation template; ``id`` is its position in the catalog"""
+    id: int
+    key: str
+    type: str
+    title: str
+    description: str
+    content: str
+    priority: int
+    duration: str
+    # Minutes a session takes at least, or None for open-ended items (ongoing, immediate)
+    minutes: Optional[int]
+    tags: FrozenSet[str]
+    when: MappingProxyType
+    # Only offered when at most this many minutes are available
+    max_available: Optional[int] = None
+    extra: Tuple[Tuple[str, Any], ...] = ()
+
+    def render(self, user_profile: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Recommendation dict for this item, with profile placeholders filled in"""
+        content = self.content
+        if 'profile' in self.when:
+            profile = user_profile or {}
+            content = content.format(
+                successful_activities=', '.join(profile.get('successful_activities', [])[:3]),
+                goal=(profile.get('goals') or [''])[0],
+                challenge=(profile.get('current_challenges') or [''])[0]
+            )
+
+        recommendation = {
+            'id': self.key,
+            'type': self.type,
+            'title': self.title,
+            'description': self.description,
+            'content': content,
+            'priority': self.priority,
+            'duration': self.duration,
+            'minutes': self.minutes,
+            'tags': sorted(self.tags)
+        }
+        recommendation.update(self.extra)
+        return recommendation
+
+
+def mood_band(mood_score: float) -> str:
+    """Mood score (1-10) as low/medium/high"""
+    if mood_score <= 3:
+        return 'low'
+    if mood_score >= 8:
+        return 'high'
+    return 'medium'
+
+def stress_band(stress_level: float) -> str:
+    """Stress level (0-10) as low/moderate/high"""
+    if stress_level >= 7:
+        return 'high'
+    if stress_level >= 5:
+        return 'moderate'
+    return 'low'
+
+def status_condition(mental_health_status: str) -> str:
+    """Collapse a mental health status ('severe_depression') to the condition it is about"""
+    for condition in ('depression', 'anxiety'):
+        if condition in mental_health_status:
+            return condition
+    return mental_health_status
+
+
+class RecommendationCatalog:
+    """Read-only catalog with inverted indexes from facet values to item ids"""
+
+    def __init__(self, items: Iterable[CatalogItem], types: Iterable[str]):
+        """Build the indexes; items and their ids never change afterwards"""
+        self.items: Tuple[CatalogItem, ...] = tuple(items)
+        self.types = frozenset(types)
+        self.by_key = {item.key: item.id for item in self.items}
+        # Changes whenever ids would point at different items, for state stored by catalog id
+        self.fingerprint = zlib.crc32('\n'.join(item.key for item in self.items).encode('utf-8'))
+
+        index: Dict[str, Dict[str, set]] = {facet: {} for facet in FACETS}
+        unconstrained: Dict[str, set] = {facet: set() for facet in FACETS}
+        by_type: Dict[str, set] = {}
+        by_tag: Dict[str, set] = {}
+        for item in self.items:
+            for facet in FACETS:
+                values = item.when.get(facet)
+                if values is None:
+                    unconstrained[facet].add(item.id)
+                for value in values or ():
+                    index[facet].setdefault(value, set()).add(item.id)
+            by_type.setdefault(item.type, set()).add(item.id)
+            for tag in item.tags:
+                by_tag.setdefault(tag, set()).add(item.id)
+
+        self._index = {facet: {value: frozenset(ids) for value, ids in values.items()} for facet, values in index.items()}
+        self._unconstrained = {facet: frozenset(ids) for facet, ids in unconstrained.items()}
+        self._by_type = {name: frozenset(ids) for name, ids in by_type.items()}
+        self._by_tag = {name: frozenset(ids) for name, ids in by_tag.items()}
+
+        # Timed items sorted by minutes, so "longer than N minutes" is a suffix
+        timed = sorted((item.minutes, item.id) for item in self.items if item.minutes is not None)
+        self._minutes = [minutes for minutes, _ in timed]
+        self._timed_ids = [item_id for _, item_id in timed]
+        self._capped = tuple((item.max_available, item.id) for item in self.items if item.max_available is not None)
+        self._too_long_cache: Dict[int, FrozenSet[int]] = {}
+
+        self.feature_columns, self.features = self._build_features()
+        self.priorities = np.array([item.priority for item in self.items], dtype=np.float64)
+
+    def _build_features(self) -> Tuple[Dict[str, int], np.ndarray]:
+        """Item feature matrix: type one-hot, tag multi-hot, facet affinities and duration in hours"""
+        names = [f"type:{name}" for name in sorted(self.types)]
+        names += [f"tag:{tag}" for tag in sorted(self._by_tag)]
+        for facet in AFFINITY_FACETS:
+            names += [f"{facet}:{value}" for value in sorted(self._index[facet])]
+        names.append('minutes')
+        columns = {name: position for position, name in enumerate(names)}
+
+        features = np.zeros((len(self.items), len(columns)), dtype=np.float32)
+        for item in self.items:
+            features[item.id, columns[f"type:{item.type}"]] = 1.0
+            for tag in item.tags:
+                features[item.id, columns[f"tag:{tag}"]] = 1.0
+            for facet in AFFINITY_FACETS:
+                for value in item.when.get(facet, ()):
+                    features[item.id, columns[f"{facet}:{value}"]] = 1.0
+            features[item.id, columns['minutes']] = (item.minutes or 0) / 60.0
+        return columns, features
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def select(self, **facets) -> FrozenSet[int]:
+        """Ids of items whose conditions all hold for the given facet values.
+
+        Each facet takes one value or a collection of values; an item matches a facet when it
+        does not constrain it or requires one of the given values. Facets left out only match
+        items that do not constrain them.
+        """
+        candidates = None
+        for facet in FACETS:
+            values = facets.get(facet)
+            if isinstance(values, str):
+                values = (values,)
+            matching = self._unconstrained[facet]
+            if values:
+                index = self._index[facet]
+                matching = matching.union(*(index.get(value, frozenset()) for value in values))
+            candidates = matching if candidates is None else candidates & matching
+            if not candidates:
+                break
+        return candidates
+
+    def by_type(self, *types: str) -> FrozenSet[int]:
+        """Ids of items of any of the given types"""
+        return frozenset().union(*(self._by_type.get(name, frozenset()) for name in types))
+
+    def by_tag(self, *tags: str) -> FrozenSet[int]:
+        """Ids of items carrying any of the given tags"""
+        return frozenset().union(*(self._by_tag.get(tag, frozenset()) for tag in tags))
+
+    def not_fitting(self, available_minutes: int) -> FrozenSet[int]:
+        """Ids of items that do not suit the available time (too long, or only meant for short windows)"""
+        cached = self._too_long_cache.get(available_minutes)
+        if cached is None:
+            too_long = self._timed_ids[bisect_right(self._minutes, available_minutes):]
+            capped = [item_id for max_available, item_id in self._capped if available_minutes > max_available]
+            cached = frozenset(too_long).union(capped)
+            self._too_long_cache[available_minutes] = cached
+        return cached
+
+    def render(self, item_ids: Iterable[int], user_profile: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+        """Recommendation dicts for item ids, in catalog order"""
+        return [self.items[item_id].render(user_profile) for item_id in sorted(item_ids)]
+
+
+def load_catalog(path: str = None) -> RecommendationCatalog:
+    """Load and validate the catalog data file"""
+    path = path or os.environ.get('RECOMMENDATION_CATALOG_PATH', CATALOG_PATH)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    types = set(data['types'])
+    items = []
+    for position, entry in enumerate(data['items']):
+        entry = dict(entry)
+        key = entry.pop('id')
+        if entry['type'] not in types:
+            raise ValueError(f"Catalog item {key} has unknown type {entry['type']}")
+        when = {facet: frozenset(values) for facet, values in entry.pop('when').items()}
+        unknown = set(when) - set(FACETS)
+        if unknown:
+            raise ValueError(f"Catalog item {key} has unknown conditions {sorted(unknown)}")
+        if not when.get('context') or not when['context'] <= CONTEXTS:
+            raise ValueError(f"Catalog item {key} needs a context out of {sorted(CONTEXTS)}")
+
+        items.append(CatalogItem(
+            id=position,
+            key=key,
+            type=entry.pop('type'),
+            title=entry.pop('title'),
+            description=entry.pop('description'),
+            content=entry.pop('content'),
+            priority=int(entry.pop('priority')),
+            duration=entry.pop('duration'),
+            minutes=entry.pop('minutes'),
+            tags=frozenset(entry.pop('tags', ())),
+            when=MappingProxyType(when),
+            max_available=entry.pop('max_available', None),
+            extra=tuple(sorted(entry.items()))
+        ))
+
+    if len({item.key for item in items}) != len(items):
+        raise ValueError("Catalog item ids must be unique")
+    return RecommendationCatalog(items, types)
+
+
+# Initialize global recommendation catalog
+recommendation_catalog = None
+_recommendation_catalog_lock = threading.Lock()
+
+def get_recommendation_catalog() -> RecommendationCatalog:
+    """Get global recommendation catalog instance"""
+    global recommendation_catalog
+    if recommendation_catalog is None:
+        with _recommendation_catalog_lock:
+            if recommendation_catalog is None:
+                recommendation_catalog = load_catalog()
+    return recommendation_catalog
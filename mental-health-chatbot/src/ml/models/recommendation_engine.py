@@ -5,18 +5,50 @@ Recommendation Engine - Generates personalized mental health recommendations
 import os
 import json
 import random
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, FrozenSet
 from datetime import datetime, timedelta
 import numpy as np
+from src.nlp.crisis_detection import scan_for_crisis
+from src.ml.models.recommendation_catalog import get_recommendation_catalog, mood_band, stress_band, status_condition
+from src.ml.models.collaborative_filter import CollaborativeScorer, get_collaborative_model
+from src.ml.models.recently_shown import get_recently_shown
+from src.db.user_profile_service import get_user_profile_service
+
+# Preference flags and the catalog tags they favour
+PREFERENCE_TAGS = {'likes_exercise': 'exercise', 'likes_meditation': 'meditation', 'likes_social': 'social'}
+
+TIMES_OF_DAY = ('morning', 'afternoon', 'evening')
+
+# Share of the personalization score taken by the collaborative filter for users with completions
+COLLABORATIVE_WEIGHT = 0.3
+
+# Used for anything a user has not recorded yet
+DEFAULT_USER_DATA = {
+    'mood_score': 6,
+    'stress_level': 5,
+    'sleep_hours': 7.5,
+    'energy_level': 6,
+    'activities_completed': [],
+    'preferences': {}
+}
+
+def user_data_from_profile(features: Dict[str, Any]) -> Dict[str, Any]:
+    """Recommendation user data from profile features, with defaults for what is not recorded"""
+    user_data = dict(DEFAULT_USER_DATA)
+    user_data.update({key: value for key, value in features.items() if value is not None})
+    return user_data
 
 class RecommendationEngine:
     """Generates personalized mental health recommendations"""
     
     def __init__(self):
         """Initialize recommendation engine"""
+        self.catalog = get_recommendation_catalog()
+        collaborative_model = get_collaborative_model()
+        self.collaborative = CollaborativeScorer(collaborative_model, self.catalog) if collaborative_model else None
         self.recommendations_db = self._load_recommendations_database()
         self.user_preferences = {}
-        self.recommendation_history = {}
+        self.recently_shown = get_recently_shown()
     
     def generate_recommendations(self, 
                                user_profile: Dict[str, Any],
@@ -24,99 +56,56 @@ class RecommendationEngine:
                                assessment_results: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """Generate personalized recommendations based on user profile and context"""
         
-        # Extract key information
-        mental_health_status = user_profile.get('mental_health_status', 'healthy')
-        mood_score = user_profile.get('mood_score', 5)
-        stress_level = user_profile.get('stress_level', 5)
-        preferences = user_profile.get('preferences', {})
-        
-        # Current context
-        current_mood = current_context.get('current_mood', 'neutral')
-        time_of_day = current_context.get('time_of_day', 'morning')
-        available_time = current_context.get('available_time', 30)  # minutes
-        
-        # Generate recommendations based on different criteria
-        recommendations = []
-        
-        # 1. Crisis/emergency recommendations (highest priority)
+        # Crisis/emergency recommendations (highest priority) replace everything else
         if self._is_crisis_situation(assessment_results, current_context):
-            crisis_recs = self.get_emergency_recommendations()
-            recommendations.extend(crisis_recs)
-            return recommendations[:3]  # Return only crisis recommendations
-        
-        # 2. Mood-based recommendations
-        mood_recs = self._get_mood_based_recommendations(current_mood, mood_score)
-        recommendations.extend(mood_recs)
-        
-        # 3. Stress-based recommendations
-        stress_recs = self._get_stress_based_recommendations(stress_level, available_time)
-        recommendations.extend(stress_recs)
-        
-        # 4. Mental health status recommendations
-        status_recs = self._get_status_based_recommendations(mental_health_status, assessment_results)
-        recommendations.extend(status_recs)
-        
-        # 5. Time-based recommendations
-        time_recs = self._get_time_based_recommendations(time_of_day, available_time)
-        recommendations.extend(time_recs)
-        
-        # 6. Activity-based recommendations
-        activity_recs = self._get_activity_based_recommendations(user_profile, available_time)
-        recommendations.extend(activity_recs)
-        
-        # 7. Professional help recommendations
-        if self._should_recommend_professional_help(mental_health_status, assessment_results):
-            prof_recs = self._get_professional_help_recommendations(mental_health_status)
-            recommendations.extend(prof_recs)
-        
-        # 8. Personalized recommendations based on user history
-        personalized_recs = self._get_personalized_recommendations(user_profile, current_context)
-        recommendations.extend(personalized_recs)
-        
-        # Filter and prioritize recommendations
-        filtered_recs = self._filter_recommendations(recommendations, preferences, available_time)
-        prioritized_recs = self._prioritize_recommendations(filtered_recs, user_profile, current_context)
-        
-        # Add metadata to recommendations
-        for rec in prioritized_recs:
+            return self.get_emergency_recommendations()[:3]
+        
+        candidate_ids = self._select_candidates(user_profile, current_context, assessment_results)
+        
+        # Items shown in the last few days only come back when there are not enough others
+        user_id = user_profile.get('user_id')
+        fresh_ids = self.recently_shown.exclude(candidate_ids, self._shown_mask(user_id))
+        top_ids, scores = self._rank_candidates(fresh_ids, user_profile, current_context, limit=5)
+        if len(top_ids) < 5 and len(fresh_ids) < len(candidate_ids):
+            repeat_ids, repeat_scores = self._rank_candidates(candidate_ids - fresh_ids, user_profile, current_context,
+                                                              limit=5 - len(top_ids))
+            top_ids = np.concatenate([top_ids, repeat_ids])
+            scores = np.concatenate([scores, repeat_scores])
+        self._record_shown(user_id, top_ids.tolist())
+        
+        # Only the top recommendations are rendered, with metadata
+        recommendations = []
+        for item_id, score in zip(top_ids.tolist(), scores.tolist()):
+            rec = self.catalog.items[item_id].render(user_profile)
+            rec['personalization_score'] = round(score, 3)
             rec['generated_at'] = datetime.now().isoformat()
             rec['user_id'] = user_profile.get('user_id', 'anonymous')
             rec['context'] = current_context
+            recommendations.append(rec)
         
-        # Limit to top recommendations
-        return prioritized_recs[:5]
+        return recommendations
+    
+    def _shown_mask(self, user_id: Any) -> int:
+        """Catalog ids recently shown to a signed-in user, as a bitset"""
+        if user_id in (None, 'anonymous'):
+            return 0
+        try:
+            return self.recently_shown.shown_mask(user_id, self.catalog.fingerprint)
+        except Exception as e:
+            print(f"Error reading recently shown recommendations: {e}")
+            return 0
+    
+    def _record_shown(self, user_id: Any, item_ids: List[int]):
+        if user_id in (None, 'anonymous') or not item_ids:
+            return
+        try:
+            self.recently_shown.record(user_id, item_ids, self.catalog.fingerprint)
+        except Exception as e:
+            print(f"Error recording shown recommendations: {e}")
     
     def get_emergency_recommendations(self) -> List[Dict[str, Any]]:
         """Get emergency/crisis recommendations"""
-        return [
-            {
-                'type': 'crisis_support',
-                'title': 'Crisis Support Resources',
-                'description': 'Immediate help is available 24/7',
-                'content': 'National Suicide Prevention Lifeline: 988\nCrisis Text Line: Text HOME to 741741\nEmergency Services: 911',
-                'priority': 1,
-                'duration': 'Immediate',
-                'is_emergency': True
-            },
-            {
-                'type': 'professional_help',
-                'title': 'Emergency Mental Health Services',
-                'description': 'Connect with emergency mental health professionals',
-                'content': 'Contact your local emergency room or mental health crisis center immediately',
-                'priority': 1,
-                'duration': 'Immediate',
-                'is_emergency': True
-            },
-            {
-                'type': 'support_system',
-                'title': 'Reach Out to Support System',
-                'description': 'Contact trusted friends, family, or support groups',
-                'content': 'Call or text someone you trust. You don\'t have to go through this alone.',
-                'priority': 2,
-                'duration': '5-10 minutes',
-                'is_emergency': True
-            }
-        ]
+        return self.catalog.render(self.catalog.select(context='emergency'))
     
     def get_daily_recommendations(self, user_id: str, date: str = None) -> List[Dict[str, Any]]:
         """Get daily recommendations for a specific user and date"""
@@ -126,228 +115,51 @@ class RecommendationEngine:
         # Get user's recent mood and activity data
         user_data = self._get_user_data(user_id, date)
         
-        # Generate daily recommendations
-        recommendations = []
-        
-        # Morning routine recommendations
-        if datetime.now().hour < 12:
-            morning_recs = self._get_morning_recommendations(user_data)
-            recommendations.extend(morning_recs)
-        
-        # Afternoon recommendations
-        elif datetime.now().hour < 18:
-            afternoon_recs = self._get_afternoon_recommendations(user_data)
-            recommendations.extend(afternoon_recs)
-        
-        # Evening recommendations
-        else:
-            evening_recs = self._get_evening_recommendations(user_data)
-            recommendations.extend(evening_recs)
-        
-        return recommendations[:3]  # Limit to 3 daily recommendations
+        hour = datetime.now().hour
+        time_of_day = 'morning' if hour < 12 else 'afternoon' if hour < 18 else 'evening'
+        return self.daily_recommendations_for(user_data, (time_of_day,))
     
     def get_weekly_recommendations(self, user_id: str) -> List[Dict[str, Any]]:
         """Get weekly recommendations for goal setting and planning"""
-        user_data = self._get_user_data(user_id)
-        
-        recommendations = [
-            {
-                'type': 'weekly_planning',
-                'title': 'Weekly Mental Health Check-in',
-                'description': 'Review your week and plan for the next one',
-                'content': 'Take 15 minutes to reflect on your week. What went well? What challenges did you face? Plan one self-care activity for next week.',
-                'priority': 3,
-                'duration': '15 minutes',
-                'frequency': 'weekly'
-            },
-            {
-                'type': 'goal_setting',
-                'title': 'Set Weekly Mental Health Goals',
-                'description': 'Create achievable goals for your mental wellness',
-                'content': 'Set 2-3 small, achievable goals for this week. Examples: practice mindfulness 3 times, exercise twice, or reach out to a friend.',
-                'priority': 3,
-                'duration': '10 minutes',
-                'frequency': 'weekly'
-            }
-        ]
-        
-        # Add personalized recommendations based on user data
-        if user_data.get('stress_level', 0) > 6:
-            recommendations.append({
-                'type': 'stress_management',
-                'title': 'Weekly Stress Management Plan',
-                'description': 'Create a plan to manage stress this week',
-                'content': 'Identify your main stress sources and plan specific coping strategies. Schedule regular breaks and relaxation time.',
-                'priority': 2,
-                'duration': '20 minutes',
-                'frequency': 'weekly'
-            })
-        
-        return recommendations
+        return self.weekly_recommendations_for(self._get_user_data(user_id))
     
-    def _get_mood_based_recommendations(self, current_mood: str, mood_score: int) -> List[Dict[str, Any]]:
-        """Get recommendations based on current mood"""
-        recommendations = []
-        
-        if mood_score <= 3:  # Low mood
-            recommendations.extend([
-                {
-                    'type': 'mood_boost',
-                    'title': 'Mood-Boosting Activities',
-                    'description': 'Engage in activities that can help improve your mood',
-                    'content': 'Try listening to uplifting music, going for a walk in nature, or doing something creative like drawing or writing.',
-                    'priority': 2,
-                    'duration': '15-30 minutes'
-                },
-                {
-                    'type': 'social_connection',
-                    'title': 'Connect with Others',
-                    'description': 'Reach out to friends, family, or support groups',
-                    'content': 'Call or text someone you care about. Social connection can significantly improve mood.',
-                    'priority': 2,
-                    'duration': '10-20 minutes'
-                }
-            ])
-        elif mood_score >= 8:  # High mood
-            recommendations.extend([
-                {
-                    'type': 'mood_maintenance',
-                    'title': 'Maintain Positive Mood',
-                    'description': 'Keep up the good work and maintain your positive mood',
-                    'content': 'Continue doing what\'s working for you. Consider journaling about what\'s contributing to your good mood.',
-                    'priority': 3,
-                    'duration': '10 minutes'
-                }
-            ])
-        
-        return recommendations
+    def daily_recommendations_for(self, user_data: Dict[str, Any],
+                                  times_of_day: Tuple[str, ...] = TIMES_OF_DAY) -> List[Dict[str, Any]]:
+        """Daily recommendations for already loaded user data; all times of day give the whole day's plan"""
+        item_ids = self.catalog.select(context='daily', time_of_day=times_of_day)
+        return self.catalog.render(item_ids, user_data)[:3]  # Limit to 3 daily recommendations
     
-    def _get_stress_based_recommendations(self, stress_level: int, available_time: int) -> List[Dict[str, Any]]:
-        """Get recommendations based on stress level"""
-        recommendations = []
-        
-        if stress_level >= 7:  # High stress
-            if available_time >= 30:
-                recommendations.append({
-                    'type': 'stress_relief',
-                    'title': 'Deep Relaxation Session',
-                    'description': 'Take time for a comprehensive stress relief session',
-                    'content': 'Try progressive muscle relaxation, guided meditation, or a calming bath. Focus on deep breathing.',
-                    'priority': 1,
-                    'duration': '30 minutes'
-                })
-            else:
-                recommendations.append({
-                    'type': 'quick_stress_relief',
-                    'title': 'Quick Stress Relief',
-                    'description': 'Fast techniques to reduce stress in the moment',
-                    'content': 'Try the 4-7-8 breathing technique: Inhale for 4 counts, hold for 7, exhale for 8. Repeat 3 times.',
-                    'priority': 1,
-                    'duration': '5 minutes'
-                })
-        elif stress_level >= 5:  # Moderate stress
-            recommendations.append({
-                'type': 'stress_management',
-                'title': 'Stress Management Techniques',
-                'description': 'Practice techniques to manage moderate stress',
-                'content': 'Try mindfulness meditation, gentle stretching, or a short walk. Focus on being present in the moment.',
-                'priority': 2,
-                'duration': '15 minutes'
-            })
-        
-        return recommendations
+    def weekly_recommendations_for(self, user_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Weekly recommendations for already loaded user data"""
+        # Planning and goal setting every week, plus a stress plan for stressed users
+        item_ids = self.catalog.select(context='weekly', stress=stress_band(user_data.get('stress_level', 0)))
+        return self.catalog.render(item_ids, user_data)
     
-    def _get_status_based_recommendations(self, mental_health_status: str, assessment_results: Optional[Dict]) -> List[Dict[str, Any]]:
-        """Get recommendations based on mental health status"""
-        recommendations = []
-        
-        if 'depression' in mental_health_status:
-            severity = assessment_results.get('severity_level', 'mild') if assessment_results else 'mild'
-            
-            if severity in ['moderate', 'severe']:
-                recommendations.append({
-                    'type': 'professional_help',
-                    'title': 'Professional Support for Depression',
-                    'description': 'Consider seeking professional help for depression',
-                    'content': 'Depression is treatable. Consider reaching out to a therapist or counselor who specializes in depression treatment.',
-                    'priority': 1,
-                    'duration': 'Ongoing',
-                    'requires_professional': True
-                })
-            
-            recommendations.append({
-                'type': 'depression_management',
-                'title': 'Depression Management Strategies',
-                'description': 'Evidence-based strategies for managing depression',
-                'content': 'Try behavioral activation: engage in activities you used to enjoy, even if you don\'t feel like it. Start small.',
-                'priority': 2,
-                'duration': '20-30 minutes'
-            })
-        
-        elif 'anxiety' in mental_health_status:
-            recommendations.append({
-                'type': 'anxiety_management',
-                'title': 'Anxiety Management Techniques',
-                'description': 'Proven techniques for managing anxiety',
-                'content': 'Practice grounding techniques: Name 5 things you can see, 4 you can touch, 3 you can hear, 2 you can smell, 1 you can taste.',
-                'priority': 2,
-                'duration': '10-15 minutes'
-            })
-        
-        return recommendations
-    
-    def _get_time_based_recommendations(self, time_of_day: str, available_time: int) -> List[Dict[str, Any]]:
-        """Get recommendations based on time of day"""
-        recommendations = []
-        
-        if time_of_day == 'morning':
-            recommendations.append({
-                'type': 'morning_routine',
-                'title': 'Morning Mental Health Routine',
-                'description': 'Start your day with positive mental health practices',
-                'content': 'Try gratitude journaling, gentle stretching, or a short meditation to set a positive tone for your day.',
-                'priority': 3,
-                'duration': '10-15 minutes'
-            })
-        elif time_of_day == 'evening':
-            recommendations.append({
-                'type': 'evening_wind_down',
-                'title': 'Evening Wind-Down Routine',
-                'description': 'Prepare your mind and body for restful sleep',
-                'content': 'Create a calming bedtime routine: dim lights, avoid screens, try gentle breathing exercises or light reading.',
-                'priority': 3,
-                'duration': '20-30 minutes'
-            })
-        
-        return recommendations
-    
-    def _get_activity_based_recommendations(self, user_profile: Dict, available_time: int) -> List[Dict[str, Any]]:
-        """Get recommendations based on user activity preferences"""
-        recommendations = []
-        
+    def _select_candidates(self, user_profile: Dict[str, Any], current_context: Dict[str, Any],
+                           assessment_results: Optional[Dict[str, Any]]) -> FrozenSet[int]:
+        """Catalog ids matching the user's state, with items that do not fit time or preferences removed"""
+        mental_health_status = user_profile.get('mental_health_status', 'healthy')
         preferences = user_profile.get('preferences', {})
-        activity_level = preferences.get('activity_level', 'moderate')
-        
-        if activity_level == 'low' and available_time >= 20:
-            recommendations.append({
-                'type': 'gentle_activity',
-                'title': 'Gentle Physical Activity',
-                'description': 'Low-impact activities for mental wellness',
-                'content': 'Try gentle yoga, tai chi, or a leisurely walk. Physical activity releases endorphins that improve mood.',
-                'priority': 3,
-                'duration': '20-30 minutes'
-            })
-        elif activity_level == 'high' and available_time >= 30:
-            recommendations.append({
-                'type': 'energetic_activity',
-                'title': 'Energetic Physical Activity',
-                'description': 'Higher intensity activities for stress relief',
-                'content': 'Try running, dancing, or a workout session. High-intensity exercise can be very effective for stress relief.',
-                'priority': 3,
-                'duration': '30-45 minutes'
-            })
+        available_time = current_context.get('available_time', 30)  # minutes
         
-        return recommendations
+        candidate_ids = self.catalog.select(
+            context='chat',
+            mood=mood_band(user_profile.get('mood_score', 5)),
+            stress=stress_band(user_profile.get('stress_level', 5)),
+            status=status_condition(mental_health_status),
+            severity=(assessment_results or {}).get('severity_level', 'mild'),
+            time_of_day=current_context.get('time_of_day', 'morning'),
+            activity_level=preferences.get('activity_level', 'moderate'),
+            professional='recommended' if self._should_recommend_professional_help(mental_health_status, assessment_results) else None,
+            profile=[field for field in ('successful_activities', 'goals', 'current_challenges') if user_profile.get(field)]
+        )
+        
+        excluded = self.catalog.not_fitting(available_time)
+        if not preferences.get('likes_exercise', True):
+            excluded = excluded | self.catalog.by_tag('exercise')
+        if not preferences.get('likes_meditation', True):
+            excluded = excluded | self.catalog.by_tag('meditation')
+        return candidate_ids - excluded
     
     def _is_crisis_situation(self, assessment_results: Optional[Dict], current_context: Dict) -> bool:
         """Check if this is a crisis situation requiring immediate attention"""
@@ -359,55 +171,11 @@ class RecommendationEngine:
         if risk_level == 'crisis':
             return True
         
-        # Check for specific crisis keywords in context
-        crisis_keywords = ['suicide', 'kill myself', 'end it all', 'not worth living']
-        user_message = current_context.get('user_message', '').lower()
-        if any(keyword in user_message for keyword in crisis_keywords):
-            return True
-        
-        return False
-    
-    def _get_personalized_recommendations(self, user_profile: Dict, current_context: Dict) -> List[Dict[str, Any]]:
-        """Generate personalized recommendations based on user history and preferences"""
-        recommendations = []
-        
-        # Get user's past successful activities
-        past_activities = user_profile.get('successful_activities', [])
-        if past_activities:
-            recommendations.append({
-                'type': 'proven_activity',
-                'title': 'Try a Previously Helpful Activity',
-                'description': 'Engage in an activity that has helped you before',
-                'content': f'Consider trying: {", ".join(past_activities[:3])}. These activities have been helpful for you in the past.',
-                'priority': 2,
-                'duration': '15-30 minutes'
-            })
-        
-        # Get user's goals
-        goals = user_profile.get('goals', [])
-        if goals:
-            recommendations.append({
-                'type': 'goal_progress',
-                'title': 'Work on Your Goals',
-                'description': 'Make progress on your mental health goals',
-                'content': f'Focus on: {goals[0]}. Take a small step towards achieving this goal today.',
-                'priority': 3,
-                'duration': '20-30 minutes'
-            })
-        
-        # Get user's challenges
-        challenges = user_profile.get('current_challenges', [])
-        if challenges:
-            recommendations.append({
-                'type': 'challenge_support',
-                'title': 'Address Current Challenges',
-                'description': 'Get support for your current challenges',
-                'content': f'Consider seeking support for: {challenges[0]}. You don\'t have to face this alone.',
-                'priority': 2,
-                'duration': 'Varies'
-            })
+        # Reuse the caller's crisis scan when it already ran, otherwise scan the message
+        if 'crisis_detected' in current_context:
+            return bool(current_context['crisis_detected'])
         
-        return recommendations
+        return scan_for_crisis(current_context.get('user_message', '')).is_crisis
     
     def _should_recommend_professional_help(self, mental_health_status: str, assessment_results: Optional[Dict]) -> bool:
         """Determine if professional help should be recommended"""
@@ -419,99 +187,66 @@ class RecommendationEngine:
         high_risk_statuses = ['severe_depression', 'severe_anxiety', 'bipolar']
         return mental_health_status in high_risk_statuses
     
-    def _get_professional_help_recommendations(self, mental_health_status: str) -> List[Dict[str, Any]]:
-        """Get professional help recommendations"""
-        return [
-            {
-                'type': 'professional_help',
-                'title': 'Mental Health Professional',
-                'description': 'Connect with a qualified mental health professional',
-                'content': 'Consider reaching out to a therapist, psychologist, or psychiatrist. They can provide specialized treatment and support.',
-                'priority': 1,
-                'duration': 'Ongoing',
-                'requires_professional': True
-            },
-            {
-                'type': 'support_group',
-                'title': 'Support Group',
-                'description': 'Join a support group for shared experiences',
-                'content': 'Support groups can provide understanding, shared experiences, and practical advice from others facing similar challenges.',
-                'priority': 2,
-                'duration': '1-2 hours weekly'
-            }
-        ]
-    
-    def _filter_recommendations(self, recommendations: List[Dict], preferences: Dict, available_time: int) -> List[Dict[str, Any]]:
-        """Filter recommendations based on user preferences and constraints"""
-        filtered = []
-        
-        for rec in recommendations:
-            # Check time constraints
-            if rec.get('duration') and 'minutes' in str(rec['duration']):
-                try:
-                    duration = int(rec['duration'].split()[0])
-                    if duration > available_time:
-                        continue
-                except:
-                    pass
-            
-            # Check user preferences
-            rec_type = rec.get('type', '')
-            if rec_type in ['physical_activity'] and not preferences.get('likes_exercise', True):
-                continue
-            
-            if rec_type in ['meditation'] and not preferences.get('likes_meditation', True):
-                continue
-            
-            filtered.append(rec)
-        
-        return filtered
+    def _rank_candidates(self, candidate_ids: FrozenSet[int], user_profile: Dict, current_context: Dict,
+                         limit: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Top candidate ids by priority (1 = highest), then personalization score, then catalog order.
+        
+        The whole catalog is scored with one matrix-vector product; the top ``limit``
+        candidates are picked with argpartition and only those are sorted. Users with
+        completed recommendations get the collaborative filter's scores blended in
+        for the items it has learned from.
+        """
+        if not candidate_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        
+        ids = np.fromiter(candidate_ids, dtype=np.int64, count=len(candidate_ids))
+        scores = np.clip(0.5 + self.catalog.features @ self._preference_vector(user_profile, current_context), 0.0, 1.0)[ids]
+        collaborative_scores = self._collaborative_scores(user_profile)
+        if collaborative_scores is not None:
+            # Items without interaction data keep their content score instead of being scaled down
+            blended = (1.0 - COLLABORATIVE_WEIGHT) * scores + COLLABORATIVE_WEIGHT * collaborative_scores[ids]
+            scores = np.where(self.collaborative.known[ids], blended, scores)
+        # Scores stay within [0, 1], so a priority step of 2 always outranks them; the id term breaks ties
+        rank = 2.0 * self.catalog.priorities[ids] - scores + ids * 1e-9
+        
+        if len(ids) > limit:
+            top = np.argpartition(rank, limit - 1)[:limit]
+            top = top[np.argsort(rank[top])]
+        else:
+            top = np.argsort(rank)
+        return ids[top], scores[top]
     
-    def _prioritize_recommendations(self, recommendations: List[Dict], user_profile: Dict, current_context: Dict) -> List[Dict[str, Any]]:
-        """Prioritize recommendations based on user needs and context"""
-        # Sort by priority (1 = highest, 3 = lowest)
-        recommendations.sort(key=lambda x: x.get('priority', 3))
-        
-        # Add personalization score
-        for rec in recommendations:
-            rec['personalization_score'] = self._calculate_personalization_score(rec, user_profile, current_context)
-        
-        # Sort by personalization score within priority groups
-        recommendations.sort(key=lambda x: (x.get('priority', 3), -x.get('personalization_score', 0)))
-        
-        return recommendations
+    def _collaborative_scores(self, user_profile: Dict) -> Optional[np.ndarray]:
+        """Collaborative-filter scores over the catalog, or None without a model or completions"""
+        completed_items = user_profile.get('completed_items')
+        if not self.collaborative or not completed_items:
+            return None
+        return self.collaborative.score(completed_items)
     
-    def _calculate_personalization_score(self, recommendation: Dict, user_profile: Dict, current_context: Dict) -> float:
-        """Calculate how well a recommendation matches user preferences and context"""
-        score = 0.0
+    def _preference_vector(self, user_profile: Dict, current_context: Dict) -> np.ndarray:
+        """Weights over the catalog feature columns for a user and their current context"""
+        columns = self.catalog.feature_columns
+        weights = np.zeros(len(columns), dtype=np.float32)
         
-        # Base score
-        score += 0.5
+        def boost(column: str, weight: float):
+            if column in columns:
+                weights[columns[column]] += weight
         
         # Match with user preferences
         preferences = user_profile.get('preferences', {})
-        rec_type = recommendation.get('type', '')
-        
-        if rec_type == 'physical_activity' and preferences.get('likes_exercise', False):
-            score += 0.3
+        for preference, tag in PREFERENCE_TAGS.items():
+            if preferences.get(preference, False):
+                boost(f"tag:{tag}", 0.3)
         
-        if rec_type == 'meditation' and preferences.get('likes_meditation', False):
-            score += 0.3
+        # Match with current mood and mental health status
+        boost(f"mood:{mood_band(user_profile.get('mood_score', 5))}", 0.2)
+        boost(f"status:{status_condition(user_profile.get('mental_health_status', 'healthy'))}", 0.2)
         
-        if rec_type == 'social_connection' and preferences.get('likes_social', False):
-            score += 0.3
+        # Slightly favour shorter items when little time is available
+        available_time = max(current_context.get('available_time', 30), 5)
+        boost('minutes', -3.0 / available_time)
         
-        # Match with current context
-        current_mood = current_context.get('current_mood', 'neutral')
-        if 'mood' in rec_type and current_mood in recommendation.get('content', '').lower():
-            score += 0.2
-        
-        # Match with mental health status
-        mental_health_status = user_profile.get('mental_health_status', 'healthy')
-        if mental_health_status in recommendation.get('content', '').lower():
-            score += 0.2
-        
-        return min(score, 1.0)
+        return weights
     
     def _load_recommendations_database(self) -> Dict[str, Any]:
         """Load recommendations database"""
@@ -531,57 +266,10 @@ class RecommendationEngine:
         }
     
     def _get_user_data(self, user_id: str, date: str = None) -> Dict[str, Any]:
-        """Get user data for recommendations"""
-        # This would typically query the database
-        # For now, return sample data
-        return {
-            'mood_score': 6,
-            'stress_level': 5,
-            'sleep_hours': 7.5,
-            'energy_level': 6,
-            'activities_completed': [],
-            'preferences': {
-                'likes_exercise': True,
-                'likes_meditation': False,
-                'likes_social': True
-            }
-        }
-    
-    def _get_morning_recommendations(self, user_data: Dict) -> List[Dict[str, Any]]:
-        """Get morning-specific recommendations"""
-        return [
-            {
-                'type': 'morning_mindfulness',
-                'title': 'Morning Mindfulness',
-                'description': 'Start your day with intention and awareness',
-                'content': 'Take 5 minutes to sit quietly and set an intention for your day. What do you want to focus on?',
-                'priority': 3,
-                'duration': '5 minutes'
-            }
-        ]
-    
-    def _get_afternoon_recommendations(self, user_data: Dict) -> List[Dict[str, Any]]:
-        """Get afternoon-specific recommendations"""
-        return [
-            {
-                'type': 'afternoon_break',
-                'title': 'Afternoon Mental Break',
-                'description': 'Take a break to recharge your mental energy',
-                'content': 'Step away from work and take a 10-minute walk or do some gentle stretching.',
-                'priority': 3,
-                'duration': '10 minutes'
-            }
-        ]
-    
-    def _get_evening_recommendations(self, user_data: Dict) -> List[Dict[str, Any]]:
-        """Get evening-specific recommendations"""
-        return [
-            {
-                'type': 'evening_reflection',
-                'title': 'Evening Reflection',
-                'description': 'Reflect on your day and prepare for rest',
-                'content': 'Write down three things that went well today and one thing you\'re grateful for.',
-                'priority': 3,
-                'duration': '10 minutes'
-            }
-        ]
\ No newline at end of file
+        """Get user data for recommendations from the materialized user profile"""
+        try:
+            features = get_user_profile_service().get(int(user_id))
+        except Exception as e:
+            print(f"User profile unavailable for {user_id}, using defaults: {e}")
+            features = {}
+        return user_data_from_profile(features)
\ No newline at end of file
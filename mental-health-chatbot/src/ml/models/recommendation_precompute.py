@@ -0,0 +1,239 @@
+"""
+Recommendation Precompute - Nightly batch of every user's daily and weekly recommendations
+"""
+
+import os
+import json
+import time
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, List, Any, Iterator, Callable
+from sqlalchemy import insert, delete, or_, and_
+from src.db.database import db
+from src.db.models import User, Recommendation
+from src.db.user_profile_service import get_user_profile_service
+from src.ml.models.recommendation_engine import RecommendationEngine, user_data_from_profile
+
+CHECKPOINT_PATH = (os.environ.get('RECOMMENDATION_PRECOMPUTE_CHECKPOINT')
+                   or os.path.join(tempfile.gettempdir(), 'recommendation_precompute.json'))
+
+def week_start(day: date) -> date:
+    """Monday of the week ``day`` falls in; weekly rows are keyed by it"""
+    return day - timedelta(days=day.weekday())
+
+def stored_recommendations(user_id: int, day: date = None) -> List[Recommendation]:
+    """A user's precomputed rows for ``day`` and its week, read through the (user_id, cadence, valid_for) index"""
+    day = day or date.today()
+    return (Recommendation.query
+            .filter(Recommendation.user_id == user_id,
+                    or_(and_(Recommendation.cadence == 'daily', Recommendation.valid_for == day),
+                        and_(Recommendation.cadence == 'weekly', Recommendation.valid_for == week_start(day))))
+            .order_by(Recommendation.priority, Recommendation.id)
+            .all())
+
+def record_shown_recommendations(user_id: int, recommendations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Store on-demand recommendations a user is shown, so they can be completed and learned from.
+
+    Catalog items the user already has an open on-demand row for reuse it. Each
+    recommendation gets its row id as ``recommendation_id``. Failures are logged
+    and leave the recommendations as they were.
+    """
+    keyed = [rec for rec in recommendations if rec.get('id')]
+    if not keyed:
+        return recommendations
+    try:
+        open_rows = {row.catalog_key: row for row in Recommendation.query.filter(
+            Recommendation.user_id == user_id,
+            Recommendation.cadence.is_(None),
+            Recommendation.is_completed.is_(False),
+            Recommendation.catalog_key.in_([rec['id'] for rec in keyed])
+        )}
+        for rec in keyed:
+            if rec['id'] not in open_rows:
+                open_rows[rec['id']] = Recommendation(
+                    user_id=user_id,
+                    recommendation_type=rec['type'],
+                    title=rec['title'],
+                    description=rec['description'],
+                    content=rec.get('content'),
+                    priority=rec.get('priority', 3),
+                    catalog_key=rec['id']
+                )
+                db.session.add(open_rows[rec['id']])
+        db.session.commit()
+        for rec in keyed:
+            rec['recommendation_id'] = open_rows[rec['id']].id
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error recording shown recommendations: {e}")
+    return recommendations
+
+
+# Engine built once per worker process
+_worker_engine = None
+
+def _init_worker():
+    global _worker_engine
+    _worker_engine = RecommendationEngine()
+
+def compute_partition(profiles: List[Dict[str, Any]], day: date) -> List[Dict[str, Any]]:
+    """Recommendation rows for a partition of user profiles; runs in a worker process without database access"""
+    if _worker_engine is None:
+        _init_worker()
+
+    rows = []
+    for features in profiles:
+        user_data = user_data_from_profile(features)
+        batches = (('daily', day, _worker_engine.daily_recommendations_for(user_data)),
+                   ('weekly', week_start(day), _worker_engine.weekly_recommendations_for(user_data)))
+        for cadence, valid_for, recommendations in batches:
+            for rec in recommendations:
+                rows.append({
+                    'user_id': features['user_id'],
+                    'recommendation_type': rec['type'],
+                    'title': rec['title'],
+                    'description': rec['description'],
+                    'content': rec['content'],
+                    'priority': rec['priority'],
+                    'cadence': cadence,
+                    'catalog_key': rec['id'],
+                    'valid_for': valid_for
+                })
+    return rows
+
+
+def new_checkpoint(day: date) -> Dict[str, Any]:
+    """State of a run for ``day`` that has not stored anything yet"""
+    return {'day': day.isoformat(), 'last_user_id': 0, 'users': 0, 'rows': 0, 'completed': False}
+
+def load_checkpoint(path: str, day: date) -> Dict[str, Any]:
+    """Progress of an earlier run for ``day``, or a fresh state"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state.get('day') == day.isoformat():
+            return state
+    except (OSError, ValueError):
+        pass
+    return new_checkpoint(day)
+
+def save_checkpoint(path: str, state: Dict[str, Any]):
+    """Write the checkpoint atomically, so a crash never leaves it half written"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(temp_path, path)
+
+def _user_partitions(after_user_id: int, partition_size: int) -> Iterator[List[int]]:
+    """Active user ids in id order, one keyset-paginated query per partition"""
+    while True:
+        partition = [user_id for user_id, in User.query
+                     .with_entities(User.id)
+                     .filter(User.is_active.is_(True), User.id > after_user_id)
+                     .order_by(User.id)
+                     .limit(partition_size)]
+        if not partition:
+            return
+        yield partition
+        after_user_id = partition[-1]
+
+def _replace_rows(user_ids: List[int], rows: List[Dict[str, Any]], day: date, insert_chunk: int) -> int:
+    """Swap a partition's uncompleted precomputed rows for fresh ones in one transaction.
+
+    Earlier days and weeks go too, so the table holds one set of open rows per user;
+    completed rows stay as history. An item already completed for the same day or
+    week keeps its completed row and gets no second, open one. Returns the rows inserted.
+    """
+    db.session.execute(
+        delete(Recommendation)
+        .where(Recommendation.user_id.in_(user_ids),
+               Recommendation.is_completed.is_(False),
+               or_(and_(Recommendation.cadence == 'daily', Recommendation.valid_for <= day),
+                   and_(Recommendation.cadence == 'weekly', Recommendation.valid_for <= week_start(day))))
+        .execution_options(synchronize_session=False)
+    )
+    completed = set(
+        db.session.query(Recommendation.user_id, Recommendation.cadence, Recommendation.catalog_key)
+        .filter(Recommendation.user_id.in_(user_ids),
+                Recommendation.is_completed.is_(True),
+                or_(and_(Recommendation.cadence == 'daily', Recommendation.valid_for == day),
+                    and_(Recommendation.cadence == 'weekly', Recommendation.valid_for == week_start(day))))
+    )
+    rows = [row for row in rows if (row['user_id'], row['cadence'], row['catalog_key']) not in completed]
+    for start in range(0, len(rows), insert_chunk):
+        db.session.execute(insert(Recommendation), rows[start:start + insert_chunk])
+    db.session.commit()
+    return len(rows)
+
+def precompute_recommendations(day: date = None, workers: int = 4, partition_size: int = 200,
+                               insert_chunk: int = 1000, checkpoint_path: str = None, resume: bool = True,
+                               progress: Callable[[Dict[str, Any]], None] = None) -> Dict[str, Any]:
+    """Compute and store every active user's daily and weekly recommendations (needs an app context).
+
+    Users are split into id-ordered partitions. Each partition's profiles are
+    loaded in bulk here, ranked in a worker process and written back with
+    chunked bulk inserts. Partitions are stored in order and the checkpoint
+    moves past each one after its commit, so an interrupted run resumes after
+    the last stored partition. ``workers`` of 0 or 1 computes in-process.
+    """
+    day = day or date.today()
+    path = checkpoint_path or CHECKPOINT_PATH
+    state = load_checkpoint(path, day) if resume else new_checkpoint(day)
+    resumed_from = state['last_user_id'] or None
+    service = get_user_profile_service()
+    started = time.perf_counter()
+    run = {'users': 0, 'rows': 0, 'partitions': 0}
+
+    def report() -> Dict[str, Any]:
+        elapsed = time.perf_counter() - started
+        return {
+            'day': state['day'],
+            'workers': workers,
+            'resumed_from': resumed_from,
+            'users': run['users'],
+            'rows': run['rows'],
+            'partitions': run['partitions'],
+            'total_users': state['users'],
+            'elapsed_seconds': round(elapsed, 2),
+            'users_per_second': round(run['users'] / elapsed, 1) if elapsed else 0.0,
+            'rows_per_second': round(run['rows'] / elapsed, 1) if elapsed else 0.0,
+            'completed': state['completed']
+        }
+
+    def store(partition: List[int], rows: List[Dict[str, Any]]):
+        stored = _replace_rows(partition, rows, day, insert_chunk)
+        state['last_user_id'] = partition[-1]
+        state['users'] += len(partition)
+        state['rows'] += stored
+        save_checkpoint(path, state)
+        run['users'] += len(partition)
+        run['rows'] += stored
+        run['partitions'] += 1
+        if progress:
+            progress(report())
+
+    def profiles_for(partition: List[int]) -> List[Dict[str, Any]]:
+        return list(service.load_many(partition).values())
+
+    partitions = _user_partitions(state['last_user_id'], partition_size)
+    if workers <= 1:
+        for partition in partitions:
+            store(partition, compute_partition(profiles_for(partition), day))
+    else:
+        # A bounded window of partitions in flight keeps every worker busy without loading all profiles up front
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            pending = deque()
+            for partition in partitions:
+                pending.append((partition, executor.submit(compute_partition, profiles_for(partition), day)))
+                if len(pending) >= workers * 2:
+                    partition, future = pending.popleft()
+                    store(partition, future.result())
+            while pending:
+                partition, future = pending.popleft()
+                store(partition, future.result())
+
+    state['completed'] = True
+    save_checkpoint(path, state)
+    return report()
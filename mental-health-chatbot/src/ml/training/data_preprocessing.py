@@ -5,18 +5,22 @@ Data Preprocessing for Machine Learning Models
 import pandas as pd
 import numpy as np
 from typing import List, Dict, Any, Tuple
+from scipy import sparse
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.feature_extraction.text import TfidfVectorizer
+from src.ml.models.mental_health_classifier import assemble_features
+from src.ml.models.feature_spec import FeatureSpec
 import re
 
 class DataPreprocessor:
     """Data preprocessing utilities for mental health models"""
     
-    def __init__(self):
+    def __init__(self, max_features: int = 1000):
         """Initialize data preprocessor"""
-        self.text_vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
+        self.text_vectorizer = TfidfVectorizer(max_features=max_features, stop_words='english')
         self.scaler = StandardScaler()
         self.label_encoder = LabelEncoder()
+        self.feature_spec = FeatureSpec()
         self.is_fitted = False
     
     def preprocess_text(self, text: str) -> str:
@@ -35,14 +39,13 @@ class DataPreprocessor:
         
         return text
     
-    def preprocess_mental_health_data(self, data: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
-        """Preprocess mental health data for training"""
+    def preprocess_mental_health_data(self, data: List[Dict[str, Any]]) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        """Preprocess mental health data for training; features come back as a CSR matrix"""
         if not data:
             return np.array([]), np.array([])
         
-        # Extract features
+        # Extract features; numerical columns are read straight from the items by the feature spec
         text_features = []
-        numerical_features = []
         labels = []
         
         for item in data:
@@ -51,67 +54,45 @@ class DataPreprocessor:
             processed_text = self.preprocess_text(text)
             text_features.append(processed_text)
             
-            # Numerical features
-            numerical = [
-                item.get('mood_score', 5),
-                item.get('stress_level', 5),
-                item.get('sleep_hours', 8),
-                item.get('energy_level', 5),
-                item.get('social_activity', 5),
-                item.get('physical_activity', 5)
-            ]
-            numerical_features.append(numerical)
-            
             # Labels
             labels.append(item.get('label', 'healthy'))
         
         # Vectorize text features
         text_vectorized = self.text_vectorizer.fit_transform(text_features)
+        self.feature_spec = FeatureSpec(text_width=len(self.text_vectorizer.vocabulary_))
         
         # Scale numerical features
-        numerical_scaled = self.scaler.fit_transform(numerical_features)
+        numerical_scaled = self.scaler.fit_transform(self.feature_spec.fill(data))
         
         # Encode labels
         labels_encoded = self.label_encoder.fit_transform(labels)
         
         # Combine features
-        combined_features = np.hstack([text_vectorized.toarray(), numerical_scaled])
+        combined_features = assemble_features(text_vectorized, numerical_scaled)
         
         self.is_fitted = True
         
         return combined_features, labels_encoded
     
-    def transform_new_data(self, data: List[Dict[str, Any]]) -> np.ndarray:
+    def transform_new_data(self, data: List[Dict[str, Any]]) -> sparse.csr_matrix:
         """Transform new data using fitted preprocessors"""
         if not self.is_fitted:
             raise ValueError("Preprocessor must be fitted before transforming new data")
         
         text_features = []
-        numerical_features = []
         
         for item in data:
             # Text features
             text = item.get('text', '')
             processed_text = self.preprocess_text(text)
             text_features.append(processed_text)
-            
-            # Numerical features
-            numerical = [
-                item.get('mood_score', 5),
-                item.get('stress_level', 5),
-                item.get('sleep_hours', 8),
-                item.get('energy_level', 5),
-                item.get('social_activity', 5),
-                item.get('physical_activity', 5)
-            ]
-            numerical_features.append(numerical)
         
         # Transform using fitted preprocessors
         text_vectorized = self.text_vectorizer.transform(text_features)
-        numerical_scaled = self.scaler.transform(numerical_features)
+        numerical_scaled = self.scaler.transform(self.feature_spec.fill(data), copy=False)
         
         # Combine features
-        combined_features = np.hstack([text_vectorized.toarray(), numerical_scaled])
+        combined_features = assemble_features(text_vectorized, numerical_scaled)
         
         return combined_features
     
@@ -121,10 +102,8 @@ class DataPreprocessor:
             return []
         
         text_features = self.text_vectorizer.get_feature_names_out()
-        numerical_features = ['mood_score', 'stress_level', 'sleep_hours', 
-                            'energy_level', 'social_activity', 'physical_activity']
         
-        return list(text_features) + numerical_features
+        return list(text_features) + list(self.feature_spec.names)
     
     def get_class_names(self) -> List[str]:
         """Get class names"""
@@ -2,17 +2,117 @@
 Conversation Context Module - Manages conversation state and context
 """
 
+import sys
 import json
-from typing import Dict, List, Any, Optional
+import time
+import threading
+from typing import Dict, List, Any, Optional, NamedTuple, Union
 from datetime import datetime, timedelta
 from collections import deque
 
+
+def _intern_label(value: Any, default: str) -> str:
+    """Intern enum-like labels so every record shares one string object per label"""
+    return sys.intern(str(value)) if value else sys.intern(default)
+
+
+def _to_epoch(value: Union[float, int, str, None]) -> float:
+    """Convert a stored timestamp (epoch or ISO string) to epoch seconds"""
+    if value is None:
+        return time.time()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _to_iso(timestamp: float) -> str:
+    """Convert epoch seconds to the ISO string used at the JSON boundary"""
+    return datetime.fromtimestamp(timestamp).isoformat()
+
+
+class MessageRecord(NamedTuple):
+    """Compact conversation message record"""
+    sender: str
+    content: str
+    timestamp: float
+    metadata: Dict[str, Any]
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'MessageRecord':
+        return cls(
+            sender=_intern_label(data.get('sender'), 'user'),
+            content=data.get('content', ''),
+            timestamp=_to_epoch(data.get('timestamp')),
+            metadata=data.get('metadata') or {}
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'sender': self.sender,
+            'content': self.content,
+            'timestamp': _to_iso(self.timestamp),
+            'metadata': self.metadata
+        }
+
+
+class SentimentRecord(NamedTuple):
+    """Compact sentiment analysis record"""
+    timestamp: float
+    polarity: float
+    sentiment_label: str
+    confidence: float
+    emotions: Dict[str, Any]
+    risk_level: str
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SentimentRecord':
+        return cls(
+            timestamp=_to_epoch(data.get('timestamp')),
+            polarity=data.get('polarity', 0),
+            sentiment_label=_intern_label(data.get('sentiment_label'), 'neutral'),
+            confidence=data.get('confidence', 0),
+            emotions=data.get('emotions') or {},
+            risk_level=_intern_label(data.get('risk_level'), 'low')
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        entry = self._asdict()
+        entry['timestamp'] = _to_iso(self.timestamp)
+        return entry
+
+
+class IntentRecord(NamedTuple):
+    """Compact intent detection record"""
+    timestamp: float
+    primary_intent: str
+    confidence: float
+    urgency_level: str
+    all_intents: Dict[str, float]
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'IntentRecord':
+        return cls(
+            timestamp=_to_epoch(data.get('timestamp')),
+            primary_intent=_intern_label(data.get('primary_intent'), 'general_question'),
+            confidence=data.get('confidence', 0),
+            urgency_level=_intern_label(data.get('urgency_level'), 'low'),
+            all_intents=data.get('all_intents') or {}
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        entry = self._asdict()
+        entry['timestamp'] = _to_iso(self.timestamp)
+        return entry
+
+
 class ConversationContext:
     """Manages conversation context and state"""
     
     def __init__(self, max_history: int = 20):
         """Initialize conversation context"""
         self.max_history = max_history
+        # Guards the history, which background work (crisis follow-ups) appends to concurrently
+        self._lock = threading.RLock()
         self.context = {
             'session_id': None,
             'user_id': None,
@@ -37,7 +137,8 @@ class ConversationContext:
         self.context['user_id'] = user_id
         self.context['session_start'] = datetime.now()
         self.context['last_activity'] = datetime.now()
-        self.context['conversation_history'].clear()
+        with self._lock:
+            self.context['conversation_history'].clear()
         self.context['sentiment_history'].clear()
         self.context['intent_history'].clear()
         self.context['recommendations_given'].clear()
@@ -46,26 +147,27 @@ class ConversationContext:
     
     def add_message(self, sender: str, content: str, metadata: Dict[str, Any] = None):
         """Add a message to conversation history"""
-        message = {
-            'sender': sender,
-            'content': content,
-            'timestamp': datetime.now().isoformat(),
-            'metadata': metadata or {}
-        }
-        
-        self.context['conversation_history'].append(message)
-        self.context['last_activity'] = datetime.now()
+        message = MessageRecord(
+            sender=_intern_label(sender, 'user'),
+            content=content,
+            timestamp=time.time(),
+            metadata=metadata or {}
+        )
+        
+        with self._lock:
+            self.context['conversation_history'].append(message)
+            self.context['last_activity'] = datetime.now()
     
     def update_sentiment(self, sentiment_data: Dict[str, Any]):
         """Update sentiment analysis data"""
-        sentiment_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'polarity': sentiment_data.get('polarity', 0),
-            'sentiment_label': sentiment_data.get('sentiment_label', 'neutral'),
-            'confidence': sentiment_data.get('confidence', 0),
-            'emotions': sentiment_data.get('emotions', {}),
-            'risk_level': sentiment_data.get('risk_level', 'low')
-        }
+        sentiment_entry = SentimentRecord(
+            timestamp=time.time(),
+            polarity=sentiment_data.get('polarity', 0),
+            sentiment_label=_intern_label(sentiment_data.get('sentiment_label'), 'neutral'),
+            confidence=sentiment_data.get('confidence', 0),
+            emotions=sentiment_data.get('emotions', {}),
+            risk_level=_intern_label(sentiment_data.get('risk_level'), 'low')
+        )
         
         self.context['sentiment_history'].append(sentiment_entry)
         
@@ -79,13 +181,13 @@ class ConversationContext:
     
     def update_intent(self, intent_data: Dict[str, Any]):
         """Update intent detection data"""
-        intent_entry = {
-            'timestamp': datetime.now().isoformat(),
-            'primary_intent': intent_data.get('primary_intent', 'general_question'),
-            'confidence': intent_data.get('confidence', 0),
-            'urgency_level': intent_data.get('urgency_level', 'low'),
-            'all_intents': intent_data.get('all_intents', {})
-        }
+        intent_entry = IntentRecord(
+            timestamp=time.time(),
+            primary_intent=_intern_label(intent_data.get('primary_intent'), 'general_question'),
+            confidence=intent_data.get('confidence', 0),
+            urgency_level=_intern_label(intent_data.get('urgency_level'), 'low'),
+            all_intents=intent_data.get('all_intents', {})
+        )
         
         self.context['intent_history'].append(intent_entry)
         
@@ -153,21 +255,21 @@ class ConversationContext:
     
     def get_context_summary(self) -> Dict[str, Any]:
         """Get a summary of current conversation context"""
-        recent_messages = list(self.context['conversation_history'])[-5:]
+        recent_messages = self._history_snapshot()[-5:]
         recent_sentiments = self.context['sentiment_history'][-5:]
         recent_intents = self.context['intent_history'][-5:]
         
         # Calculate average sentiment
         avg_sentiment = 0
         if recent_sentiments:
-            avg_sentiment = sum(s['polarity'] for s in recent_sentiments) / len(recent_sentiments)
+            avg_sentiment = sum(s.polarity for s in recent_sentiments) / len(recent_sentiments)
         
         # Get most common recent intent
         most_common_intent = 'general_question'
         if recent_intents:
             intent_counts = {}
             for intent in recent_intents:
-                primary = intent['primary_intent']
+                primary = intent.primary_intent
                 intent_counts[primary] = intent_counts.get(primary, 0) + 1
             most_common_intent = max(intent_counts, key=intent_counts.get)
         
@@ -184,16 +286,16 @@ class ConversationContext:
             'escalation_needed': self.context['escalation_needed'],
             'assessment_in_progress': self.context['assessment_in_progress'] is not None,
             'recommendations_count': len(self.context['recommendations_given']),
-            'recent_messages': recent_messages,
+            'recent_messages': [msg.to_dict() for msg in recent_messages],
             'user_preferences': self.context['user_preferences']
         }
     
     def get_conversation_history(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get conversation history"""
-        history = list(self.context['conversation_history'])
+        history = self._history_snapshot()
         if limit:
-            return history[-limit:]
-        return history
+            history = history[-limit:]
+        return [msg.to_dict() for msg in history]
     
     def get_sentiment_trend(self) -> Dict[str, Any]:
         """Get sentiment trend analysis"""
@@ -201,7 +303,7 @@ class ConversationContext:
         if not sentiments:
             return {'trend': 'stable', 'direction': 'neutral', 'volatility': 0}
         
-        polarities = [s['polarity'] for s in sentiments]
+        polarities = [s.polarity for s in sentiments]
         
         # Calculate trend direction
         if len(polarities) >= 2:
@@ -265,11 +367,11 @@ class ConversationContext:
         context_parts.append(f"Mood trend: {self.context['mood_trend']}")
         
         # Recent conversation
-        recent_messages = list(self.context['conversation_history'])[-3:]
+        recent_messages = self._history_snapshot()[-3:]
         if recent_messages:
             context_parts.append("Recent conversation:")
             for msg in recent_messages:
-                context_parts.append(f"- {msg['sender']}: {msg['content']}")
+                context_parts.append(f"- {msg.sender}: {msg.content}")
         
         # Assessment in progress
         if self.context['assessment_in_progress']:
@@ -292,7 +394,7 @@ class ConversationContext:
             return
         
         recent_sentiments = sentiments[-5:]  # Last 5 sentiments
-        avg_recent = sum(s['polarity'] for s in recent_sentiments) / len(recent_sentiments)
+        avg_recent = sum(s.polarity for s in recent_sentiments) / len(recent_sentiments)
         
         if avg_recent > 0.1:
             self.context['mood_trend'] = 'positive'
@@ -318,6 +420,11 @@ class ConversationContext:
         if intent in topic_mapping:
             self.context['current_topic'] = topic_mapping[intent]
     
+    def _history_snapshot(self) -> List[MessageRecord]:
+        """Copy of the message history, taken under the lock"""
+        with self._lock:
+            return list(self.context['conversation_history'])
+    
     def _get_session_duration(self) -> float:
         """Get session duration in seconds"""
         if not self.context['session_start']:
@@ -327,9 +434,15 @@ class ConversationContext:
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert context to dictionary for storage"""
-        # Convert deque to list for JSON serialization
+        # Records are converted to plain dicts only here, at the JSON boundary
         context_copy = self.context.copy()
-        context_copy['conversation_history'] = list(context_copy['conversation_history'])
+        context_copy['conversation_history'] = [msg.to_dict() for msg in self._history_snapshot()]
+        context_copy['sentiment_history'] = [entry.to_dict() for entry in context_copy['sentiment_history']]
+        context_copy['intent_history'] = [entry.to_dict() for entry in context_copy['intent_history']]
+        
+        for key in ('session_start', 'last_activity'):
+            if isinstance(context_copy.get(key), datetime):
+                context_copy[key] = context_copy[key].isoformat()
         
         return context_copy
     
@@ -337,12 +450,24 @@ class ConversationContext:
         """Load context from dictionary"""
         self.context.update(context_dict)
         
-        # Convert list back to deque
+        # Convert stored dicts back to compact records
         if 'conversation_history' in context_dict:
-            self.context['conversation_history'] = deque(
-                context_dict['conversation_history'], 
+            history = deque(
+                (MessageRecord.from_dict(msg) for msg in context_dict['conversation_history']),
                 maxlen=self.max_history
             )
+            with self._lock:
+                self.context['conversation_history'] = history
+        
+        if 'sentiment_history' in context_dict:
+            self.context['sentiment_history'] = [
+                SentimentRecord.from_dict(entry) for entry in context_dict['sentiment_history']
+            ]
+        
+        if 'intent_history' in context_dict:
+            self.context['intent_history'] = [
+                IntentRecord.from_dict(entry) for entry in context_dict['intent_history']
+            ]
         
         # Convert ISO strings back to datetime objects
         if 'session_start' in context_dict and context_dict['session_start']:
@@ -0,0 +1,172 @@
+"""
+Crisis Detection - Single-pass, word-boundary aware crisis phrase scanner shared by all NLP components
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, NamedTuple, Tuple
+
+# Explicit suicidal ideation or self-harm: any unnegated match is a crisis
+IDEATION_PATTERNS = [
+    r"kill(?:ed|ing|s)? myself",
+    r"suicid(?:e|al)",
+    r"end(?:ing)? (?:it all|my life|everything)",
+    # "end things" only at the end of a clause or with a finality phrase, not "end things with my boyfriend"
+    r"end(?:ing)? things(?: for good| once and for all| tonight)?(?=\s*(?:[.!?;,]|$))",
+    r"tak(?:e|ing) my (?:own )?life",
+    r"want(?:s|ed)? to die",
+    r"wanna die",
+    r"i(?:'m| am) going to die(?! of| from| laughing| if| when)",
+    r"i(?:'m| am) gonna die(?! of| from| laughing| if| when)",
+    r"feel(?:s|ing)? like dying",
+    r"wish i (?:could|would) die",
+    r"better off dead",
+    r"wish (?:i|i'm|i was|i were) dead",
+    r"(?:do not|don't|no longer) want to (?:live|be alive|exist|be here anymore)",
+    r"not sure i want to (?:live|be alive|be here)",
+    r"better off without me",
+    r"if i (?:died|was gone|wasn't here)",
+    r"not worth living",
+    r"no reason to live",
+    r"nothing to live for",
+    r"hurt(?:ing)? myself",
+    r"self[- ]?harm(?:ing)?",
+    r"cut(?:ting)? myself",
+    # Overdose only with a self-directed or medication context, not "overdose on coffee"
+    r"(?:an|take an|taking an|took an) overdose",
+    r"overdos(?:e|ed|ing) on (?:my |the |some |all (?:my |the )?)?(?:pills|meds|medication|medicine|tablets|painkillers|sleeping pills|insulin|drugs)",
+    r"(?:going to|gonna|want to|wanna|will) overdose(?=\s*(?:[.!?;,]|$))",
+    r"hang(?:ing)? myself",
+    r"jump(?:ing)? off (?:a |the )?(?:bridge|building|roof|cliff)",
+]
+
+# Hopelessness: raises risk, and is a crisis together with a death reference
+HOPELESSNESS_PATTERNS = [
+    r"hopeless",
+    r"no point",
+    r"can't go on",
+    r"give up on (?:life|everything)",
+    r"giving up on (?:life|everything)",
+    r"give up",
+    r"no way out",
+    r"can't take (?:it|this) anymore",
+]
+
+# Bare references to death are too ambiguous ("dead tired") to count on their own
+DEATH_REFERENCE_PATTERNS = [
+    r"die",
+    r"dying",
+    r"dead",
+    r"death",
+]
+
+CATEGORIES = {
+    'ideation': IDEATION_PATTERNS,
+    'hopelessness': HOPELESSNESS_PATTERNS,
+    'death_reference': DEATH_REFERENCE_PATTERNS,
+}
+
+NEGATIONS = {"not", "never", "no", "don't", "won't", "wouldn't", "isn't", "aren't", "didn't", "can't", "couldn't"}
+NEGATION_WINDOW = 3
+CLAUSE_BREAK = re.compile(r"[.!?;,]|\bbut\b")
+
+def _build_scanner() -> Tuple[re.Pattern, Dict[str, Tuple[str, str]]]:
+    """Compile every pattern into one alternation with a named group per pattern"""
+    alternatives = []
+    groups = {}
+    for category, patterns in CATEGORIES.items():
+        for i, pattern in enumerate(patterns):
+            name = f"{category}_{i}"
+            groups[name] = (category, pattern)
+            alternatives.append(f"(?P<{name}>{pattern})")
+    return re.compile(r"\b(?:" + "|".join(alternatives) + r")\b"), groups
+
+SCANNER, GROUPS = _build_scanner()
+
+
+class CrisisScanResult(NamedTuple):
+    """Outcome of scanning one message"""
+    is_crisis: bool
+    severity: str
+    ideation: Tuple[str, ...]
+    hopelessness: Tuple[str, ...]
+    death_references: Tuple[str, ...]
+    negated: Tuple[str, ...]
+
+    @property
+    def keywords(self) -> List[str]:
+        """All unnegated matched phrases"""
+        return list(self.ideation + self.hopelessness + self.death_references)
+
+    @property
+    def indicator_count(self) -> int:
+        """Number of crisis indicators (ideation and hopelessness phrases)"""
+        return len(self.ideation) + len(self.hopelessness)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'is_crisis': self.is_crisis,
+            'keywords': self.keywords,
+            'severity': self.severity,
+            'ideation': list(self.ideation),
+            'hopelessness': list(self.hopelessness),
+            'negated': list(self.negated)
+        }
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and normalize apostrophes and contractions written without them"""
+    text = text.lower().replace('’', "'").replace('‘', "'")
+    text = re.sub(r"\b(don|can|won|isn|aren|didn|wouldn|couldn)t\b", r"\1't", text)
+    text = re.sub(r"\bim\b", "i'm", text)
+    return re.sub(r"\s+", " ", text)
+
+def _is_negated(text: str, start: int) -> bool:
+    """Whether a negation word closely precedes position ``start`` in the same clause"""
+    prefix = text[max(0, start - 60):start]
+    clauses = CLAUSE_BREAK.split(prefix)
+    words = clauses[-1].split()[-NEGATION_WINDOW:]
+    return any(word in NEGATIONS for word in words)
+
+@lru_cache(maxsize=2048)
+def _scan(text: str) -> CrisisScanResult:
+    text = normalize_text(text)
+    found = {'ideation': [], 'hopelessness': [], 'death_reference': []}
+    negated = []
+
+    for match in SCANNER.finditer(text):
+        category, _ = GROUPS[match.lastgroup]
+        phrase = match.group(0)
+        if _is_negated(text, match.start()):
+            negated.append(phrase)
+        else:
+            found[category].append(phrase)
+
+    ideation = tuple(found['ideation'])
+    hopelessness = tuple(found['hopelessness'])
+    death_references = tuple(found['death_reference'])
+
+    is_crisis = bool(ideation) or (bool(hopelessness) and bool(death_references))
+    if ideation:
+        severity = 'high'
+    elif is_crisis or hopelessness:
+        severity = 'medium'
+    else:
+        severity = 'low'
+
+    return CrisisScanResult(is_crisis, severity, ideation, hopelessness, death_references, tuple(negated))
+
+def scan_for_crisis(text: str) -> CrisisScanResult:
+    """Scan a message for crisis language in a single pass (results are memoized per text)"""
+    if not text:
+        return CrisisScanResult(False, 'low', (), (), (), ())
+    return _scan(text)
+
+# Reviewed crisis reply sent without waiting on the LLM
+CRISIS_RESPONSE = (
+    "I'm really glad you told me, and I'm very concerned about your safety right now. "
+    "You don't have to go through this alone. Please call or text 988 (Suicide & Crisis Lifeline) "
+    "or text HOME to 741741 to reach the Crisis Text Line - both are free and available 24/7. "
+    "If you are in immediate danger, call 911 or go to your nearest emergency room. "
+    "I'm here with you, and I'd like to keep talking."
+)
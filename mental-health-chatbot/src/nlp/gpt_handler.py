@@ -4,9 +4,17 @@ GPT Handler - OpenAI GPT API integration for empathetic conversations
 
 import os
 import json
-from typing import Dict, List, Any, Optional
-from openai import OpenAI
+import time
+from typing import Dict, List, Any, Optional, Iterator
+import openai
 from datetime import datetime
+from src.nlp.resilience import Deadline, backoff_delay, openai_breaker, openai_retry_budget
+from src.nlp.response_cache import get_semantic_response_cache
+from src.nlp.openai_client import get_openai_client
+from src.nlp.rate_limiter import get_rate_limiter
+from src.nlp.recommendation_cache import get_recommendation_cache, profile_bucket, bucket_inputs
+from src.nlp.crisis_detection import scan_for_crisis
+from src.nlp.model_router import Route, get_model_router
 
 class GPTHandler:
     """Handles GPT API interactions for mental health conversations"""
@@ -16,18 +24,41 @@ class GPTHandler:
         self.api_key = os.environ.get('OPENAI_API_KEY')
         if not self.api_key:
             print("Warning: OPENAI_API_KEY not found. Using fallback responses.")
-            self.client = None
-        else:
-            self.client = OpenAI(api_key=self.api_key)
+        
+        # Pooled client shared with every other OpenAI caller in the process
+        self.client = get_openai_client()
         
         self.model = os.environ.get('OPENAI_MODEL', 'gpt-4')
         self.max_tokens = int(os.environ.get('OPENAI_MAX_TOKENS', '1500'))
         self.temperature = float(os.environ.get('OPENAI_TEMPERATURE', '0.7'))
         
+        # Chat replies pick model, max_tokens and temperature by conversation type and risk
+        self.router = get_model_router()
+        
         # Enhanced configuration
         self.max_retries = int(os.environ.get('OPENAI_MAX_RETRIES', '3'))
         self.timeout = int(os.environ.get('OPENAI_TIMEOUT', '30'))
         self.rate_limit_delay = float(os.environ.get('OPENAI_RATE_LIMIT_DELAY', '1.0'))
+        self.request_deadline = float(os.environ.get('OPENAI_REQUEST_DEADLINE', '45'))
+        self.max_backoff = float(os.environ.get('OPENAI_MAX_BACKOFF', '8.0'))
+        
+        # Shared resilience state (one breaker and retry budget per process)
+        self.breaker = openai_breaker
+        self.retry_budget = openai_retry_budget
+        
+        # Proactive RPM/TPM limits shared across workers
+        self.rate_limiter = get_rate_limiter()
+        self.rate_limit_max_wait = float(os.environ.get('OPENAI_RATE_LIMIT_MAX_WAIT', '5'))
+        
+        # Opt-in semantic cache for first-turn messages
+        self.semantic_cache_enabled = os.environ.get('SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true'
+        self.semantic_cache_max_history = int(os.environ.get('SEMANTIC_CACHE_MAX_HISTORY', '2'))
+        self.semantic_cache = get_semantic_response_cache(self.client) if self.semantic_cache_enabled else None
+        
+        # GPT recommendations are cached per quantized profile bucket
+        self.recommendation_cache = get_recommendation_cache()
+        # Called with (gpt_response, conversation_type) to ledger LLM calls made outside a chat turn
+        self.usage_recorder = None
         
         # Conversation context limits
         self.max_context_messages = 20
@@ -80,11 +111,17 @@ CRISIS RESOURCES:
                          user_message: str,
                          conversation_history: List[Dict[str, str]] = None,
                          context: Dict[str, Any] = None,
-                         conversation_type: str = 'general') -> Dict[str, Any]:
-        """Generate empathetic response using GPT with enhanced error handling"""
-        import time
-        import random
+                         conversation_type: str = 'general',
+                         deadline: Deadline = None,
+                         route: Route = None,
+                         messages: List[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Generate empathetic response using GPT with enhanced error handling.
         
+        ``deadline`` lets the caller bound the whole call (all attempts and backoff)
+        to its own remaining budget; it is capped at ``request_deadline``.
+        ``route`` overrides the model route chosen from ``conversation_type`` and ``context``.
+        ``messages`` replaces the chat prompt for non-chat calls, which skip the semantic cache.
+        """
         # Validate input
         if not user_message or not user_message.strip():
             return self._create_error_response("Empty message received", conversation_type)
@@ -93,88 +130,398 @@ CRISIS RESOURCES:
         if len(user_message) > 2000:
             user_message = user_message[:2000] + "..."
         
+        # If no OpenAI client, return fallback response
+        if not self.client:
+            return self._create_fallback_response(user_message, conversation_type)
+        
+        if deadline is None or deadline.remaining() > self.request_deadline:
+            deadline = Deadline(self.request_deadline)
+        
+        cacheable = messages is None and self._is_cacheable(user_message, conversation_history, conversation_type)
+        if cacheable:
+            cached = self._lookup_cached_response(user_message, conversation_type, deadline)
+            if cached:
+                return cached
+        
+        self.retry_budget.record_request()
+        last_error = "Max retries exceeded"
+        
+        messages = messages or self._build_messages(user_message, conversation_history, context, conversation_type)
+        route = route or self.router.select_for_context(conversation_type, context)
+        models = route.models
+        model_index = 0
+        estimated_tokens = self._estimate_tokens(messages) + route.max_tokens
+        
         for attempt in range(self.max_retries):
+            if deadline.expired():
+                last_error = "Request deadline exceeded"
+                break
+            
+            # Serve the fallback instantly while the provider is known to be failing,
+            # before reserving or waiting for any rate-limit capacity
+            if not self.breaker.allow_request():
+                fallback = self._create_fallback_response(user_message, conversation_type)
+                fallback['circuit_open'] = True
+                return fallback
+            
+            # Queue for provider capacity, or shed before the provider returns a 429
+            if not self._acquire_capacity(estimated_tokens, conversation_type, deadline):
+                self.breaker.release()
+                fallback = self._create_fallback_response(user_message, conversation_type)
+                fallback['rate_limited'] = True
+                return fallback
+            
+            model = models[model_index]
+            has_fallback = model_index < len(models) - 1
+            timeout = min(self.timeout, deadline.remaining())
+            if has_fallback and route.slow_after:
+                timeout = min(timeout, route.slow_after)
+            
+            call_started = time.monotonic()
             try:
-                # If no OpenAI client, return fallback response
-                if not self.client:
-                    return self._create_fallback_response(user_message, conversation_type)
-                
-                # Prepare system prompt
-                system_prompt = self.system_prompts.get(conversation_type, self.system_prompts['general'])
-                
-                # Add context information to system prompt
-                if context:
-                    context_info = self._format_context(context)
-                    system_prompt += f"\n\nCurrent context: {context_info}"
-                
-                # Prepare messages with context management
-                messages = [{"role": "system", "content": system_prompt}]
-                
-                # Add conversation history with smart truncation
-                if conversation_history:
-                    messages.extend(self._prepare_conversation_history(conversation_history))
-                
-                # Add current user message
-                messages.append({"role": "user", "content": user_message})
-                
-                # Check total context length
-                total_length = sum(len(msg.get('content', '')) for msg in messages)
-                if total_length > self.max_context_length:
-                    messages = self._truncate_context(messages)
-                
-                # Generate response with retry logic
                 response = self.client.chat.completions.create(
-                    model=self.model,
+                    model=model,
                     messages=messages,
-                    max_tokens=self.max_tokens,
-                    temperature=self.temperature,
+                    max_tokens=route.max_tokens,
+                    temperature=route.temperature,
                     presence_penalty=0.1,
                     frequency_penalty=0.1,
-                    timeout=self.timeout
+                    timeout=timeout
                 )
+                bot_response = (response.choices[0].message.content or '').strip()
                 
-                bot_response = response.choices[0].message.content.strip()
-                
-                # Validate response
+                # Validate before recording, so an unusable reply is recorded once, as a failure
                 if not bot_response or len(bot_response) < 10:
                     raise ValueError("Response too short or empty")
                 
+                self.breaker.record_success()
+                latency = time.monotonic() - call_started
+                self.router.record(route, model, latency, response.usage.total_tokens if response.usage else 0)
+                if response.usage:
+                    self.rate_limiter.refund('chat.completions', estimated_tokens - response.usage.total_tokens)
+                
                 # Analyze response for safety and appropriateness
                 safety_check = self._safety_check(bot_response)
                 
                 # Check for inappropriate content
                 if not safety_check['is_safe']:
                     bot_response = self._sanitize_response(bot_response)
+                elif cacheable:
+                    self.semantic_cache.store(conversation_type, user_message, bot_response, latency,
+                                              timeout=deadline.remaining())
                 
                 return {
                     'response': bot_response,
                     'conversation_type': conversation_type,
                     'safety_check': safety_check,
                     'tokens_used': response.usage.total_tokens if response.usage else 0,
+                    'prompt_tokens': response.usage.prompt_tokens if response.usage else 0,
+                    'completion_tokens': response.usage.completion_tokens if response.usage else 0,
+                    'latency_ms': round(latency * 1000, 1),
                     'timestamp': datetime.now().isoformat(),
-                    'attempt': attempt + 1
+                    'attempt': attempt + 1,
+                    'model': model,
+                    'route': route.name
                 }
                 
             except Exception as e:
-                error_msg = str(e)
-                print(f"GPT API attempt {attempt + 1} failed: {error_msg}")
+                last_error = str(e)
+                print(f"GPT API attempt {attempt + 1} ({model}) failed: {last_error}")
+                self.router.record(route, model, time.monotonic() - call_started, 0, success=False)
+                # The next attempt reserves its own estimate, so this one's tokens go back
+                self.rate_limiter.refund('chat.completions', estimated_tokens)
+                self._record_breaker_failure(e)
+                
+                # A slow model hands over to the next one in the route's chain without backing off
+                if has_fallback and isinstance(e, openai.APITimeoutError) and not deadline.expired():
+                    model_index += 1
+                    continue
                 
-                # Handle specific error types
-                if "rate_limit" in error_msg.lower():
-                    wait_time = self.rate_limit_delay * (2 ** attempt) + random.uniform(0, 1)
-                    print(f"Rate limit hit, waiting {wait_time:.2f} seconds...")
-                    time.sleep(wait_time)
-                elif "timeout" in error_msg.lower():
-                    print("Request timeout, retrying...")
-                    time.sleep(1)
-                elif attempt == self.max_retries - 1:
-                    # Final attempt failed
-                    return self._create_error_response(error_msg, conversation_type)
-                else:
-                    # Wait before retry
-                    time.sleep(1 + attempt * 0.5)
-        
-        return self._create_error_response("Max retries exceeded", conversation_type)
+                if not self._is_retryable(e) or attempt == self.max_retries - 1:
+                    break
+                
+                if not self.retry_budget.try_acquire_retry():
+                    print("Retry budget exhausted, not retrying")
+                    break
+                
+                # Jittered backoff that never sleeps past the request deadline
+                is_rate_limit = isinstance(e, openai.RateLimitError) or "rate_limit" in last_error.lower()
+                delay = backoff_delay(
+                    attempt,
+                    base=self.rate_limit_delay if is_rate_limit else 0.5,
+                    cap=self.max_backoff,
+                    deadline=deadline
+                )
+                if delay >= deadline.remaining():
+                    last_error = "Request deadline exceeded"
+                    break
+                time.sleep(delay)
+        
+        if last_error == "Request deadline exceeded":
+            fallback = self._create_fallback_response(user_message, conversation_type)
+            fallback['deadline_exceeded'] = True
+            return fallback
+        
+        return self._create_error_response(last_error, conversation_type)
+    
+    def get_resilience_metrics(self) -> Dict[str, Any]:
+        """Get circuit breaker and retry budget metrics for the OpenAI client"""
+        return {
+            'circuit_breaker': self.breaker.get_metrics(),
+            'retry_budget': self.retry_budget.get_metrics()
+        }
+    
+    def _acquire_capacity(self, estimated_tokens: int, conversation_type: str, deadline: Deadline) -> bool:
+        """Reserve rate-limit capacity for one chat completion"""
+        # Crisis replies wait as long as the deadline allows instead of being shed
+        max_wait = deadline.remaining() if conversation_type == 'crisis' else min(self.rate_limit_max_wait, deadline.remaining())
+        return self.rate_limiter.acquire('chat.completions', estimated_tokens, max_wait=max_wait)
+    
+    def get_cache_metrics(self) -> Dict[str, Any]:
+        """Get semantic response cache metrics"""
+        if not self.semantic_cache:
+            return {'enabled': False}
+        return dict(self.semantic_cache.get_metrics(), enabled=True)
+    
+    def _is_cacheable(self,
+                      user_message: str,
+                      conversation_history: List[Dict[str, str]],
+                      conversation_type: str) -> bool:
+        """Whether a message may be answered from (and stored in) the semantic cache"""
+        if not self.semantic_cache or conversation_type == 'crisis':
+            return False
+        if len(conversation_history or []) > self.semantic_cache_max_history:
+            return False
+        # Crisis messages always get a fresh, individual response
+        return not self.detect_crisis_keywords(user_message)['is_crisis']
+    
+    def _lookup_cached_response(self, user_message: str, conversation_type: str,
+                                deadline: Deadline) -> Optional[Dict[str, Any]]:
+        """Build a response from a semantic cache hit (a failed lookup is a miss)"""
+        hit = self.semantic_cache.lookup(conversation_type, user_message, timeout=deadline.remaining())
+        if not hit:
+            return None
+        
+        return {
+            'response': hit['response'],
+            'conversation_type': conversation_type,
+            'safety_check': self._safety_check(hit['response']),
+            'tokens_used': 0,
+            'timestamp': datetime.now().isoformat(),
+            'cache_hit': True,
+            'cache_similarity': round(hit['similarity'], 3)
+        }
+    
+    def _record_breaker_failure(self, error: Exception):
+        """Count a failed call against the breaker only when the provider is at fault"""
+        if isinstance(error, openai.APIError) and self._is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            # A rejected request (400/401/404) says nothing about provider health
+            self.breaker.release()
+    
+    def _is_retryable(self, error: Exception) -> bool:
+        """Whether an error is worth retrying"""
+        if isinstance(error, (openai.RateLimitError, openai.APITimeoutError,
+                              openai.APIConnectionError, openai.InternalServerError)):
+            return True
+        if isinstance(error, openai.APIStatusError):
+            return False
+        return True
+    
+    def stream_response(self,
+                        user_message: str,
+                        conversation_history: List[Dict[str, str]] = None,
+                        context: Dict[str, Any] = None,
+                        conversation_type: str = 'general',
+                        deadline: Deadline = None) -> Iterator[Dict[str, Any]]:
+        """Stream a response token by token.
+        
+        Yields ``{'type': 'token', 'content': ...}`` events as deltas arrive and
+        finishes with a single ``{'type': 'done', ...}`` event carrying the same
+        fields as ``generate_response`` for the complete, safety-checked reply.
+        """
+        if not user_message or not user_message.strip():
+            yield dict(self._create_error_response("Empty message received", conversation_type), type='done')
+            return
+        
+        if len(user_message) > 2000:
+            user_message = user_message[:2000] + "..."
+        
+        if deadline is None or deadline.remaining() > self.request_deadline:
+            deadline = Deadline(self.request_deadline)
+        
+        cacheable = self.client is not None and self._is_cacheable(user_message, conversation_history, conversation_type)
+        if cacheable:
+            cached = self._lookup_cached_response(user_message, conversation_type, deadline)
+            if cached:
+                yield {'type': 'token', 'content': cached['response']}
+                yield dict(cached, type='done')
+                return
+        
+        messages = self._build_messages(user_message, conversation_history, context, conversation_type)
+        route = self.router.select_for_context(conversation_type, context)
+        estimated_tokens = self._estimate_tokens(messages) + route.max_tokens
+        
+        # The breaker is checked before any capacity is reserved or waited for
+        circuit_open = self.client is not None and not self.breaker.allow_request()
+        rate_limited = self.client is not None and not circuit_open and not self._acquire_capacity(
+            estimated_tokens, conversation_type, deadline)
+        if rate_limited:
+            self.breaker.release()
+        
+        if not self.client or circuit_open or rate_limited:
+            fallback = self._create_fallback_response(user_message, conversation_type)
+            if rate_limited:
+                fallback['rate_limited'] = True
+            elif circuit_open:
+                fallback['circuit_open'] = True
+            yield {'type': 'token', 'content': fallback['response']}
+            yield dict(fallback, type='done')
+            return
+        
+        chunks = []
+        call_started = time.monotonic()
+        timeout = min(self.timeout, deadline.remaining())
+        if route.fallbacks and route.slow_after:
+            timeout = min(timeout, route.slow_after)
+        try:
+            stream = self.client.chat.completions.create(
+                model=route.model,
+                messages=messages,
+                max_tokens=route.max_tokens,
+                temperature=route.temperature,
+                presence_penalty=0.1,
+                frequency_penalty=0.1,
+                timeout=timeout,
+                stream=True
+            )
+            
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    chunks.append(delta)
+                    yield {'type': 'token', 'content': delta}
+            self.breaker.record_success()
+        except Exception as e:
+            print(f"GPT API streaming failed: {e}")
+            self.router.record(route, route.model, time.monotonic() - call_started, 0, success=False)
+            self._record_breaker_failure(e)
+            if not chunks:
+                # generate_response reserves its own capacity
+                self.rate_limiter.refund('chat.completions', estimated_tokens)
+                # Nothing reached the user yet, so fall back to the non-streaming path,
+                # continuing down the model chain when the primary was too slow
+                if route.fallbacks and isinstance(e, openai.APITimeoutError):
+                    route = route._replace(model=route.fallbacks[0], fallbacks=route.fallbacks[1:])
+                result = self.generate_response(user_message, conversation_history, context, conversation_type, deadline, route)
+                yield {'type': 'token', 'content': result['response']}
+                yield dict(result, type='done')
+                return
+            
+            # Part of the reply already reached the user: end it as a failed, partial reply,
+            # never recorded as a success or cached as a complete one
+            bot_response = ''.join(chunks).strip()
+            prompt_tokens = self._estimate_tokens(messages)
+            completion_tokens = self._estimate_tokens([{'content': bot_response}])
+            self.rate_limiter.refund('chat.completions', estimated_tokens - prompt_tokens - completion_tokens)
+            yield {
+                'type': 'done',
+                'response': bot_response,
+                'error': str(e),
+                'partial': True,
+                'conversation_type': conversation_type,
+                'safety_check': self._safety_check(bot_response),
+                'tokens_used': prompt_tokens + completion_tokens,
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'tokens_estimated': True,
+                'latency_ms': round((time.monotonic() - call_started) * 1000, 1),
+                'timestamp': datetime.now().isoformat(),
+                'streamed': True,
+                'model': route.model,
+                'route': route.name
+            }
+            return
+        
+        bot_response = ''.join(chunks).strip()
+        if not bot_response:
+            result = self._create_error_response("Empty streamed response", conversation_type)
+            yield {'type': 'token', 'content': result['response']}
+            yield dict(result, type='done')
+            return
+        
+        # openai 1.3 streams carry no usage, so both sides are estimated
+        latency = time.monotonic() - call_started
+        prompt_tokens = self._estimate_tokens(messages)
+        completion_tokens = self._estimate_tokens([{'content': bot_response}])
+        tokens_used = prompt_tokens + completion_tokens
+        self.router.record(route, route.model, latency, tokens_used)
+        self.rate_limiter.refund('chat.completions', estimated_tokens - tokens_used)
+        
+        safety_check = self._safety_check(bot_response)
+        if not safety_check['is_safe']:
+            bot_response = self._sanitize_response(bot_response)
+        elif cacheable:
+            self.semantic_cache.store(conversation_type, user_message, bot_response, latency,
+                                      timeout=deadline.remaining())
+        
+        yield {
+            'type': 'done',
+            'response': bot_response,
+            'conversation_type': conversation_type,
+            'safety_check': safety_check,
+            'tokens_used': tokens_used,
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'tokens_estimated': True,
+            'latency_ms': round(latency * 1000, 1),
+            'timestamp': datetime.now().isoformat(),
+            'streamed': True,
+            'model': route.model,
+            'route': route.name
+        }
+    
+    def _build_messages(self,
+                        user_message: str,
+                        conversation_history: List[Dict[str, str]] = None,
+                        context: Dict[str, Any] = None,
+                        conversation_type: str = 'general') -> List[Dict[str, str]]:
+        """Assemble the chat completion messages for a user turn"""
+        # Prepare system prompt
+        system_prompt = self.system_prompts.get(conversation_type, self.system_prompts['general'])
+        
+        # Add context information to system prompt
+        if context:
+            context_info = self._format_context(context)
+            system_prompt += f"\n\nCurrent context: {context_info}"
+        
+        # Prepare messages with context management
+        messages = [{"role": "system", "content": system_prompt}]
+        
+        # Add conversation history with smart truncation
+        if conversation_history:
+            messages.extend(self._prepare_conversation_history(conversation_history))
+        
+        # Add current user message
+        messages.append({"role": "user", "content": user_message})
+        
+        # Check total context length
+        total_length = sum(len(msg.get('content', '')) for msg in messages)
+        if total_length > self.max_context_length:
+            messages = self._truncate_context(messages)
+        
+        return messages
+    
+    def _estimate_tokens(self, messages: List[Dict[str, str]]) -> int:
+        """Rough token estimate (~4 characters per token) when usage is not reported"""
+        return sum(len(msg.get('content', '')) for msg in messages) // 4
+    
+    def get_fallback_response(self, user_message: str, conversation_type: str) -> Dict[str, Any]:
+        """Canned reply for callers that skip the LLM call"""
+        return self._create_fallback_response(user_message, conversation_type)
     
     def _create_fallback_response(self, user_message: str, conversation_type: str) -> Dict[str, Any]:
         """Create a fallback response when OpenAI API is not available"""
@@ -255,20 +602,7 @@ CRISIS RESOURCES:
     
     def detect_crisis_keywords(self, message: str) -> Dict[str, Any]:
         """Detect crisis keywords in user message"""
-        crisis_keywords = [
-            'suicide', 'kill myself', 'end it all', 'not worth living',
-            'hurt myself', 'self harm', 'cut myself', 'overdose',
-            'jump off', 'hang myself', 'die', 'death', 'dead'
-        ]
-        
-        message_lower = message.lower()
-        detected_keywords = [keyword for keyword in crisis_keywords if keyword in message_lower]
-        
-        return {
-            'is_crisis': len(detected_keywords) > 0,
-            'keywords': detected_keywords,
-            'severity': 'high' if len(detected_keywords) > 2 else 'medium' if detected_keywords else 'low'
-        }
+        return scan_for_crisis(message).to_dict()
     
     def generate_assessment_questions(self, assessment_type: str) -> List[Dict[str, Any]]:
         """Generate assessment questions based on type"""
@@ -296,34 +630,10 @@ CRISIS RESOURCES:
                                user_profile: Dict[str, Any],
                                current_mood: str,
                                assessment_results: Dict[str, Any] = None) -> List[Dict[str, Any]]:
-        """Generate personalized recommendations"""
+        """Generate personalized recommendations, served from the profile-bucket cache"""
+        bucket = profile_bucket(user_profile, current_mood, assessment_results)
         try:
-            # Prepare recommendation prompt
-            prompt = f"""
-            Based on the following user profile and current state, generate 3-5 personalized mental health recommendations:
-            
-            User Profile: {json.dumps(user_profile, indent=2)}
-            Current Mood: {current_mood}
-            Assessment Results: {json.dumps(assessment_results or {}, indent=2)}
-            
-            For each recommendation, provide:
-            1. Type (exercise, meditation, activity, resource, professional_help)
-            2. Title
-            3. Description
-            4. Instructions
-            5. Priority (1-5)
-            6. Expected duration
-            """
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=800,
-                temperature=0.5
-            )
-            
-            recommendations_text = response.choices[0].message.content.strip()
-            return self._parse_recommendations(recommendations_text)
+            return self.recommendation_cache.get(bucket, self.generate_bucket_recommendations)
             
         except Exception as e:
             return [{
@@ -335,6 +645,51 @@ CRISIS RESOURCES:
                 'duration': 'Ongoing'
             }]
     
+    def generate_bucket_recommendations(self, bucket) -> List[Dict[str, Any]]:
+        """Generate recommendations for a profile bucket with GPT (raises on failure)"""
+        if not self.client:
+            raise RuntimeError("OpenAI client not configured")
+        
+        user_profile, current_mood, assessment_results = bucket_inputs(bucket)
+        
+        # Prepare recommendation prompt
+        prompt = f"""
+        Based on the following user profile and current state, generate 3-5 personalized mental health recommendations:
+        
+        User Profile: {json.dumps(user_profile, indent=2)}
+        Current Mood: {current_mood}
+        Assessment Results: {json.dumps(assessment_results or {}, indent=2)}
+        
+        For each recommendation, provide:
+        1. Type (exercise, meditation, activity, resource, professional_help)
+        2. Title
+        3. Description
+        4. Instructions
+        5. Priority (1-5)
+        6. Expected duration
+        """
+        
+        # Same breaker, retry budget, rate limiter and routing as chat replies
+        result = self.generate_response(
+            prompt,
+            conversation_type='recommendations',
+            route=self.router.routes['recommendations'],
+            messages=[{"role": "user", "content": prompt}]
+        )
+        if result.get('error') or result.get('fallback_mode'):
+            raise RuntimeError(f"Recommendation generation failed: {result.get('error') or 'fallback response'}")
+        
+        if self.usage_recorder:
+            try:
+                self.usage_recorder(result, 'recommendations')
+            except Exception as e:
+                print(f"Error recording recommendation token usage: {e}")
+        
+        recommendations = self._parse_recommendations(result['response'])
+        if not recommendations:
+            raise ValueError("No recommendations parsed from response")
+        return recommendations
+    
     def _format_context(self, context: Dict[str, Any]) -> str:
         """Format context information for GPT"""
         context_parts = []
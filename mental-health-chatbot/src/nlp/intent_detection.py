@@ -9,6 +9,7 @@ from sklearn.naive_bayes import MultinomialNB
 from sklearn.pipeline import Pipeline
 import joblib
 import os
+from src.nlp.crisis_detection import CrisisScanResult, scan_for_crisis
 
 class IntentDetector:
     """Detects user intentions in mental health conversations"""
@@ -26,12 +27,6 @@ class IntentDetector:
                 r'\b(thanks|thank you|thank you very much)\b',
                 r'\b(that\'s all|that\'s it|nothing else)\b'
             ],
-            'crisis': [
-                r'\b(kill myself|suicide|end it all|not worth living)\b',
-                r'\b(hurt myself|self harm|cut myself|overdose)\b',
-                r'\b(jump off|hang myself|die|death|dead)\b',
-                r'\b(better off dead|want to die|end my life)\b'
-            ],
             'depression': [
                 r'\b(depressed|depression|sad|hopeless|worthless)\b',
                 r'\b(empty|guilty|shame|down|low)\b',
@@ -103,13 +98,18 @@ class IntentDetector:
         self.model_path = 'data/models/intent_classifier.pkl'
         self._load_or_train_model()
     
-    def detect_intent(self, text: str) -> Dict[str, Any]:
-        """Detect user intent from text"""
+    def detect_intent(self, text: str, crisis_scan: CrisisScanResult = None) -> Dict[str, Any]:
+        """Detect user intent from text (pass ``crisis_scan`` to reuse an existing crisis scan)"""
         text_lower = text.lower().strip()
+        crisis_scan = crisis_scan or scan_for_crisis(text)
         
         # Pattern-based detection
         pattern_results = self._detect_by_patterns(text_lower)
         
+        # Crisis language comes from the shared crisis scanner
+        if crisis_scan.is_crisis:
+            pattern_results['crisis'] = 1.0
+        
         # ML-based detection
         ml_results = self._detect_by_ml(text_lower)
         
@@ -126,7 +126,7 @@ class IntentDetector:
             'pattern_matches': pattern_results,
             'ml_predictions': ml_results,
             'context_info': context_info,
-            'urgency_level': self._assess_urgency(text_lower, combined_intent['primary_intent'])
+            'urgency_level': 'high' if crisis_scan.is_crisis else self._assess_urgency(text_lower, combined_intent['primary_intent'])
         }
     
     def _detect_by_patterns(self, text: str) -> Dict[str, float]:
@@ -154,13 +154,14 @@ class IntentDetector:
             return {}
         
         try:
-            # Predict probabilities for all classes
-            probabilities = self.ml_model.predict_proba([text])[0]
+            # Predict probabilities for all classes (the model is stored apart from its vectorizer)
+            features = self.vectorizer.transform([text]) if self.vectorizer else [text]
+            probabilities = self.ml_model.predict_proba(features)[0]
             class_names = self.ml_model.classes_
             
             ml_scores = {}
             for i, class_name in enumerate(class_names):
-                ml_scores[class_name] = float(probabilities[i])
+                ml_scores[str(class_name)] = float(probabilities[i])
             
             return ml_scores
         except Exception as e:
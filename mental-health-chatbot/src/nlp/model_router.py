@@ -0,0 +1,159 @@
+"""
+Model Router - Picks the completion model and generation settings per turn by intent and risk
+"""
+
+import os
+import json
+import threading
+from collections import deque
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple
+
+class Route(NamedTuple):
+    """Completion settings for one class of turns"""
+    name: str
+    model: str
+    max_tokens: int
+    temperature: float
+    # Models tried in order when the previous one is too slow
+    fallbacks: Tuple[str, ...] = ()
+    # Seconds the model gets before the next model in the chain is tried
+    slow_after: float = 0.0
+
+    @property
+    def models(self) -> Tuple[str, ...]:
+        """Primary model followed by its fallback chain"""
+        return (self.model,) + tuple(self.fallbacks)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'model': self.model,
+            'max_tokens': self.max_tokens,
+            'temperature': self.temperature,
+            'fallbacks': list(self.fallbacks),
+            'slow_after': self.slow_after
+        }
+
+
+# Conversation types that always get the strongest model
+CLINICAL_TYPES = {'depression', 'professional_help', 'medication'}
+
+def default_routes() -> Dict[str, Route]:
+    """Routing table built from OPENAI_MODEL (strongest) and OPENAI_FAST_MODEL"""
+    strong = os.environ.get('OPENAI_MODEL', 'gpt-4')
+    fast = os.environ.get('OPENAI_FAST_MODEL', 'gpt-3.5-turbo')
+    return {
+        'crisis': Route('crisis', strong, 600, 0.3, (fast,), 12.0),
+        'clinical': Route('clinical', strong, 800, 0.5, (fast,), 10.0),
+        'supportive': Route('supportive', fast, 500, 0.7),
+        'light': Route('light', fast, 250, 0.7),
+        # Profile-bucket recommendations (generated off the chat path, then cached)
+        'recommendations': Route('recommendations', strong, 800, 0.5, (fast,), 10.0)
+    }
+
+
+class ModelRouter:
+    """Routes completions by conversation type, urgency and risk and tracks per-route latency and tokens"""
+
+    def __init__(self, routes: Dict[str, Route] = None, sample_size: int = 500):
+        """Initialize model router"""
+        self.routes = routes or default_routes()
+        self.sample_size = sample_size
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def select(self, conversation_type: str = 'general', urgency_level: str = 'low',
+               risk_level: str = 'low') -> Route:
+        """Pick the route for a turn; the highest of type, urgency and risk wins"""
+        if conversation_type == 'crisis' or risk_level == 'crisis':
+            return self.routes['crisis']
+        if conversation_type in CLINICAL_TYPES or 'high' in (urgency_level, risk_level):
+            return self.routes['clinical']
+        if 'medium' in (urgency_level, risk_level):
+            return self.routes['supportive']
+        return self.routes['light']
+
+    def select_for_context(self, conversation_type: str, context: Optional[Dict[str, Any]]) -> Route:
+        """Pick the route from the intent and sentiment analysis carried in a chat context"""
+        context = context or {}
+        urgency_level = (context.get('intent_analysis') or {}).get('urgency_level', 'low')
+        risk_level = (context.get('sentiment_analysis') or {}).get('risk_level', 'low')
+        if (context.get('crisis_indicators') or {}).get('is_crisis'):
+            risk_level = 'crisis'
+        return self.select(conversation_type, urgency_level, risk_level)
+
+    def record(self, route: Route, model: str, latency: float, tokens: int, success: bool = True):
+        """Record one completion call made on a route"""
+        with self._lock:
+            stats = self._stats.setdefault(route.name, {
+                'calls': 0, 'failures': 0, 'fallback_calls': 0, 'tokens': 0,
+                'models': {}, 'latencies': deque(maxlen=self.sample_size)
+            })
+            stats['calls'] += 1
+            stats['tokens'] += tokens
+            stats['models'][model] = stats['models'].get(model, 0) + 1
+            stats['latencies'].append(latency)
+            if not success:
+                stats['failures'] += 1
+            if model != route.model:
+                stats['fallback_calls'] += 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Routing table with per-route calls, latency percentiles and token spend"""
+        with self._lock:
+            snapshot = {name: dict(stats, latencies=list(stats['latencies']), models=dict(stats['models']))
+                        for name, stats in self._stats.items()}
+
+        metrics = {}
+        for name, route in self.routes.items():
+            stats = snapshot.get(name)
+            entry = {'route': route.to_dict(), 'calls': 0}
+            if stats:
+                latencies = sorted(stats.pop('latencies'))
+                entry.update(stats)
+                entry['avg_tokens'] = round(stats['tokens'] / stats['calls'], 1)
+                entry['latency_p50_ms'] = round(percentile(latencies, 50) * 1000, 1)
+                entry['latency_p95_ms'] = round(percentile(latencies, 95) * 1000, 1)
+            metrics[name] = entry
+        return metrics
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100.0 * len(values))) - 1))
+    return values[index]
+
+def load_routes() -> Dict[str, Route]:
+    """Default routes with per-route overrides from OPENAI_MODEL_ROUTES (JSON)"""
+    routes = default_routes()
+    overrides = os.environ.get('OPENAI_MODEL_ROUTES')
+    if not overrides:
+        return routes
+
+    try:
+        for name, fields in json.loads(overrides).items():
+            if name not in routes:
+                print(f"Ignoring unknown model route: {name}")
+                continue
+            if 'fallbacks' in fields:
+                fields['fallbacks'] = tuple(fields['fallbacks'])
+            routes[name] = routes[name]._replace(**fields)
+    except (ValueError, TypeError, AttributeError) as e:
+        print(f"Invalid OPENAI_MODEL_ROUTES, using default routes: {e}")
+        return default_routes()
+    return routes
+
+
+# Initialize global model router
+model_router = None
+_model_router_lock = threading.Lock()
+
+def get_model_router() -> ModelRouter:
+    """Get global model router instance"""
+    global model_router
+    if model_router is None:
+        with _model_router_lock:
+            if model_router is None:
+                model_router = ModelRouter(load_routes())
+    return model_router
@@ -0,0 +1,62 @@
+"""
+OpenAI Client Factory - One pooled, keep-alive HTTP client shared by the whole process
+"""
+
+import os
+import threading
+import importlib.util
+from typing import Optional
+import httpx
+from openai import OpenAI
+
+_client: Optional[OpenAI] = None
+_client_lock = threading.Lock()
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional ``h2`` package"""
+    return importlib.util.find_spec('h2') is not None
+
+def _build_http_client() -> httpx.Client:
+    """Build the pooled HTTP transport used for all OpenAI calls"""
+    limits = httpx.Limits(
+        max_connections=int(os.environ.get('OPENAI_POOL_MAX_CONNECTIONS', '50')),
+        max_keepalive_connections=int(os.environ.get('OPENAI_POOL_MAX_KEEPALIVE', '20')),
+        keepalive_expiry=float(os.environ.get('OPENAI_POOL_KEEPALIVE_EXPIRY', '60'))
+    )
+    # Default timeouts; callers still pass a per-call ``timeout``
+    timeout = httpx.Timeout(
+        float(os.environ.get('OPENAI_TIMEOUT', '30')),
+        connect=float(os.environ.get('OPENAI_CONNECT_TIMEOUT', '5'))
+    )
+    http2 = os.environ.get('OPENAI_HTTP2', 'true').lower() == 'true' and _http2_available()
+
+    return httpx.Client(limits=limits, timeout=timeout, http2=http2)
+
+def get_openai_client() -> Optional[OpenAI]:
+    """Get the process-wide OpenAI client, or None when no API key is configured"""
+    global _client
+    if _client is not None:
+        return _client
+
+    api_key = os.environ.get('OPENAI_API_KEY')
+    if not api_key:
+        return None
+
+    with _client_lock:
+        if _client is None:
+            _client = OpenAI(
+                api_key=api_key,
+                base_url=os.environ.get('OPENAI_BASE_URL') or None,
+                http_client=_build_http_client(),
+                # Retries are handled by GPTHandler under the shared retry budget
+                max_retries=int(os.environ.get('OPENAI_CLIENT_MAX_RETRIES', '0'))
+            )
+    return _client
+
+def close_openai_client():
+    """Close the shared client and its connection pool"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
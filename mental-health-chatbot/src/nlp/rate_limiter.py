@@ -0,0 +1,228 @@
+"""
+Rate Limiter - Token-bucket limits on OpenAI requests and tokens, shared across workers
+"""
+
+import os
+import time
+import threading
+from typing import Dict, List, Any, Tuple
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# (key, capacity, refill rate per second, cost)
+BucketRequest = Tuple[str, float, float, float]
+
+class InMemoryBucketStore:
+    """Token buckets held in process memory"""
+
+    def __init__(self):
+        """Initialize store"""
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, requests: List[BucketRequest]) -> Tuple[float, List[float]]:
+        """Take ``cost`` from every bucket or from none.
+
+        Returns the seconds to wait before the request could succeed (0 when it
+        was granted) and the tokens left in each bucket.
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            wait = 0.0
+            for key, capacity, rate, cost in requests:
+                tokens, updated_at = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated_at) * rate)
+                levels.append(tokens)
+                if cost > tokens:
+                    wait = max(wait, (cost - tokens) / rate)
+
+            if wait > 0:
+                return wait, levels
+
+            for i, (key, capacity, rate, cost) in enumerate(requests):
+                levels[i] = min(capacity, levels[i] - cost)
+                self._buckets[key] = (levels[i], now)
+            return 0.0, levels
+
+
+class RedisBucketStore:
+    """Token buckets in Redis, updated atomically by a Lua script"""
+
+    # Costs may be negative to refund over-estimated tokens
+    ACQUIRE_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local levels = {}
+local wait = 0
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[(i - 1) * 3 + 1])
+    local rate = tonumber(ARGV[(i - 1) * 3 + 2])
+    local cost = tonumber(ARGV[(i - 1) * 3 + 3])
+    local bucket = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if cost > tokens then
+        wait = math.max(wait, (cost - tokens) / rate)
+    end
+end
+if wait == 0 then
+    for i = 1, #KEYS do
+        local capacity = tonumber(ARGV[(i - 1) * 3 + 1])
+        local cost = tonumber(ARGV[(i - 1) * 3 + 3])
+        levels[i] = math.min(capacity, levels[i] - cost)
+        redis.call('HSET', KEYS[i], 'tokens', levels[i], 'ts', now)
+        redis.call('EXPIRE', KEYS[i], 120)
+    end
+end
+local result = {tostring(wait)}
+for i = 1, #KEYS do
+    result[i + 1] = tostring(levels[i])
+end
+return result
+"""
+
+    def __init__(self, url: str):
+        """Initialize store"""
+        self.redis = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._script = self.redis.register_script(self.ACQUIRE_SCRIPT)
+
+    def acquire(self, requests: List[BucketRequest]) -> Tuple[float, List[float]]:
+        """Take ``cost`` from every bucket or from none"""
+        keys = [key for key, _, _, _ in requests]
+        args = []
+        for _, capacity, rate, cost in requests:
+            args.extend([capacity, rate, cost])
+
+        result = self._script(keys=keys, args=args)
+        return float(result[0]), [float(level) for level in result[1:]]
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets per OpenAI endpoint.
+
+    Callers ask for capacity before calling the provider. Work waits in line for
+    up to ``max_wait`` seconds and is shed (``acquire`` returns False) when the
+    budget would not recover in time, so we stay under the provider's limits
+    instead of reacting to 429s.
+    """
+
+    def __init__(self, limits: Dict[str, Dict[str, float]], storage_url: str = 'memory://',
+                 key_prefix: str = 'ratelimit:openai'):
+        """Initialize rate limiter"""
+        self.limits = limits
+        self.key_prefix = key_prefix
+        self.memory_store = InMemoryBucketStore()
+        self.store = self.memory_store
+        self.backend = 'memory'
+
+        if storage_url.startswith(('redis://', 'rediss://')):
+            if REDIS_AVAILABLE:
+                self.store = RedisBucketStore(storage_url)
+                self.backend = 'redis'
+            else:
+                print("Warning: redis package not installed. Rate limits apply per process only.")
+
+        self._lock = threading.Lock()
+        self._metrics = {api: {'granted': 0, 'queued': 0, 'shed': 0, 'wait_seconds': 0.0} for api in limits}
+
+    def acquire(self, api: str, tokens: int = 0, max_wait: float = 5.0) -> bool:
+        """Reserve one request and ``tokens`` tokens, waiting up to ``max_wait`` seconds"""
+        if api not in self.limits:
+            return True
+
+        requests = self._bucket_requests(api, 1, tokens)
+        waited = 0.0
+
+        while True:
+            wait, _ = self._acquire(requests)
+            if wait <= 0:
+                self._record(api, 'granted', waited)
+                return True
+
+            if waited + wait > max_wait:
+                self._record(api, 'shed', waited)
+                return False
+
+            if waited == 0:
+                self._record(api, 'queued')
+            time.sleep(wait)
+            waited += wait
+
+    def refund(self, api: str, tokens: int):
+        """Return over-reserved tokens once the actual usage is known"""
+        if api in self.limits and tokens > 0:
+            self._acquire([self._bucket_requests(api, 0, -tokens)[1]])
+
+    def get_utilization(self) -> Dict[str, Any]:
+        """Fraction of each budget currently in use, plus queue/shed counters"""
+        utilization = {'backend': self.backend}
+        for api, limit in self.limits.items():
+            _, levels = self._acquire(self._bucket_requests(api, 0, 0))
+            with self._lock:
+                metrics = dict(self._metrics[api])
+            metrics.update({
+                'rpm_limit': limit['rpm'],
+                'tpm_limit': limit['tpm'],
+                'rpm_utilization': round(1 - levels[0] / limit['rpm'], 3),
+                'tpm_utilization': round(1 - levels[1] / limit['tpm'], 3)
+            })
+            utilization[api] = metrics
+        return utilization
+
+    def _bucket_requests(self, api: str, requests: int, tokens: int) -> List[BucketRequest]:
+        """Build RPM and TPM bucket requests for an endpoint"""
+        limit = self.limits[api]
+        # A single call larger than the whole budget must still be able to run
+        tokens = min(tokens, limit['tpm'])
+        return [
+            (f"{self.key_prefix}:{api}:rpm", limit['rpm'], limit['rpm'] / 60.0, requests),
+            (f"{self.key_prefix}:{api}:tpm", limit['tpm'], limit['tpm'] / 60.0, tokens)
+        ]
+
+    def _acquire(self, requests: List[BucketRequest]) -> Tuple[float, List[float]]:
+        """Acquire from the shared store, degrading to process memory if Redis fails"""
+        if self.store is not self.memory_store:
+            try:
+                return self.store.acquire(requests)
+            except Exception as e:
+                print(f"Redis rate limiter unavailable, using in-memory limits: {e}")
+                self.store = self.memory_store
+                self.backend = 'memory'
+        return self.memory_store.acquire(requests)
+
+    def _record(self, api: str, outcome: str, waited: float = 0.0):
+        with self._lock:
+            self._metrics[api][outcome] += 1
+            self._metrics[api]['wait_seconds'] += waited
+
+
+# Initialize global rate limiter
+rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """Get global OpenAI rate limiter instance"""
+    global rate_limiter
+    if rate_limiter is None:
+        with _rate_limiter_lock:
+            if rate_limiter is None:
+                limits = {
+                    'chat.completions': {
+                        'rpm': float(os.environ.get('OPENAI_CHAT_RPM', '500')),
+                        'tpm': float(os.environ.get('OPENAI_CHAT_TPM', '40000'))
+                    },
+                    'embeddings': {
+                        'rpm': float(os.environ.get('OPENAI_EMBEDDING_RPM', '3000')),
+                        'tpm': float(os.environ.get('OPENAI_EMBEDDING_TPM', '1000000'))
+                    }
+                }
+                storage_url = os.environ.get('RATELIMIT_STORAGE_URL') or os.environ.get('REDIS_URL', 'memory://')
+                rate_limiter = RateLimiter(limits, storage_url)
+    return rate_limiter
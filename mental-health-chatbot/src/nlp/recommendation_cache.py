@@ -0,0 +1,382 @@
+"""
+Recommendation Cache - GPT recommendations cached per quantized profile bucket
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from typing import Dict, List, Any, Optional, Tuple, Callable
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+STATUSES = ['healthy', 'stress', 'anxiety', 'depression', 'crisis']
+SEVERITIES = ['mild', 'moderate', 'severe']
+BANDS = ['low', 'medium', 'high']
+
+# Profile bucket: (status, severity, mood band, stress band, preference flags)
+Bucket = Tuple[str, str, str, str, Tuple[str, ...]]
+
+def _band(value: Optional[float], low: float, high: float) -> str:
+    """Quantize a 0-10 score into low/medium/high"""
+    if value is None:
+        return 'medium'
+    if value < low:
+        return 'low'
+    if value < high:
+        return 'medium'
+    return 'high'
+
+def profile_bucket(user_profile: Dict[str, Any],
+                   current_mood: str,
+                   assessment_results: Dict[str, Any] = None) -> Bucket:
+    """Collapse recommendation inputs into a small, shareable bucket"""
+    assessment_results = assessment_results or {}
+
+    status = user_profile.get('mental_health_status', 'healthy')
+    if status not in STATUSES:
+        status = 'healthy'
+
+    severity = assessment_results.get('severity_level', 'mild')
+    if severity not in SEVERITIES:
+        severity = 'mild'
+
+    mood_score = user_profile.get('mood_score')
+    if mood_score is None:
+        mood_score = {'negative': 2, 'positive': 8}.get(current_mood)
+    mood_band = _band(mood_score, 4, 7)
+    stress_band = _band(user_profile.get('stress_level'), 4, 7)
+
+    preferences = user_profile.get('preferences') or {}
+    flags = tuple(sorted(key for key, value in preferences.items() if value is True))
+
+    return (status, severity, mood_band, stress_band, flags)
+
+def bucket_key(bucket: Bucket) -> str:
+    """Storage key for a bucket"""
+    status, severity, mood_band, stress_band, flags = bucket
+    return f"recs:v1:{status}:{severity}:{mood_band}:{stress_band}:{','.join(flags)}"
+
+def bucket_inputs(bucket: Bucket) -> Tuple[Dict[str, Any], str, Dict[str, Any]]:
+    """Canonical (user_profile, current_mood, assessment_results) for a bucket.
+
+    Prompts are built from these rather than from an individual user's profile,
+    so a cached answer never carries one user's details to another.
+    """
+    status, severity, mood_band, stress_band, flags = bucket
+    user_profile = {
+        'mental_health_status': status,
+        'mood': mood_band,
+        'stress_level': stress_band,
+        'preferences': list(flags)
+    }
+    current_mood = {'low': 'negative', 'medium': 'neutral', 'high': 'positive'}[mood_band]
+    return user_profile, current_mood, {'severity_level': severity}
+
+def common_buckets() -> List[Bucket]:
+    """Buckets worth pre-warming: every status, severity and mood/stress band without preference flags"""
+    return [(status, severity, mood, stress, ())
+            for status, severity, mood, stress in product(STATUSES, SEVERITIES, BANDS, BANDS)]
+
+
+class MemoryEntryStore:
+    """Cache entries held in process memory.
+
+    Like Redis keys, entries expire after ``expire_seconds``; at most
+    ``max_entries`` are kept, dropping the least recently used first, so
+    per-user stores stay bounded without Redis.
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or int(os.environ.get('MEMORY_STORE_MAX_ENTRIES', '10000'))
+        self._entries: 'OrderedDict[str, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            if item[0] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, entry: Dict[str, Any], expire_seconds: float):
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (now + expire_seconds, entry)
+            self._entries.move_to_end(key)
+            # Expired entries at the cold end go first, then the least recently used past the cap
+            while self._entries:
+                oldest_key, (expires_at, _) = next(iter(self._entries.items()))
+                if expires_at > now and len(self._entries) <= self.max_entries:
+                    break
+                del self._entries[oldest_key]
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class RedisEntryStore:
+    """Cache entries shared across workers and the pre-warm job through Redis"""
+
+    def __init__(self, url: str):
+        self.redis = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.redis.get(key)
+        return json.loads(value) if value else None
+
+    def set(self, key: str, entry: Dict[str, Any], expire_seconds: float):
+        self.redis.set(key, json.dumps(entry), ex=int(expire_seconds))
+
+    def delete(self, key: str):
+        self.redis.delete(key)
+
+
+class RecommendationCache:
+    """Stale-while-revalidate cache of recommendation lists.
+
+    Entries younger than ``ttl`` are served as-is. Older entries are still served
+    for up to ``stale_ttl`` more seconds while a background refresh regenerates
+    them; only a missing or fully expired bucket makes the caller wait.
+    """
+
+    def __init__(self, storage_url: str = 'memory://', ttl: float = 24 * 3600,
+                 stale_ttl: float = 7 * 24 * 3600, refresh_workers: int = 2):
+        """Initialize recommendation cache"""
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.memory_store = MemoryEntryStore()
+        self.store = self.memory_store
+        self.backend = 'memory'
+
+        if storage_url.startswith(('redis://', 'rediss://')) and REDIS_AVAILABLE:
+            self.store = RedisEntryStore(storage_url)
+            self.backend = 'redis'
+
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix='rec-refresh')
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._metrics = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0, 'refresh_failures': 0}
+
+    def get(self, bucket: Bucket, compute: Callable[[Bucket], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Return recommendations for a bucket, computing them on a miss"""
+        key = bucket_key(bucket)
+        entry = self._get_entry(key)
+        age = time.time() - entry['created_at'] if entry else None
+
+        if entry and age < self.ttl:
+            self._increment('hits')
+            return entry['recommendations']
+
+        if entry and age < self.ttl + self.stale_ttl:
+            self._increment('stale_hits')
+            self._schedule_refresh(key, bucket, compute)
+            return entry['recommendations']
+
+        self._increment('misses')
+        return self._compute_and_store(key, bucket, compute)
+
+    def prewarm(self, buckets: List[Bucket], compute: Callable[[Bucket], List[Dict[str, Any]]],
+                workers: int = 4, force: bool = False) -> Dict[str, int]:
+        """Generate recommendations for many buckets, skipping fresh ones unless ``force``"""
+        result = {'warmed': 0, 'skipped': 0, 'failed': 0}
+
+        def warm(bucket):
+            key = bucket_key(bucket)
+            entry = self._get_entry(key)
+            if entry and not force and time.time() - entry['created_at'] < self.ttl:
+                return 'skipped'
+            try:
+                self._compute_and_store(key, bucket, compute)
+                return 'warmed'
+            except Exception as e:
+                print(f"Error pre-warming recommendations for {key}: {e}")
+                return 'failed'
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for outcome in executor.map(warm, buckets):
+                result[outcome] += 1
+        return result
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get hit/miss counters"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        lookups = metrics['hits'] + metrics['stale_hits'] + metrics['misses']
+        metrics['hit_rate'] = (metrics['hits'] + metrics['stale_hits']) / lookups if lookups else 0.0
+        metrics['backend'] = self.backend
+        return metrics
+
+    def _compute_and_store(self, key: str, bucket: Bucket, compute) -> List[Dict[str, Any]]:
+        recommendations = compute(bucket)
+        entry = {'recommendations': recommendations, 'created_at': time.time()}
+        self._set_entry(key, entry)
+        return recommendations
+
+    def _schedule_refresh(self, key: str, bucket: Bucket, compute):
+        """Refresh a stale bucket in the background, once per bucket at a time"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            self._metrics['refreshes'] += 1
+
+        def refresh():
+            try:
+                self._compute_and_store(key, bucket, compute)
+            except Exception as e:
+                print(f"Error refreshing recommendations for {key}: {e}")
+                self._increment('refresh_failures')
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._executor.submit(refresh)
+
+    def _get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            return self.store.get(key)
+        except Exception as e:
+            print(f"Recommendation cache unavailable, using in-memory cache: {e}")
+            self.store = self.memory_store
+            self.backend = 'memory'
+            return self.memory_store.get(key)
+
+    def _set_entry(self, key: str, entry: Dict[str, Any]):
+        try:
+            self.store.set(key, entry, self.ttl + self.stale_ttl)
+        except Exception as e:
+            print(f"Recommendation cache unavailable, using in-memory cache: {e}")
+            self.store = self.memory_store
+            self.backend = 'memory'
+            self.memory_store.set(key, entry, self.ttl + self.stale_ttl)
+
+    def _increment(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
+
+
+def input_fingerprint(*inputs: Any) -> str:
+    """Stable digest of JSON-serializable recommendation inputs"""
+    payload = json.dumps(inputs, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class UserRecommendationCache:
+    """One user's latest recommendation list, reused while its inputs stay the same.
+
+    Entries are keyed by user and tagged with a fingerprint of the inputs they
+    were computed from; a lookup with another fingerprint recomputes. Writes
+    that change a user's inputs (mood entries, assessments, completed
+    recommendations) delete the entry through the user profile listeners, and
+    ``ttl`` bounds how long a list is repeated when nothing changes.
+    """
+
+    def __init__(self, storage_url: str = 'memory://', ttl: float = 6 * 3600):
+        """Initialize user recommendation cache"""
+        self.ttl = ttl
+        self.memory_store = MemoryEntryStore()
+        self.store = self.memory_store
+        self.backend = 'memory'
+
+        if storage_url.startswith(('redis://', 'rediss://')) and REDIS_AVAILABLE:
+            self.store = RedisEntryStore(storage_url)
+            self.backend = 'redis'
+
+        self._lock = threading.Lock()
+        self._metrics = {'hits': 0, 'misses': 0, 'changed_inputs': 0, 'invalidations': 0}
+
+    def get(self, user_id: Any, fingerprint: str,
+            compute: Callable[[], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Return the user's cached recommendations for these inputs, computing them otherwise"""
+        key = self._key(user_id)
+        entry = self._call('get', key)
+        if entry and entry['fingerprint'] == fingerprint and time.time() - entry['created_at'] < self.ttl:
+            self._increment('hits')
+            return entry['recommendations']
+
+        self._increment('changed_inputs' if entry else 'misses')
+        recommendations = compute()
+        entry = {'fingerprint': fingerprint, 'recommendations': recommendations, 'created_at': time.time()}
+        self._call('set', key, entry, self.ttl)
+        return recommendations
+
+    def invalidate(self, user_id: Any):
+        """Drop a user's cached recommendations after their inputs changed"""
+        self._increment('invalidations')
+        self._call('delete', self._key(user_id))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get hit/miss counters"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        lookups = metrics['hits'] + metrics['misses'] + metrics['changed_inputs']
+        metrics['hit_rate'] = metrics['hits'] / lookups if lookups else 0.0
+        metrics['backend'] = self.backend
+        return metrics
+
+    def _key(self, user_id: Any) -> str:
+        return f"user-recs:v1:{user_id}"
+
+    def _call(self, method: str, *args):
+        try:
+            return getattr(self.store, method)(*args)
+        except Exception as e:
+            print(f"User recommendation cache unavailable, using in-memory cache: {e}")
+            self.store = self.memory_store
+            self.backend = 'memory'
+            return getattr(self.memory_store, method)(*args)
+
+    def _increment(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
+
+
+# Initialize global recommendation cache
+recommendation_cache = None
+_recommendation_cache_lock = threading.Lock()
+
+def get_recommendation_cache() -> RecommendationCache:
+    """Get global recommendation cache instance"""
+    global recommendation_cache
+    if recommendation_cache is None:
+        with _recommendation_cache_lock:
+            if recommendation_cache is None:
+                recommendation_cache = RecommendationCache(
+                    storage_url=os.environ.get('RECOMMENDATION_CACHE_URL') or os.environ.get('REDIS_URL', 'memory://'),
+                    ttl=float(os.environ.get('RECOMMENDATION_CACHE_TTL', str(24 * 3600))),
+                    stale_ttl=float(os.environ.get('RECOMMENDATION_CACHE_STALE_TTL', str(7 * 24 * 3600)))
+                )
+    return recommendation_cache
+
+user_recommendation_cache = None
+_user_recommendation_cache_lock = threading.Lock()
+
+def get_user_recommendation_cache() -> UserRecommendationCache:
+    """Get global per-user recommendation cache, kept in the same store as user profiles"""
+    global user_recommendation_cache
+    if user_recommendation_cache is None:
+        with _user_recommendation_cache_lock:
+            if user_recommendation_cache is None:
+                user_recommendation_cache = UserRecommendationCache(
+                    storage_url=os.environ.get('USER_PROFILE_STORE_URL') or os.environ.get('REDIS_URL', 'memory://'),
+                    ttl=float(os.environ.get('USER_RECOMMENDATION_CACHE_TTL', str(6 * 3600)))
+                )
+    return user_recommendation_cache
@@ -0,0 +1,220 @@
+"""
+Resilience utilities - Circuit breaker, retry budget and deadlines for external API calls
+"""
+
+import os
+import time
+import random
+import threading
+from typing import Dict, Any, Optional
+
+class Deadline:
+    """Absolute time budget for a unit of work"""
+
+    def __init__(self, timeout: float):
+        """Start a deadline that expires ``timeout`` seconds from now"""
+        self.timeout = timeout
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + timeout
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        """Seconds spent since the deadline was started"""
+        return time.monotonic() - self.started_at
+
+    def expired(self) -> bool:
+        """Whether the budget has been used up"""
+        return self.remaining() <= 0
+
+
+class RequestDeadline(Deadline):
+    """Deadline for one web request that also records how the request was degraded to meet it"""
+
+    def __init__(self, timeout: float):
+        """Start a request deadline"""
+        super().__init__(timeout)
+        self.degradations = []
+
+    def degrade(self, reason: str):
+        """Record a degradation applied because the budget was short"""
+        if reason not in self.degradations:
+            self.degradations.append(reason)
+
+    def sub_deadline(self, reserve: float) -> Deadline:
+        """Deadline for a stage that must leave ``reserve`` seconds for later stages"""
+        return Deadline(max(0.0, self.remaining() - reserve))
+
+
+class CircuitBreaker:
+    """Shared circuit breaker that short-circuits calls to a failing dependency.
+
+    The breaker opens after ``failure_threshold`` consecutive failures. While open,
+    calls are rejected immediately; after ``recovery_timeout`` seconds a single
+    trial call is let through (half-open) and its outcome closes or re-opens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        """Initialize circuit breaker"""
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started_at = 0.0
+        self._metrics = {
+            'successes': 0,
+            'failures': 0,
+            'short_circuited': 0,
+            'times_opened': 0
+        }
+
+    @property
+    def state(self) -> str:
+        """Current breaker state, moving from open to half-open when due"""
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a call may proceed"""
+        with self._lock:
+            self._refresh_state()
+
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.HALF_OPEN:
+                # A trial that never reported back (e.g. abandoned stream) must not wedge the breaker
+                trial_stale = time.monotonic() - self._trial_started_at >= self.recovery_timeout
+                if not self._trial_in_flight or trial_stale:
+                    self._trial_in_flight = True
+                    self._trial_started_at = time.monotonic()
+                    return True
+
+            self._metrics['short_circuited'] += 1
+            return False
+
+    def record_success(self):
+        """Record a successful call"""
+        with self._lock:
+            self._metrics['successes'] += 1
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+            self._state = self.CLOSED
+
+    def release(self):
+        """Give back a granted call that never reached the provider or failed through no fault of its own,
+        so a half-open trial is not held"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Record a failed call"""
+        with self._lock:
+            self._metrics['failures'] += 1
+            self._consecutive_failures += 1
+            self._trial_in_flight = False
+
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._metrics['times_opened'] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def reset(self):
+        """Close the breaker and clear failure counters"""
+        with self._lock:
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get breaker state and counters"""
+        with self._lock:
+            self._refresh_state()
+            metrics = dict(self._metrics)
+            metrics.update({
+                'name': self.name,
+                'state': self._state,
+                'consecutive_failures': self._consecutive_failures,
+                'failure_threshold': self.failure_threshold,
+                'seconds_until_retry': max(0.0, self._opened_at + self.recovery_timeout - time.monotonic())
+                if self._state == self.OPEN else 0.0
+            })
+            return metrics
+
+    def _refresh_state(self):
+        """Move from open to half-open once the recovery timeout elapsed (lock held)"""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+
+
+class RetryBudget:
+    """Process-wide budget that caps retries to a fraction of overall traffic.
+
+    Every first attempt deposits ``ratio`` tokens and every retry withdraws one,
+    so during an outage retries cannot multiply the load on the provider.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_tokens: float = 3.0, max_tokens: float = 50.0):
+        """Initialize retry budget"""
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = min_tokens
+        self._lock = threading.Lock()
+        self._metrics = {'requests': 0, 'retries': 0, 'retries_denied': 0}
+
+    def record_request(self):
+        """Deposit budget for a new (first-attempt) request"""
+        with self._lock:
+            self._metrics['requests'] += 1
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_acquire_retry(self) -> bool:
+        """Withdraw budget for a retry; False when the budget is exhausted"""
+        with self._lock:
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                self._metrics['retries'] += 1
+                return True
+            self._metrics['retries_denied'] += 1
+            return False
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get budget counters"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['available'] = round(self._tokens, 2)
+            return metrics
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0,
+                  deadline: Optional[Deadline] = None) -> float:
+    """Full-jitter exponential backoff, clipped to the remaining deadline"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if deadline is not None:
+        delay = min(delay, deadline.remaining())
+    return delay
+
+
+# Shared across all GPTHandler instances in the process
+openai_breaker = CircuitBreaker(
+    'openai',
+    failure_threshold=int(os.environ.get('OPENAI_BREAKER_FAILURE_THRESHOLD', '5')),
+    recovery_timeout=float(os.environ.get('OPENAI_BREAKER_RECOVERY_TIMEOUT', '30'))
+)
+
+openai_retry_budget = RetryBudget(
+    ratio=float(os.environ.get('OPENAI_RETRY_BUDGET_RATIO', '0.2'))
+)
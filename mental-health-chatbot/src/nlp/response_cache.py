@@ -0,0 +1,245 @@
+"""
+Semantic Response Cache - Reuses vetted GPT replies for near-identical opening messages
+"""
+
+import os
+import re
+import time
+import zlib
+import random
+import threading
+from typing import Dict, List, Any, Optional
+import numpy as np
+from src.nlp.rate_limiter import get_rate_limiter
+
+class HashingEmbedder:
+    """Local, dependency-free text embedding based on hashed word and character n-grams"""
+
+    def __init__(self, dimension: int = 512):
+        """Initialize embedder"""
+        self.dimension = dimension
+
+    def embed(self, text: str, timeout: float = None) -> np.ndarray:
+        """Embed text into an L2-normalized vector (local, so ``timeout`` is unused)"""
+        vector = np.zeros(self.dimension, dtype=np.float32)
+
+        words = text.split()
+        features = list(words)
+        features.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+        padded = f" {text} "
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+
+        for feature in features:
+            # crc32 is stable across processes, unlike hash()
+            bucket = zlib.crc32(feature.encode('utf-8'))
+            sign = 1.0 if bucket & 0x80000000 else -1.0
+            vector[bucket % self.dimension] += sign
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class OpenAIEmbedder:
+    """Embedding backend using the OpenAI embeddings API"""
+
+    def __init__(self, client, model: str = 'text-embedding-ada-002', rate_limiter=None, timeout: float = 2.0):
+        """Initialize embedder"""
+        self.client = client
+        self.model = model
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+
+    def embed(self, text: str, timeout: float = None) -> np.ndarray:
+        """Embed text into an L2-normalized vector, within ``timeout`` seconds (raises on failure)"""
+        timeout = min(self.timeout, timeout) if timeout is not None else self.timeout
+        if timeout <= 0:
+            raise TimeoutError("No time left for the embeddings call")
+        # Never queue for embeddings capacity: a cache lookup is not worth waiting for
+        if self.rate_limiter and not self.rate_limiter.acquire('embeddings', len(text) // 4 + 1, max_wait=0):
+            raise RuntimeError("OpenAI embeddings rate limit budget exhausted")
+        response = self.client.embeddings.create(model=self.model, input=text, timeout=timeout)
+        vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SemanticResponseCache:
+    """Embedding-keyed cache of safe responses, partitioned by conversation type.
+
+    Each entry keeps a few response variants for the same kind of opening message;
+    a lookup whose cosine similarity clears ``similarity_threshold`` returns one of
+    them at random. Crisis conversations are never cached.
+    """
+
+    BYPASS_CONVERSATION_TYPES = {'crisis'}
+
+    def __init__(self,
+                 embedder=None,
+                 similarity_threshold: float = 0.9,
+                 ttl_seconds: float = 6 * 3600,
+                 max_entries_per_type: int = 500,
+                 max_variants: int = 3):
+        """Initialize semantic cache"""
+        self.embedder = embedder or HashingEmbedder()
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries_per_type = max_entries_per_type
+        self.max_variants = max_variants
+        self._partitions: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._metrics = {
+            'lookups': 0,
+            'hits': 0,
+            'misses': 0,
+            'bypassed': 0,
+            'stores': 0,
+            'embedding_errors': 0,
+            'saved_latency_seconds': 0.0
+        }
+
+    def lookup(self, conversation_type: str, message: str, timeout: float = None) -> Optional[Dict[str, Any]]:
+        """Return a cached response for a similar message, or None (also when embedding fails)"""
+        if conversation_type in self.BYPASS_CONVERSATION_TYPES:
+            self._increment('bypassed')
+            return None
+
+        # Counted before embedding, so a failed embedding is a lookup that missed
+        self._increment('lookups')
+        query = self._embed(message, timeout)
+        if query is None:
+            self._increment('misses')
+            return None
+
+        with self._lock:
+            partition = self._partitions.get(conversation_type)
+            match = self._best_match(partition, query) if partition else None
+
+            if match is None:
+                self._metrics['misses'] += 1
+                return None
+
+            entry, similarity = match
+            self._metrics['hits'] += 1
+            self._metrics['saved_latency_seconds'] += entry['avg_latency']
+
+            return {
+                'response': random.choice(entry['variants']),
+                'similarity': similarity,
+                'cached_at': entry['created_at']
+            }
+
+    def store(self, conversation_type: str, message: str, response: str, latency: float = 0.0,
+              timeout: float = None):
+        """Store a vetted response as a variant for this kind of message (skipped when embedding fails)"""
+        if conversation_type in self.BYPASS_CONVERSATION_TYPES:
+            return
+
+        vector = self._embed(message, timeout)
+        if vector is None:
+            return
+        now = time.time()
+
+        with self._lock:
+            partition = self._partitions.setdefault(conversation_type, {
+                'vectors': np.zeros((0, len(vector)), dtype=np.float32),
+                'expires': np.zeros(0, dtype=np.float64),
+                'entries': []
+            })
+            self._evict_expired(partition, now)
+
+            match = self._best_match(partition, vector)
+            if match is not None:
+                entry = match[0]
+                if response not in entry['variants'] and len(entry['variants']) < self.max_variants:
+                    entry['variants'].append(response)
+                    entry['avg_latency'] += (latency - entry['avg_latency']) / len(entry['variants'])
+                return
+
+            if len(partition['entries']) >= self.max_entries_per_type:
+                # Drop the oldest entry
+                partition['entries'].pop(0)
+                partition['vectors'] = partition['vectors'][1:]
+                partition['expires'] = partition['expires'][1:]
+
+            partition['entries'].append({
+                'variants': [response],
+                'created_at': now,
+                'expires_at': now + self.ttl_seconds,
+                'avg_latency': latency
+            })
+            partition['vectors'] = np.vstack([partition['vectors'], vector[np.newaxis, :]])
+            partition['expires'] = np.append(partition['expires'], now + self.ttl_seconds)
+            self._metrics['stores'] += 1
+
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._partitions.clear()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get hit-rate and saved-latency metrics"""
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['hit_rate'] = metrics['hits'] / metrics['lookups'] if metrics['lookups'] else 0.0
+            metrics['entries'] = sum(len(p['entries']) for p in self._partitions.values())
+            return metrics
+
+    @staticmethod
+    def normalize(message: str) -> str:
+        """Normalize a message before embedding"""
+        message = re.sub(r"[^a-z0-9'\s]", ' ', message.lower())
+        return re.sub(r'\s+', ' ', message).strip()
+
+    def _embed(self, message: str, timeout: float = None) -> Optional[np.ndarray]:
+        """Embedding of a normalized message, or None when the embedder fails"""
+        try:
+            return self.embedder.embed(self.normalize(message), timeout=timeout)
+        except Exception as e:
+            print(f"Semantic cache embedding failed, treating as a miss: {e}")
+            self._increment('embedding_errors')
+            return None
+
+    def _best_match(self, partition: Dict[str, Any], vector: np.ndarray):
+        """Find the most similar live entry above the threshold (lock held)"""
+        if not partition['entries']:
+            return None
+
+        # Expired rows are masked out first, so a live match behind an expired one is still found
+        similarities = np.where(partition['expires'] > time.time(), partition['vectors'] @ vector, -np.inf)
+        best = int(np.argmax(similarities))
+
+        if similarities[best] < self.similarity_threshold:
+            return None
+
+        return partition['entries'][best], float(similarities[best])
+
+    def _evict_expired(self, partition: Dict[str, Any], now: float):
+        """Remove expired entries from a partition (lock held)"""
+        live = [i for i, entry in enumerate(partition['entries']) if entry['expires_at'] > now]
+        if len(live) != len(partition['entries']):
+            partition['entries'] = [partition['entries'][i] for i in live]
+            partition['vectors'] = partition['vectors'][live]
+            partition['expires'] = partition['expires'][live]
+
+    def _increment(self, metric: str):
+        with self._lock:
+            self._metrics[metric] += 1
+
+
+# Initialize global semantic cache
+semantic_response_cache = None
+
+def get_semantic_response_cache(client=None) -> SemanticResponseCache:
+    """Get global semantic response cache instance"""
+    global semantic_response_cache
+    if semantic_response_cache is None:
+        backend = os.environ.get('SEMANTIC_CACHE_BACKEND', 'local')
+        embedder = (OpenAIEmbedder(client, rate_limiter=get_rate_limiter(),
+                                   timeout=float(os.environ.get('SEMANTIC_CACHE_EMBED_TIMEOUT', '2')))
+                    if backend == 'openai' and client else HashingEmbedder())
+        semantic_response_cache = SemanticResponseCache(
+            embedder=embedder,
+            similarity_threshold=float(os.environ.get('SEMANTIC_CACHE_THRESHOLD', '0.9')),
+            ttl_seconds=float(os.environ.get('SEMANTIC_CACHE_TTL', str(6 * 3600)))
+        )
+    return semantic_response_cache
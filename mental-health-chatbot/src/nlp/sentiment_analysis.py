@@ -9,6 +9,7 @@ from textblob import TextBlob
 import spacy
 from transformers import pipeline
 import torch
+from src.nlp.crisis_detection import CrisisScanResult, scan_for_crisis
 
 class SentimentAnalyzer:
     """Advanced sentiment analysis for mental health conversations"""
@@ -35,8 +36,9 @@ class SentimentAnalyzer:
             self.sentiment_pipeline = None
             self.emotion_pipeline = None
     
-    def analyze_sentiment(self, text: str) -> Dict[str, Any]:
-        """Comprehensive sentiment analysis"""
+    def analyze_sentiment(self, text: str, use_transformer: bool = True,
+                          crisis_scan: CrisisScanResult = None) -> Dict[str, Any]:
+        """Comprehensive sentiment analysis (``use_transformer=False`` skips the HuggingFace model)"""
         # Basic TextBlob analysis
         blob = TextBlob(text)
         polarity = blob.sentiment.polarity
@@ -51,9 +53,12 @@ class SentimentAnalyzer:
             sentiment_label = 'neutral'
         
         # Advanced analysis with HuggingFace models
-        advanced_sentiment = self._analyze_advanced_sentiment(text)
+        if use_transformer:
+            advanced_sentiment = self._analyze_advanced_sentiment(text)
+        else:
+            advanced_sentiment = {'label': 'neutral', 'score': 0.5, 'skipped': True}
         emotions = self._analyze_emotions(text)
-        mental_health_indicators = self._analyze_mental_health_indicators(text)
+        mental_health_indicators = self._analyze_mental_health_indicators(text, crisis_scan or scan_for_crisis(text))
         
         return {
             'text': text,
@@ -218,7 +223,7 @@ class SentimentAnalyzer:
         
         return {'primary_emotion': 'neutral', 'confidence': 0.5}
     
-    def _analyze_mental_health_indicators(self, text: str) -> Dict[str, Any]:
+    def _analyze_mental_health_indicators(self, text: str, crisis_scan: CrisisScanResult) -> Dict[str, Any]:
         """Analyze specific mental health indicators with enhanced detection"""
         indicators = {
             'crisis_indicators': 0,
@@ -235,14 +240,8 @@ class SentimentAnalyzer:
         
         text_lower = text.lower()
         
-        # Crisis indicators (expanded)
-        crisis_phrases = [
-            'kill myself', 'end it all', 'not worth living', 'better off dead',
-            'hurt myself', 'suicide', 'overdose', 'jump off', 'hang myself',
-            'want to die', 'don\'t want to live', 'no point', 'hopeless',
-            'can\'t go on', 'give up', 'end my life', 'take my life'
-        ]
-        indicators['crisis_indicators'] = sum(1 for phrase in crisis_phrases if phrase in text_lower)
+        # Crisis indicators come from the shared crisis scanner
+        indicators['crisis_indicators'] = crisis_scan.indicator_count
         
         # Support seeking (expanded)
         support_phrases = [
@@ -0,0 +1,153 @@
+"""
+Template Responses - Answers low-risk turns such as greetings and farewells without an LLM call
+"""
+
+import os
+import random
+import re
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+# Reply variants per template; the first of each matches IntentDetector.get_intent_response_template
+TEMPLATE_VARIANTS = {
+    'greeting': [
+        "Hello! I'm here to support you. How are you feeling today?",
+        "Hi there! It's good to hear from you. How has your day been so far?",
+        "Hey! I'm glad you stopped by. What's on your mind today?",
+        "Hello! Thanks for reaching out. How are you doing right now?"
+    ],
+    'farewell': [
+        "Take care! Remember, I'm always here if you need to talk.",
+        "Goodbye for now. Be gentle with yourself, and come back any time.",
+        "Take care of yourself! I'm here whenever you want to talk again.",
+        "It was good talking with you. Look after yourself, and see you soon."
+    ],
+    'gratitude': [
+        "You're very welcome. Is there anything else you'd like to talk about?",
+        "I'm glad that was helpful. I'm here if there's anything else on your mind.",
+        "Happy to help! How are you feeling now?",
+        "Any time. Is there anything else I can support you with today?"
+    ]
+}
+
+GRATITUDE = re.compile(r"\b(thanks|thank you|thx|ty)\b")
+LEAVING = re.compile(r"\b(bye|goodbye|see you|take care|farewell|good night|that's all|that's it|nothing else)\b")
+
+class TemplatePolicy:
+    """Which turns may be answered from templates"""
+
+    def __init__(self, intents: List[str] = None, min_confidence: float = 0.25,
+                 min_margin: float = 0.15, max_words: int = 8):
+        """Initialize template policy"""
+        self.intents = set(intents or ['greeting', 'farewell'])
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        self.max_words = max_words
+
+    def allows(self, message_text: str, intent_result: Dict[str, Any],
+               sentiment_result: Dict[str, Any], crisis_check: Dict[str, Any]) -> bool:
+        """Whether a turn is low-risk and unambiguous enough for a template reply"""
+        if crisis_check.get('is_crisis') or crisis_check.get('keywords'):
+            return False
+        if intent_result.get('primary_intent') not in self.intents:
+            return False
+        if intent_result.get('urgency_level', 'low') != 'low':
+            return False
+        if sentiment_result.get('risk_level', 'low') != 'low' or sentiment_result.get('sentiment_label') == 'negative':
+            return False
+        if len(message_text.split()) > self.max_words:
+            return False
+
+        # "hi, I feel really low" is a greeting by a narrow margin and needs a real reply
+        confidence = intent_result.get('confidence', 0)
+        scores = sorted((score for intent, score in intent_result.get('all_intents', {}).items()
+                         if intent != intent_result.get('primary_intent')), reverse=True)
+        runner_up = scores[0] if scores else 0
+        return confidence >= self.min_confidence and confidence - runner_up >= self.min_margin
+
+
+class TemplateResponder:
+    """Serves template replies under a policy and counts how turns were answered"""
+
+    def __init__(self, policy: TemplatePolicy = None, enabled: bool = True, seed: int = None):
+        """Initialize template responder"""
+        self.policy = policy or TemplatePolicy()
+        self.enabled = enabled
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._sources: Dict[str, int] = {}
+        self._templates: Dict[str, int] = {}
+
+    def respond(self, message_text: str, intent_result: Dict[str, Any],
+                sentiment_result: Dict[str, Any], crisis_check: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Template reply shaped like a GPTHandler response, or None when the turn needs the LLM"""
+        if not self.enabled or not self.policy.allows(message_text, intent_result, sentiment_result, crisis_check):
+            return None
+
+        intent = intent_result['primary_intent']
+        template = self._template_for(intent, message_text)
+        if template not in TEMPLATE_VARIANTS:
+            return None
+
+        with self._lock:
+            response = self._random.choice(TEMPLATE_VARIANTS[template])
+            self._templates[template] = self._templates.get(template, 0) + 1
+
+        return {
+            'response': response,
+            'conversation_type': intent,
+            'safety_check': {'is_safe': True, 'confidence': 1.0},
+            'tokens_used': 0,
+            'timestamp': datetime.now().isoformat(),
+            'template': template
+        }
+
+    def record(self, source: str):
+        """Count one answered turn by source ('llm', 'template', 'fallback', 'crisis_fast_path', ...)"""
+        with self._lock:
+            self._sources[source] = self._sources.get(source, 0) + 1
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Turn counts by source and the share answered without an LLM call"""
+        with self._lock:
+            sources = dict(self._sources)
+            templates = dict(self._templates)
+        turns = sum(sources.values())
+        return {
+            'enabled': self.enabled,
+            'turns': turns,
+            'sources': sources,
+            'templates': templates,
+            'share_without_llm': (turns - sources.get('llm', 0)) / turns if turns else 0.0
+        }
+
+    def _template_for(self, intent: str, message_text: str) -> str:
+        """A plain "thanks" gets an acknowledgement rather than a goodbye"""
+        text = message_text.lower()
+        if intent == 'farewell' and GRATITUDE.search(text) and not LEAVING.search(text):
+            return 'gratitude'
+        return intent
+
+
+# Initialize global template responder
+template_responder = None
+_template_responder_lock = threading.Lock()
+
+def get_template_responder() -> TemplateResponder:
+    """Get global template responder instance"""
+    global template_responder
+    if template_responder is None:
+        with _template_responder_lock:
+            if template_responder is None:
+                intents = [i.strip() for i in os.environ.get('CHAT_TEMPLATE_INTENTS', 'greeting,farewell').split(',') if i.strip()]
+                template_responder = TemplateResponder(
+                    policy=TemplatePolicy(
+                        intents=intents,
+                        min_confidence=float(os.environ.get('CHAT_TEMPLATE_MIN_CONFIDENCE', '0.25')),
+                        min_margin=float(os.environ.get('CHAT_TEMPLATE_MIN_MARGIN', '0.15')),
+                        max_words=int(os.environ.get('CHAT_TEMPLATE_MAX_WORDS', '8'))
+                    ),
+                    enabled=os.environ.get('CHAT_TEMPLATE_RESPONSES', 'true').lower() == 'true'
+                )
+    return template_responder
@@ -0,0 +1,177 @@
+"""
+Usage Ledger - Token, cost and latency accounting for LLM calls and capacity-planning rollups
+"""
+
+import os
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Optional, Iterable
+from src.nlp.model_router import percentile
+
+# USD per 1K (prompt, completion) tokens
+DEFAULT_MODEL_PRICES = {
+    'gpt-4': (0.03, 0.06),
+    'gpt-4-turbo': (0.01, 0.03),
+    'gpt-4o': (0.005, 0.015),
+    'gpt-4o-mini': (0.00015, 0.0006),
+    'gpt-3.5-turbo': (0.0015, 0.002)
+}
+
+# Upper bounds of the total-token bands latency is reported against
+TOKEN_BANDS = [250, 500, 1000, 2000, 4000]
+
+def load_model_prices() -> Dict[str, tuple]:
+    """Default prices with overrides from OPENAI_MODEL_PRICES (JSON, model -> [prompt, completion] per 1K)"""
+    prices = dict(DEFAULT_MODEL_PRICES)
+    overrides = os.environ.get('OPENAI_MODEL_PRICES')
+    if not overrides:
+        return prices
+
+    try:
+        for model, (prompt_price, completion_price) in json.loads(overrides).items():
+            prices[model] = (float(prompt_price), float(completion_price))
+    except (ValueError, TypeError, AttributeError) as e:
+        print(f"Invalid OPENAI_MODEL_PRICES, using default prices: {e}")
+        return dict(DEFAULT_MODEL_PRICES)
+    return prices
+
+MODEL_PRICES = load_model_prices()
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int,
+                  prices: Dict[str, tuple] = None) -> float:
+    """Cost of one call in USD; dated snapshots (gpt-4-0613) are priced as their base model"""
+    prices = prices or MODEL_PRICES
+    price = prices.get(model)
+    if price is None:
+        # Longest matching prefix, so gpt-4o-mini-2024-07-18 is not priced as gpt-4
+        matches = [name for name in prices if model.startswith(name)]
+        if not matches:
+            return 0.0
+        price = prices[max(matches, key=len)]
+    return round((prompt_tokens * price[0] + completion_tokens * price[1]) / 1000, 6)
+
+def usage_entry(gpt_response: Dict[str, Any], conversation_type: str = None) -> Optional[Dict[str, Any]]:
+    """Ledger fields for a reply, or None when no LLM call produced it (templates, cache hits, fallbacks)"""
+    model = gpt_response.get('model')
+    if not model or gpt_response.get('cache_hit'):
+        return None
+
+    total_tokens = gpt_response.get('tokens_used', 0) or 0
+    prompt_tokens = gpt_response.get('prompt_tokens')
+    completion_tokens = gpt_response.get('completion_tokens')
+    if prompt_tokens is None or completion_tokens is None:
+        prompt_tokens, completion_tokens = total_tokens, 0
+
+    return {
+        'model': model,
+        'route': gpt_response.get('route'),
+        'conversation_type': conversation_type or gpt_response.get('conversation_type', 'general'),
+        'prompt_tokens': prompt_tokens,
+        'completion_tokens': completion_tokens,
+        'total_tokens': total_tokens or prompt_tokens + completion_tokens,
+        'latency_ms': gpt_response.get('latency_ms', 0.0),
+        'attempts': gpt_response.get('attempt', 1),
+        'streamed': bool(gpt_response.get('streamed')),
+        'estimated': bool(gpt_response.get('tokens_estimated')),
+        'cost_usd': estimate_cost(model, prompt_tokens, completion_tokens)
+    }
+
+def _token_band(total_tokens: int) -> str:
+    """Label of the token band a call falls into"""
+    lower = 0
+    for upper in TOKEN_BANDS:
+        if total_tokens < upper:
+            return f"{lower}-{upper - 1}"
+        lower = upper
+    return f"{lower}+"
+
+class _Rollup:
+    """Running totals for one group of ledger rows"""
+
+    __slots__ = ('calls', 'prompt_tokens', 'completion_tokens', 'cost_usd', 'latencies')
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.latencies = []
+
+    def add(self, row: Dict[str, Any]):
+        self.calls += 1
+        self.prompt_tokens += row.get('prompt_tokens') or 0
+        self.completion_tokens += row.get('completion_tokens') or 0
+        self.cost_usd += row.get('cost_usd') or 0.0
+        self.latencies.append(row.get('latency_ms') or 0.0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        total_tokens = self.prompt_tokens + self.completion_tokens
+        return {
+            'calls': self.calls,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'total_tokens': total_tokens,
+            'avg_tokens': round(total_tokens / self.calls, 1) if self.calls else 0.0,
+            'cost_usd': round(self.cost_usd, 4),
+            'latency_p50_ms': round(percentile(latencies, 50), 1),
+            'latency_p95_ms': round(percentile(latencies, 95), 1)
+        }
+
+def build_usage_report(rows: Iterable[Dict[str, Any]], since: datetime, until: datetime) -> Dict[str, Any]:
+    """Roll ledger rows up per hour, model, route and conversation type, with p95 latency by token band.
+
+    The capacity section gives the figures rate limits and spend are sized from:
+    the busiest hour's request and token rates and the window's cost projected to a day.
+    """
+    totals = _Rollup()
+    groups = {key: defaultdict(_Rollup) for key in ('hour', 'model', 'route', 'conversation_type', 'token_band')}
+
+    for row in rows:
+        totals.add(row)
+        groups['hour'][row['created_at'].replace(minute=0, second=0, microsecond=0).isoformat()].add(row)
+        groups['model'][row.get('model') or 'unknown'].add(row)
+        groups['route'][row.get('route') or 'unrouted'].add(row)
+        groups['conversation_type'][row.get('conversation_type') or 'general'].add(row)
+        total_tokens = (row.get('prompt_tokens') or 0) + (row.get('completion_tokens') or 0)
+        groups['token_band'][_token_band(total_tokens)].add(row)
+
+    by_hour = [dict(rollup.to_dict(), hour=hour) for hour, rollup in sorted(groups['hour'].items())]
+    band_order = [_token_band(upper - 1) for upper in TOKEN_BANDS] + [f"{TOKEN_BANDS[-1]}+"]
+    latency_by_tokens = [dict(groups['token_band'][band].to_dict(), tokens=band)
+                         for band in band_order if band in groups['token_band']]
+
+    window_hours = max((until - since).total_seconds() / 3600, 1 / 60)
+    peak = max(by_hour, key=lambda entry: entry['total_tokens'], default=None)
+    summary = totals.to_dict()
+
+    return {
+        'since': since.isoformat(),
+        'until': until.isoformat(),
+        'totals': summary,
+        'by_hour': by_hour,
+        'by_model': {name: rollup.to_dict() for name, rollup in groups['model'].items()},
+        'by_route': {name: rollup.to_dict() for name, rollup in groups['route'].items()},
+        'by_conversation_type': {name: rollup.to_dict() for name, rollup in groups['conversation_type'].items()},
+        'latency_by_tokens': latency_by_tokens,
+        'capacity': {
+            'peak_hour': peak['hour'] if peak else None,
+            'peak_requests_per_minute': round(peak['calls'] / 60, 2) if peak else 0.0,
+            'peak_tokens_per_minute': round(peak['total_tokens'] / 60, 1) if peak else 0.0,
+            'avg_tokens_per_minute': round(summary['total_tokens'] / (window_hours * 60), 1),
+            'projected_daily_cost_usd': round(summary['cost_usd'] * 24 / window_hours, 2)
+        }
+    }
+
+def token_usage_report(hours: int = 24) -> Dict[str, Any]:
+    """Usage report over the ledger's last ``hours`` (needs an app context)"""
+    from src.db.models import TokenUsage
+
+    until = datetime.now(timezone.utc).replace(tzinfo=None)
+    since = until - timedelta(hours=hours)
+    columns = (TokenUsage.created_at, TokenUsage.model, TokenUsage.route, TokenUsage.conversation_type,
+               TokenUsage.prompt_tokens, TokenUsage.completion_tokens, TokenUsage.latency_ms, TokenUsage.cost_usd)
+    query = TokenUsage.query.with_entities(*columns).filter(TokenUsage.created_at >= since)
+    rows = (row._asdict() for row in query.yield_per(1000))
+    return build_usage_report(rows, since, until)
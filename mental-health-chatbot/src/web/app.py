@@ -38,6 +38,10 @@ def create_app(config_name=None):
     cors.init_app(app)
     mail.init_app(app)
     
+    # Keep materialized user profiles current from committed writes
+    from src.db.user_profile_service import register_profile_listeners
+    register_profile_listeners(db.session)
+    
     # Configure login manager
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please log in to access this page.'
@@ -77,6 +81,10 @@ def create_app(config_name=None):
     app.register_blueprint(api_bp, url_prefix='/api')
     app.register_blueprint(mood_tracking_bp, url_prefix='/mood-tracking')
     
+    # Register CLI commands
+    from src.web.cli import register_commands
+    register_commands(app)
+    
     # Main routes
     @app.route('/')
     def index():
@@ -0,0 +1,124 @@
+"""
+CLI Commands - Maintenance jobs run with ``flask <command>``
+"""
+
+import time
+import click
+
+def register_commands(app):
+    """Register CLI commands on the app"""
+    app.cli.add_command(prewarm_recommendations_command)
+    app.cli.add_command(token_usage_report_command)
+    app.cli.add_command(precompute_recommendations_command)
+    app.cli.add_command(train_collaborative_filter_command)
+
+@click.command('prewarm-recommendations')
+@click.option('--workers', default=4, show_default=True, help='Concurrent GPT requests')
+@click.option('--max-wait', default=60.0, show_default=True, help='Seconds to queue for rate-limit capacity per request')
+@click.option('--force', is_flag=True, help='Regenerate buckets that are still fresh')
+def prewarm_recommendations_command(workers, max_wait, force):
+    """Pre-generate GPT recommendations for the common profile buckets"""
+    from functools import partial
+    from flask import current_app
+    from src.nlp.gpt_handler import GPTHandler
+    from src.nlp.recommendation_cache import get_recommendation_cache, common_buckets
+    from src.web.routes.chat import _record_background_usage
+    
+    handler = GPTHandler()
+    if not handler.client:
+        click.echo('OPENAI_API_KEY is not set; nothing to pre-warm.')
+        return
+    
+    # Pre-warm calls are ledgered like any other LLM call
+    handler.usage_recorder = partial(_record_background_usage, current_app._get_current_object())
+    
+    # An offline job can queue for provider capacity instead of being shed
+    handler.rate_limit_max_wait = max_wait
+    
+    cache = get_recommendation_cache()
+    if cache.backend != 'redis':
+        click.echo('Warning: recommendation cache is in-memory; set REDIS_URL so the web workers see pre-warmed buckets.')
+    
+    buckets = common_buckets()
+    started = time.time()
+    result = cache.prewarm(buckets, handler.generate_bucket_recommendations, workers=workers, force=force)
+    
+    click.echo(f"Pre-warmed {result['warmed']} of {len(buckets)} buckets "
+               f"({result['skipped']} still fresh, {result['failed']} failed) in {time.time() - started:.1f}s")
+
+@click.command('token-usage-report')
+@click.option('--hours', default=24, show_default=True, help='Hours of the token ledger to report on')
+@click.option('--json', 'as_json', is_flag=True, help='Print the full report as JSON')
+def token_usage_report_command(hours, as_json):
+    """Summarize LLM token spend and latency for sizing rate limits"""
+    import json
+    from src.nlp.usage_ledger import token_usage_report
+    
+    report = token_usage_report(hours)
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+        return
+    
+    totals = report['totals']
+    capacity = report['capacity']
+    click.echo(f"{totals['calls']} calls, {totals['total_tokens']} tokens, ${totals['cost_usd']:.2f} "
+               f"in the last {hours}h (projected ${capacity['projected_daily_cost_usd']:.2f}/day)")
+    click.echo(f"Peak hour {capacity['peak_hour']}: {capacity['peak_requests_per_minute']} RPM, "
+               f"{capacity['peak_tokens_per_minute']} TPM")
+    
+    click.echo(f"\n{'model':<24}{'calls':>8}{'tokens':>12}{'cost':>10}{'p95 ms':>10}")
+    for model, stats in sorted(report['by_model'].items()):
+        click.echo(f"{model:<24}{stats['calls']:>8}{stats['total_tokens']:>12}{stats['cost_usd']:>10.2f}{stats['latency_p95_ms']:>10}")
+    
+    click.echo(f"\n{'tokens':<24}{'calls':>8}{'p50 ms':>12}{'p95 ms':>10}")
+    for band in report['latency_by_tokens']:
+        click.echo(f"{band['tokens']:<24}{band['calls']:>8}{band['latency_p50_ms']:>12}{band['latency_p95_ms']:>10}")
+
+@click.command('precompute-recommendations')
+@click.option('--workers', default=4, show_default=True, help='Worker processes ranking recommendations')
+@click.option('--partition-size', default=200, show_default=True, help='Users per partition handed to a worker')
+@click.option('--insert-chunk', default=1000, show_default=True, help='Rows per bulk insert')
+@click.option('--date', 'day', type=click.DateTime(formats=['%Y-%m-%d']), default=None, help='Day to compute for (default today)')
+@click.option('--checkpoint', default=None, help='Checkpoint file (default RECOMMENDATION_PRECOMPUTE_CHECKPOINT or the temp dir)')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and recompute every user')
+def precompute_recommendations_command(workers, partition_size, insert_chunk, day, checkpoint, restart):
+    """Store every active user's daily and weekly recommendations for /api/recommendations"""
+    from src.ml.models.recommendation_precompute import precompute_recommendations
+    
+    def progress(report):
+        click.echo(f"  {report['total_users']} users stored ({report['users_per_second']} users/s)")
+    
+    report = precompute_recommendations(
+        day=day.date() if day else None,
+        workers=workers,
+        partition_size=partition_size,
+        insert_chunk=insert_chunk,
+        checkpoint_path=checkpoint,
+        resume=not restart,
+        progress=progress
+    )
+    
+    resumed = f", resumed after user {report['resumed_from']}" if report['resumed_from'] else ''
+    click.echo(f"Precomputed {report['rows']} recommendations for {report['users']} users on {report['day']} "
+               f"in {report['elapsed_seconds']:.1f}s ({report['users_per_second']} users/s, "
+               f"{report['rows_per_second']} rows/s{resumed})")
+
+@click.command('train-collaborative-filter')
+@click.option('--factors', default=8, show_default=True, help='Latent factors kept from the SVD')
+@click.option('--chunk-size', default=100000, show_default=True, help='Interactions read per chunk')
+@click.option('--output', default=None, help='Model file (default COLLABORATIVE_MODEL_PATH or data/models)')
+def train_collaborative_filter_command(factors, chunk_size, output):
+    """Fit the collaborative filter on recommendation completions"""
+    from src.ml.models.recommendation_catalog import get_recommendation_catalog
+    from src.ml.models.collaborative_filter import completion_interactions, train_collaborative_model
+    
+    item_keys = [item.key for item in get_recommendation_catalog().items]
+    started = time.time()
+    model = train_collaborative_model(completion_interactions(chunk_size), item_keys, factors, chunk_size)
+    if model is None:
+        click.echo('Not enough completions to train on; keeping the current model.')
+        return
+    
+    model.save(output)
+    click.echo(f"Trained {model.factors} factors over {len(item_keys)} items in {time.time() - started:.1f}s; "
+               f"restart the web workers to load it.")
@@ -5,6 +5,14 @@ Admin Routes - Administrative functions
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for
 from flask_login import login_required, current_user
 from src.db.models import User, ChatSession, Message, MoodEntry, Assessment, ContactMessage, db
+from src.nlp.resilience import openai_breaker, openai_retry_budget
+from src.nlp import response_cache
+from src.nlp.rate_limiter import get_rate_limiter
+from src.nlp.recommendation_cache import get_recommendation_cache, get_user_recommendation_cache
+from src.nlp.template_responses import get_template_responder
+from src.nlp.model_router import get_model_router
+from src.nlp.usage_ledger import token_usage_report
+from src.db.user_profile_service import get_user_profile_service
 from datetime import datetime, timedelta
 import json
 
@@ -324,12 +332,23 @@ def system_health():
     except Exception as e:
         health_status['database'] = f'error: {str(e)}'
     
-    # Check OpenAI API (would need actual API call)
-    # try:
-    #     # Test OpenAI API
-    #     health_status['openai_api'] = 'healthy'
-    # except Exception as e:
-    #     health_status['openai_api'] = f'error: {str(e)}'
+    # OpenAI API health is derived from the shared circuit breaker
+    breaker_metrics = openai_breaker.get_metrics()
+    health_status['openai_api'] = 'healthy' if breaker_metrics['state'] == 'closed' else f"degraded: circuit {breaker_metrics['state']}"
+    health_status['openai_resilience'] = {
+        'circuit_breaker': breaker_metrics,
+        'retry_budget': openai_retry_budget.get_metrics()
+    }
+    
+    # Semantic response cache is created lazily when enabled
+    cache = response_cache.semantic_response_cache
+    health_status['openai_rate_limits'] = get_rate_limiter().get_utilization()
+    health_status['recommendation_cache'] = get_recommendation_cache().get_metrics()
+    health_status['user_recommendation_cache'] = get_user_recommendation_cache().get_metrics()
+    health_status['semantic_cache'] = dict(cache.get_metrics(), enabled=True) if cache else {'enabled': False}
+    health_status['response_sources'] = get_template_responder().get_metrics()
+    health_status['model_routes'] = get_model_router().get_metrics()
+    health_status['user_profiles'] = get_user_profile_service().get_metrics()
     
     # Check Pinecone (would need actual API call)
     # try:
@@ -340,6 +359,13 @@ def system_health():
     
     return jsonify(health_status)
 
+@admin_bp.route('/token-usage')
+@admin_required
+def token_usage():
+    """Token, cost and latency rollups from the LLM usage ledger for capacity planning"""
+    hours = min(max(request.args.get('hours', 24, type=int), 1), 24 * 31)
+    return jsonify(token_usage_report(hours))
+
 @admin_bp.route('/settings')
 @admin_required
 def settings():
@@ -9,7 +9,9 @@ from src.nlp.gpt_handler import GPTHandler
 from src.nlp.sentiment_analysis import SentimentAnalyzer
 from src.nlp.intent_detection import IntentDetector
 from src.ml.models.recommendation_engine import RecommendationEngine
-from datetime import datetime, timedelta
+from src.ml.models.recommendation_precompute import stored_recommendations, record_shown_recommendations
+from src.nlp.recommendation_cache import get_user_recommendation_cache, input_fingerprint
+from datetime import date, datetime, timedelta
 import json
 
 api_bp = Blueprint('api', __name__)
@@ -332,24 +334,40 @@ def submit_assessment():
 def get_recommendations():
     """Get personalized recommendations"""
     user_id = get_jwt_identity()
-    data = request.get_json() or {}
+    data = request.get_json(silent=True) or {}
+    
+    # Without request-specific context, serve the rows the nightly precompute job stored
+    if not data:
+        stored = stored_recommendations(user_id)
+        if stored:
+            return jsonify({
+                'recommendations': [recommendation.to_dict() for recommendation in stored],
+                'precomputed': True
+            })
     
     user_profile = data.get('user_profile', {})
     current_context = data.get('current_context', {})
     assessment_results = data.get('assessment_results')
     
-    # Get user's recent mood data
-    recent_mood = MoodEntry.query.filter_by(user_id=user_id).order_by(MoodEntry.created_at.desc()).first()
-    if recent_mood:
-        user_profile.setdefault('mood_score', recent_mood.mood_score)
-        user_profile.setdefault('stress_level', recent_mood.stress_level or 5)
-    
-    if recommendation_engine:
+    def compute():
+        # Get user's recent mood data
+        recent_mood = MoodEntry.query.filter_by(user_id=user_id).order_by(MoodEntry.created_at.desc()).first()
+        if recent_mood:
+            user_profile.setdefault('mood_score', recent_mood.mood_score)
+            user_profile.setdefault('stress_level', recent_mood.stress_level or 5)
         recommendations = recommendation_engine.generate_recommendations(
             user_profile=user_profile,
             current_context=current_context,
             assessment_results=assessment_results
         )
+        # Stored so they can be completed; completions train the collaborative filter
+        return record_shown_recommendations(user_id, recommendations)
+    
+    if recommendation_engine:
+        # Reused until the request changes or a mood entry, assessment or completion invalidates it
+        fingerprint = input_fingerprint(user_profile, current_context, assessment_results,
+                                        date.today().isoformat(), recommendation_engine.catalog.fingerprint)
+        recommendations = get_user_recommendation_cache().get(user_id, fingerprint, compute)
     else:
         recommendations = [
             {
@@ -2,18 +2,32 @@
 Chat Routes - Handles chatbot interactions
 """
 
-from flask import Blueprint, render_template, request, jsonify, session
+from flask import Blueprint, render_template, request, jsonify, session, Response, stream_with_context, current_app
 from flask_login import login_required, current_user
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.db.models import ChatSession, Message, db
+from src.db.models import ChatSession, Message, Notification, TokenUsage, User, db
+from sqlalchemy import text
 from src.nlp.gpt_handler import GPTHandler
 from src.nlp.sentiment_analysis import SentimentAnalyzer
 from src.nlp.intent_detection import IntentDetector
 from src.nlp.conversation_context import ConversationContext
+from src.nlp.crisis_detection import CRISIS_RESPONSE, scan_for_crisis
+from src.nlp.template_responses import get_template_responder
+from src.nlp.usage_ledger import usage_entry
 from src.ml.models.recommendation_engine import RecommendationEngine
-from datetime import datetime
+from src.ml.models.recommendation_precompute import record_shown_recommendations
+from src.db.user_profile_service import get_user_profile_service
+from src.nlp.recommendation_cache import get_user_recommendation_cache, input_fingerprint
+from src.nlp.resilience import RequestDeadline
+from src.web.utils.timing import StageTimer
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from datetime import date, datetime
+from functools import partial
+import os
 import uuid
 import json
+import time
+import threading
 
 chat_bp = Blueprint('chat', __name__)
 
@@ -30,9 +44,50 @@ except Exception as e:
     intent_detector = None
     recommendation_engine = None
 
+@chat_bp.record
+def _bind_usage_recorder(state):
+    """Ledger the handler's LLM calls made outside a chat turn (bucket recommendations)"""
+    if gpt_handler:
+        gpt_handler.usage_recorder = partial(_record_background_usage, state.app)
+
+# Greetings, farewells and similar low-risk turns are answered from templates
+template_responder = get_template_responder()
+
 # Store conversation contexts in memory (in production, use Redis)
 conversation_contexts = {}
 
+# Worker threads for message stages that do not depend on each other
+stage_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('CHAT_STAGE_WORKERS', '8')),
+    thread_name_prefix='chat-stage'
+)
+
+# Worker threads for work that finishes after the response is sent
+background_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('CHAT_BACKGROUND_WORKERS', '4')),
+    thread_name_prefix='chat-background'
+)
+
+# Crisis follow-ups awaiting delivery, by follow-up id (in production, use Redis)
+crisis_follow_ups = {}
+crisis_follow_ups_lock = threading.Lock()
+
+# Request budget, kept well under the nginx (60s) and gunicorn (120s) timeouts
+REQUEST_DEADLINE = float(os.environ.get('CHAT_REQUEST_DEADLINE', '30'))
+# Seconds kept back for persisting the reply after the LLM call
+PERSIST_RESERVE = float(os.environ.get('CHAT_PERSIST_RESERVE', '2'))
+# Below this much remaining budget the LLM call is skipped for the fallback reply
+LLM_MIN_BUDGET = float(os.environ.get('CHAT_LLM_MIN_BUDGET', '3'))
+# Below this much remaining budget sentiment analysis skips the transformer model
+TRANSFORMER_MIN_BUDGET = float(os.environ.get('CHAT_TRANSFORMER_MIN_BUDGET', '10'))
+# Shortest wait for the analysis stages, however tight the budget
+ANALYSIS_MIN_WAIT = float(os.environ.get('CHAT_ANALYSIS_MIN_WAIT', '0.25'))
+# Answer crisis messages with the vetted reply at once and generate the LLM follow-up in the background
+CRISIS_FAST_PATH = os.environ.get('CHAT_CRISIS_FAST_PATH', 'true').lower() == 'true'
+# Budget for the background crisis follow-up, and how long it is kept for delivery
+CRISIS_FOLLOW_UP_DEADLINE = float(os.environ.get('CHAT_CRISIS_FOLLOW_UP_DEADLINE', '30'))
+CRISIS_FOLLOW_UP_RETENTION = float(os.environ.get('CHAT_CRISIS_FOLLOW_UP_RETENTION', '600'))
+
 @chat_bp.route('/')
 @login_required
 def index():
@@ -90,173 +145,667 @@ def send_message(session_id):
     if not chat_session:
         return jsonify({'error': 'Session not found'}), 404
     
-    # Get conversation context
-    context = conversation_contexts.get(session_id)
-    if not context:
-        context = ConversationContext()
-        context.initialize_session(session_id, chat_session.user_id)
-        conversation_contexts[session_id] = context
+    context = _get_or_create_context(chat_session)
+    timer = StageTimer()
+    deadline = RequestDeadline(REQUEST_DEADLINE)
+    
+    # The crisis scan is a single cheap regex pass, safety-critical and never skipped
+    with timer.stage('crisis_check'):
+        crisis_scan = scan_for_crisis(message_text)
+    
+    if CRISIS_FAST_PATH and crisis_scan.is_crisis:
+        return jsonify(_crisis_fast_path(chat_session, context, message_text, crisis_scan, timer))
     
     try:
-        # Save user message
-        user_message = Message(
-            session_id=chat_session.id,
-            sender='user',
-            content=message_text,
-            message_type='text'
-        )
-        db.session.add(user_message)
-        
-        # Add to conversation context
-        context.add_message('user', message_text)
-        
-        # Enhanced message analysis
-        sentiment_result = sentiment_analyzer.analyze_sentiment(message_text) if sentiment_analyzer else {'sentiment_label': 'neutral', 'polarity': 0, 'risk_level': 'low'}
-        intent_result = intent_detector.detect_intent(message_text) if intent_detector else {'primary_intent': 'general_question', 'confidence': 0.5, 'urgency_level': 'low'}
-        
-        # Update context with analysis
-        context.update_sentiment(sentiment_result)
-        context.update_intent(intent_result)
-        
-        # Check for crisis keywords
-        crisis_check = gpt_handler.detect_crisis_keywords(message_text) if gpt_handler else {'is_crisis': False, 'keywords': [], 'severity': 'low'}
+        turn = _prepare_turn(chat_session, context, message_text, crisis_scan, timer, deadline)
+        template_response = _template_response(turn)
         
-        # Enhanced mental health analysis
-        mental_health_indicators = sentiment_result.get('mental_health_indicators', {})
+        # Generate GPT response with enhanced context
+        with timer.stage('llm'):
+            if template_response:
+                gpt_response = template_response
+            elif not gpt_handler:
+                gpt_response = _default_gpt_response(turn['conversation_type'])
+            elif deadline.remaining() < LLM_MIN_BUDGET:
+                deadline.degrade('llm_skipped')
+                gpt_response = gpt_handler.get_fallback_response(message_text, turn['conversation_type'])
+            else:
+                gpt_response = gpt_handler.generate_response(
+                    user_message=message_text,
+                    conversation_history=turn['conversation_history'],
+                    context=turn['enhanced_context'],
+                    conversation_type=turn['conversation_type'],
+                    deadline=deadline.sub_deadline(PERSIST_RESERVE)
+                )
+                if gpt_response.get('deadline_exceeded'):
+                    deadline.degrade('llm_fallback')
+        template_responder.record(_response_source(gpt_response))
         
-        # Determine conversation type with enhanced logic
-        conversation_type = 'crisis' if crisis_check['is_crisis'] else intent_result.get('primary_intent', 'general')
+        response_data = _finalize_turn(chat_session, context, turn, gpt_response, timer, deadline)
         
-        # Prepare enhanced context for GPT
-        conversation_history = context.get_conversation_history(limit=10)
-        context_summary = context.get_context_for_gpt()
+        return jsonify(response_data)
         
-        # Enhanced context with mental health indicators
-        enhanced_context = {
-            'context_summary': context_summary,
-            'mental_health_indicators': mental_health_indicators,
-            'sentiment_analysis': sentiment_result,
-            'intent_analysis': intent_result,
-            'crisis_indicators': crisis_check,
-            'user_profile': context.get_user_profile() if hasattr(context, 'get_user_profile') else {}
-        }
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error processing message: {e}")
+        return jsonify({
+            'error': 'Failed to process message',
+            'message': 'I apologize, but I encountered an error. Please try again.'
+        }), 500
+
+@chat_bp.route('/api/session/<session_id>/message/stream', methods=['POST'])
+def stream_message(session_id):
+    """Send a message and stream the chatbot reply as Server-Sent Events"""
+    data = request.get_json()
+    message_text = data.get('message', '').strip()
+    
+    if not message_text:
+        return jsonify({'error': 'Message cannot be empty'}), 400
+    
+    chat_session = ChatSession.query.filter_by(session_id=session_id).first()
+    if not chat_session:
+        return jsonify({'error': 'Session not found'}), 404
+    
+    context = _get_or_create_context(chat_session)
+    timer = StageTimer()
+    deadline = RequestDeadline(REQUEST_DEADLINE)
+    
+    with timer.stage('crisis_check'):
+        crisis_scan = scan_for_crisis(message_text)
+    
+    if CRISIS_FAST_PATH and crisis_scan.is_crisis:
+        response_data = _crisis_fast_path(chat_session, context, message_text, crisis_scan, timer)
+        events = _format_sse('token', {'content': response_data['message']}) + _format_sse('done', response_data)
+        return Response(events, mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    
+    try:
+        turn = _prepare_turn(chat_session, context, message_text, crisis_scan, timer, deadline)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error processing message: {e}")
+        return jsonify({'error': 'Failed to process message'}), 500
+    
+    def generate():
+        gpt_response = None
+        llm_started = time.perf_counter()
+        template_response = _template_response(turn)
         
-        # Generate GPT response with enhanced context
-        if gpt_handler:
-            gpt_response = gpt_handler.generate_response(
+        if template_response:
+            events = [{'type': 'token', 'content': template_response['response']}, dict(template_response, type='done')]
+        elif gpt_handler and deadline.remaining() >= LLM_MIN_BUDGET:
+            events = gpt_handler.stream_response(
                 user_message=message_text,
-                conversation_history=conversation_history,
-                context=enhanced_context,
-                conversation_type=conversation_type
+                conversation_history=turn['conversation_history'],
+                context=turn['enhanced_context'],
+                conversation_type=turn['conversation_type'],
+                deadline=deadline.sub_deadline(PERSIST_RESERVE)
             )
         else:
-            gpt_response = {
-                'response': "Thank you for sharing with me. I'm here to listen and support you. While I may not have all the answers, I want you to know that your feelings are valid and there are resources available to help.",
-                'conversation_type': conversation_type,
-                'safety_check': {'is_safe': True, 'confidence': 1.0}
-            }
+            if gpt_handler:
+                deadline.degrade('llm_skipped')
+                fallback = gpt_handler.get_fallback_response(message_text, turn['conversation_type'])
+            else:
+                fallback = _default_gpt_response(turn['conversation_type'])
+            events = [{'type': 'token', 'content': fallback['response']}, dict(fallback, type='done')]
+        
+        sent = []
+        try:
+            for event in events:
+                if event['type'] == 'token':
+                    sent.append(event['content'])
+                    yield _format_sse('token', {'content': event['content']})
+                else:
+                    gpt_response = {k: v for k, v in event.items() if k != 'type'}
+        except Exception as e:
+            print(f"Error streaming reply: {e}")
         
-        bot_response_text = gpt_response['response']
+        # The stream broke off or ended without its done event
+        if gpt_response is None:
+            gpt_response = _unfinished_stream_response(message_text, turn['conversation_type'], ''.join(sent).strip())
+            if not sent:
+                yield _format_sse('token', {'content': gpt_response['response']})
+        timer.record('llm', time.perf_counter() - llm_started)
+        if gpt_response.get('deadline_exceeded'):
+            deadline.degrade('llm_fallback')
+        template_responder.record(_response_source(gpt_response))
         
-        # Save bot response
-        bot_message = Message(
-            session_id=chat_session.id,
-            sender='bot',
-            content=bot_response_text,
-            message_type='text',
-            metadata=json.dumps({
-                'sentiment': sentiment_result,
-                'intent': intent_result,
-                'crisis_check': crisis_check,
-                'gpt_metadata': gpt_response
+        # Persist and post-process once the full reply is known
+        try:
+            response_data = _finalize_turn(chat_session, context, turn, gpt_response, timer, deadline)
+            yield _format_sse('done', response_data)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error finalizing streamed message: {e}")
+            yield _format_sse('error', {
+                'error': 'Failed to process message',
+                'message': 'I apologize, but I encountered an error. Please try again.'
             })
-        )
-        db.session.add(bot_message)
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def _get_or_create_context(chat_session):
+    """Get the in-memory conversation context for a session"""
+    context = conversation_contexts.get(chat_session.session_id)
+    if not context:
+        context = ConversationContext()
+        context.initialize_session(chat_session.session_id, chat_session.user_id)
+        conversation_contexts[chat_session.session_id] = context
+    return context
+
+def _prepare_turn(chat_session, context, message_text, crisis_scan, timer, deadline):
+    """Save the user message, analyse it and start recommendations ahead of the LLM call"""
+    # Save user message
+    user_message = Message(
+        session_id=chat_session.id,
+        sender='user',
+        content=message_text,
+        message_type='text'
+    )
+    db.session.add(user_message)
+    
+    # Add to conversation context
+    context.add_message('user', message_text)
+    
+    # The crisis scan result is shared with sentiment and intent analysis
+    crisis_check = crisis_scan.to_dict()
+    
+    # Sentiment and intent analysis are independent, so run them side by side
+    with timer.stage('analysis'):
+        use_transformer = deadline.remaining() >= TRANSFORMER_MIN_BUDGET
+        if not use_transformer:
+            deadline.degrade('sentiment_transformer_skipped')
         
-        # Add bot response to context
-        context.add_message('bot', bot_response_text)
+        sentiment_future = stage_executor.submit(_run_stage, timer, 'sentiment', _analyze_sentiment, message_text, use_transformer, crisis_scan)
+        intent_future = stage_executor.submit(_run_stage, timer, 'intent', _detect_intent, message_text, crisis_scan)
         
-        # Update chat session
-        chat_session.context_data = json.dumps(context.to_dict())
-        chat_session.mood_detected = sentiment_result.get('sentiment_label')
-        chat_session.sentiment_score = sentiment_result.get('polarity')
+        # Analysis may only use what the LLM call and persistence do not need,
+        # but always gets a short window since it is usually fast
+        analysis_deadline = deadline.sub_deadline(LLM_MIN_BUDGET + PERSIST_RESERVE)
+        analysis_wait_until = time.monotonic() + max(ANALYSIS_MIN_WAIT, analysis_deadline.remaining())
+        try:
+            sentiment_result = sentiment_future.result(timeout=max(0, analysis_wait_until - time.monotonic()))
+        except FuturesTimeoutError:
+            deadline.degrade('sentiment_fast_path')
+            sentiment_result = _analyze_sentiment(message_text, False, crisis_scan)
+        try:
+            intent_result = intent_future.result(timeout=max(0, analysis_wait_until - time.monotonic()))
+        except FuturesTimeoutError:
+            deadline.degrade('intent_default')
+            intent_result = _default_intent()
+    
+    # Update context with analysis
+    context.update_sentiment(sentiment_result)
+    context.update_intent(intent_result)
+    
+    # Enhanced mental health analysis
+    mental_health_indicators = sentiment_result.get('mental_health_indicators', {})
+    
+    # Determine conversation type with enhanced logic
+    conversation_type = 'crisis' if crisis_check['is_crisis'] else intent_result.get('primary_intent', 'general')
+    
+    # Prepare enhanced context for GPT
+    conversation_history = context.get_conversation_history(limit=10)
+    context_summary = context.get_context_for_gpt()
+    
+    # Enhanced context with mental health indicators
+    enhanced_context = {
+        'context_summary': context_summary,
+        'mental_health_indicators': mental_health_indicators,
+        'sentiment_analysis': sentiment_result,
+        'intent_analysis': intent_result,
+        'crisis_indicators': crisis_check,
+        'user_profile': context.get_user_profile() if hasattr(context, 'get_user_profile') else {}
+    }
+    
+    turn = {
+        'message_text': message_text,
+        'sentiment_result': sentiment_result,
+        'intent_result': intent_result,
+        'crisis_check': crisis_check,
+        'mental_health_indicators': mental_health_indicators,
+        'conversation_type': conversation_type,
+        'conversation_history': conversation_history,
+        'enhanced_context': enhanced_context
+    }
+    
+    # Recommendations do not depend on the reply, so compute them while the LLM call is in flight
+    turn['recommendations_future'] = _start_recommendations(context, turn, timer)
+    
+    return turn
+
+def _crisis_fast_path(chat_session, context, message_text, crisis_scan, timer):
+    """Answer a crisis message at once with the vetted reply and emergency resources.
+    
+    The personalized LLM follow-up, persistence and the admin alert all run in the
+    background; the client collects the follow-up from the follow-up endpoint.
+    Whatever fails on the way, the vetted reply is still returned.
+    """
+    try:
+        return _crisis_fast_path_turn(chat_session, context, message_text, crisis_scan, timer)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in crisis fast path, sending the vetted reply only: {e}")
+        return {
+            'message': CRISIS_RESPONSE,
+            'sentiment': {'sentiment_label': 'negative', 'risk_level': 'high'},
+            'intent': {'primary_intent': 'crisis', 'confidence': 1.0, 'urgency_level': 'high'},
+            'crisis_detected': True,
+            'escalation_needed': True,
+            'recommendations': [],
+            'recommendations_deferred': False,
+            'follow_up_id': None,
+            'timings': timer.as_dict(),
+            'degradations': ['crisis_turn_not_saved']
+        }
+
+def _crisis_fast_path_turn(chat_session, context, message_text, crisis_scan, timer):
+    """Record the crisis turn in the context and start its background work (may raise)"""
+    crisis_check = crisis_scan.to_dict()
+    template_responder.record('crisis_fast_path')
+    
+    with timer.stage('crisis_response'):
+        context.add_message('user', message_text)
+        conversation_history = context.get_conversation_history(limit=10)
+        enhanced_context = {
+            'context_summary': context.get_context_for_gpt(),
+            'crisis_indicators': crisis_check
+        }
+        context.add_message('bot', CRISIS_RESPONSE)
         
-        db.session.commit()
+        recommendations = recommendation_engine.get_emergency_recommendations() if recommendation_engine else []
         
-        # Enhanced recommendation generation
-        recommendations = []
-        should_generate_recommendations = (
-            intent_result.get('primary_intent') == 'recommendation_request' or 
-            sentiment_result.get('risk_level') in ['medium', 'high'] or
-            mental_health_indicators.get('total_indicators', 0) > 2 or
-            crisis_check['is_crisis']
-        )
+        follow_up_id = str(uuid.uuid4())
+        _register_follow_up(follow_up_id, chat_session.session_id)
         
-        if should_generate_recommendations:
-            # Enhanced user profile with mental health indicators
-            user_profile = {
-                'user_id': current_user.id if current_user.is_authenticated else 'anonymous',
-                'mental_health_status': self._determine_mental_health_status(mental_health_indicators),
-                'mood_score': int((sentiment_result.get('polarity', 0) + 1) * 5),  # Convert -1,1 to 1,10
-                'stress_level': int(mental_health_indicators.get('stress_indicators', 0) * 2),  # Scale 0-5 to 0-10
-                'preferences': context.get_user_preferences() if hasattr(context, 'get_user_preferences') else {},
-                'successful_activities': context.get_successful_activities() if hasattr(context, 'get_successful_activities') else [],
-                'goals': context.get_user_goals() if hasattr(context, 'get_user_goals') else [],
-                'current_challenges': context.get_current_challenges() if hasattr(context, 'get_current_challenges') else []
-            }
-            
-            # Enhanced current context
-            current_context = {
-                'current_mood': sentiment_result.get('sentiment_label', 'neutral'),
-                'time_of_day': self._get_time_of_day(),
-                'available_time': 30,
-                'user_message': message_text,
-                'mental_health_indicators': mental_health_indicators,
-                'crisis_detected': crisis_check['is_crisis']
-            }
-            
-            # Assessment results for enhanced recommendations
-            assessment_results = {
-                'risk_level': sentiment_result.get('risk_level', 'low'),
-                'severity_level': self._determine_severity_level(mental_health_indicators),
-                'indicators': mental_health_indicators
-            }
+        app = current_app._get_current_object()
+        persisted = background_executor.submit(
+            _persist_crisis_turn, app, chat_session.id, message_text, crisis_check,
+            follow_up_id, json.dumps(context.to_dict())
+        )
+        background_executor.submit(
+            _generate_crisis_follow_up, app, chat_session.id, context, follow_up_id,
+            message_text, conversation_history, enhanced_context, persisted
+        )
+    
+    return {
+        'message': CRISIS_RESPONSE,
+        'sentiment': {'sentiment_label': 'negative', 'risk_level': 'high'},
+        'intent': {'primary_intent': 'crisis', 'confidence': 1.0, 'urgency_level': 'high'},
+        'crisis_detected': True,
+        'escalation_needed': True,
+        'recommendations': recommendations[:3],
+        'recommendations_deferred': False,
+        'follow_up_id': follow_up_id,
+        'conversation_context': context.get_context_summary(),
+        'timings': timer.as_dict(),
+        'degradations': []
+    }
+
+def _register_follow_up(follow_up_id, session_id):
+    """Track a pending crisis follow-up and drop ones past retention"""
+    now = time.time()
+    with crisis_follow_ups_lock:
+        expired = [key for key, entry in crisis_follow_ups.items() if now - entry['created_at'] > CRISIS_FOLLOW_UP_RETENTION]
+        for key in expired:
+            del crisis_follow_ups[key]
+        crisis_follow_ups[follow_up_id] = {'session_id': session_id, 'status': 'pending', 'message': None, 'created_at': now}
+
+def _persist_crisis_turn(app, chat_session_pk, message_text, crisis_check, follow_up_id, context_data):
+    """Save a fast-path crisis turn and alert administrators"""
+    with app.app_context():
+        try:
+            chat_session = db.session.get(ChatSession, chat_session_pk)
+            db.session.add(Message(
+                session_id=chat_session_pk,
+                sender='user',
+                content=message_text,
+                message_type='text'
+            ))
+            db.session.add(Message(
+                session_id=chat_session_pk,
+                sender='bot',
+                content=CRISIS_RESPONSE,
+                message_type='text',
+                message_metadata=json.dumps({
+                    'crisis_check': crisis_check,
+                    'crisis_fast_path': True,
+                    'follow_up_id': follow_up_id
+                })
+            ))
+            chat_session.context_data = context_data
+            chat_session.mood_detected = 'negative'
             
-            if recommendation_engine:
-                recommendations = recommendation_engine.generate_recommendations(
-                    user_profile=user_profile,
-                    current_context=current_context,
-                    assessment_results=assessment_results
+            # Alert every active administrator
+            for admin in User.query.filter_by(is_admin=True, is_active=True).all():
+                db.session.add(Notification(
+                    user_id=admin.id,
+                    notification_type='crisis_alert',
+                    title='Crisis detected in chat session',
+                    message=f"Session {chat_session.session_id} matched crisis language: {', '.join(crisis_check['keywords'])}"
+                ))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error persisting crisis turn: {e}")
+
+def _generate_crisis_follow_up(app, chat_session_pk, context, follow_up_id, message_text, conversation_history, enhanced_context, persisted):
+    """Generate and save the personalized LLM reply that follows the vetted crisis response"""
+    with app.app_context():
+        try:
+            if gpt_handler:
+                gpt_response = gpt_handler.generate_response(
+                    user_message=message_text,
+                    conversation_history=conversation_history,
+                    context=enhanced_context,
+                    conversation_type='crisis',
+                    deadline=RequestDeadline(CRISIS_FOLLOW_UP_DEADLINE)
                 )
             else:
-                recommendations = []
-        
-        # Check if escalation is needed
-        escalation_needed = (
-            crisis_check['is_crisis'] or 
-            intent_result.get('urgency_level') == 'high' or
-            sentiment_result.get('risk_level') == 'high'
-        )
-        
-        response_data = {
-            'message': bot_response_text,
+                gpt_response = {'error': 'GPT handler unavailable'}
+            
+            # A canned reply would only repeat the vetted response
+            if gpt_response.get('error') or gpt_response.get('fallback_mode') or gpt_response.get('deadline_exceeded'):
+                _complete_follow_up(follow_up_id, 'unavailable')
+                return
+            
+            follow_up_text = gpt_response['response']
+            context.add_message('bot', follow_up_text)
+            
+            # Keep the saved history in order behind the user message and vetted reply
+            persisted.result()
+            db.session.add(Message(
+                session_id=chat_session_pk,
+                sender='bot',
+                content=follow_up_text,
+                message_type='text',
+                message_metadata=json.dumps({
+                    'crisis_follow_up': True,
+                    'follow_up_id': follow_up_id,
+                    'gpt_metadata': gpt_response
+                })
+            ))
+            _record_token_usage(db.session.get(ChatSession, chat_session_pk), gpt_response, 'crisis')
+            db.session.commit()
+            _complete_follow_up(follow_up_id, 'ready', follow_up_text)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error generating crisis follow-up: {e}")
+            _complete_follow_up(follow_up_id, 'unavailable')
+
+def _complete_follow_up(follow_up_id, status, message=None):
+    """Record the outcome of a crisis follow-up"""
+    with crisis_follow_ups_lock:
+        entry = crisis_follow_ups.get(follow_up_id)
+        if entry:
+            entry['status'] = status
+            entry['message'] = message
+
+def _template_response(turn):
+    """Template reply for a low-risk turn, or None when it needs the LLM"""
+    return template_responder.respond(
+        turn['message_text'], turn['intent_result'], turn['sentiment_result'], turn['crisis_check']
+    )
+
+def _response_source(gpt_response):
+    """How a reply was produced, for the share of turns answered without an LLM call"""
+    if gpt_response.get('template'):
+        return 'template'
+    if gpt_response.get('cache_hit'):
+        return 'semantic_cache'
+    if gpt_response.get('error') or gpt_response.get('fallback_mode') or gpt_response.get('deadline_exceeded') \
+            or gpt_response.get('rate_limited') or 'tokens_used' not in gpt_response:
+        return 'fallback'
+    return 'llm'
+
+def _run_stage(timer, name, func, *args, **kwargs):
+    """Run a stage on a worker thread and record its duration"""
+    with timer.stage(name):
+        return func(*args, **kwargs)
+
+def _analyze_sentiment(message_text, use_transformer=True, crisis_scan=None):
+    """Sentiment analysis with a neutral default"""
+    if not sentiment_analyzer:
+        return {'sentiment_label': 'neutral', 'polarity': 0, 'risk_level': 'low'}
+    return sentiment_analyzer.analyze_sentiment(message_text, use_transformer=use_transformer, crisis_scan=crisis_scan)
+
+def _detect_intent(message_text, crisis_scan=None):
+    """Intent detection with a general default"""
+    if not intent_detector:
+        return _default_intent()
+    return intent_detector.detect_intent(message_text, crisis_scan=crisis_scan)
+
+def _default_intent():
+    """Intent used when detection is unavailable or out of time"""
+    return {'primary_intent': 'general_question', 'confidence': 0.5, 'urgency_level': 'low'}
+
+def _start_recommendations(context, turn, timer):
+    """Submit recommendation generation for this turn, or return None when not needed"""
+    sentiment_result = turn['sentiment_result']
+    intent_result = turn['intent_result']
+    crisis_check = turn['crisis_check']
+    mental_health_indicators = turn['mental_health_indicators']
+    
+    should_generate_recommendations = (
+        intent_result.get('primary_intent') == 'recommendation_request' or 
+        sentiment_result.get('risk_level') in ['medium', 'high'] or
+        mental_health_indicators.get('total_indicators', 0) > 2 or
+        crisis_check['is_crisis']
+    )
+    
+    if not should_generate_recommendations or not recommendation_engine:
+        return None
+    
+    # Enhanced user profile, built on the request thread where current_user is available.
+    # Signed-in users start from their materialized profile; this turn's signals fill
+    # what they have not recorded, and a condition detected now outranks the stored status.
+    stored_profile = _stored_user_profile()
+    turn_status = _determine_mental_health_status(mental_health_indicators)
+    mood_score = stored_profile.get('mood_score')
+    stress_level = stored_profile.get('stress_level')
+    user_profile = {
+        'user_id': current_user.id if current_user.is_authenticated else 'anonymous',
+        'mental_health_status': turn_status if turn_status != 'healthy' else stored_profile.get('mental_health_status', turn_status),
+        'mood_score': mood_score if mood_score is not None else int((sentiment_result.get('polarity', 0) + 1) * 5),  # Convert -1,1 to 1,10
+        'stress_level': stress_level if stress_level is not None else int(mental_health_indicators.get('stress_indicators', 0) * 2),  # Scale 0-5 to 0-10
+        'preferences': dict(context.context.get('user_preferences', {})),
+        'successful_activities': stored_profile.get('activities_completed', []),
+        'completed_items': stored_profile.get('completed_items', {}),
+        'goals': [],
+        'current_challenges': []
+    }
+    
+    # Enhanced current context
+    current_context = {
+        'current_mood': sentiment_result.get('sentiment_label', 'neutral'),
+        'time_of_day': _get_time_of_day(),
+        'available_time': 30,
+        'user_message': turn['message_text'],
+        'mental_health_indicators': mental_health_indicators,
+        'crisis_detected': crisis_check['is_crisis']
+    }
+    
+    # Assessment results for enhanced recommendations
+    assessment_results = {
+        'risk_level': sentiment_result.get('risk_level', 'low'),
+        'severity_level': _determine_severity_level(mental_health_indicators),
+        'indicators': mental_health_indicators
+    }
+    
+    return stage_executor.submit(
+        _run_stage, timer, 'recommendations', recommendation_engine.generate_recommendations,
+        user_profile=user_profile,
+        current_context=current_context,
+        assessment_results=assessment_results
+    )
+
+def _finalize_turn(chat_session, context, turn, gpt_response, timer, deadline):
+    """Persist the bot reply and run post-processing for a completed turn"""
+    sentiment_result = turn['sentiment_result']
+    intent_result = turn['intent_result']
+    crisis_check = turn['crisis_check']
+    
+    bot_response_text = gpt_response['response']
+    
+    # Save bot response
+    bot_message = Message(
+        session_id=chat_session.id,
+        sender='bot',
+        content=bot_response_text,
+        message_type='text',
+        message_metadata=json.dumps({
             'sentiment': sentiment_result,
             'intent': intent_result,
-            'crisis_detected': crisis_check['is_crisis'],
-            'escalation_needed': escalation_needed,
-            'recommendations': recommendations[:3],  # Limit to 3 recommendations
-            'conversation_context': context.get_context_summary()
+            'crisis_check': crisis_check,
+            'gpt_metadata': gpt_response
+        })
+    )
+    db.session.add(bot_message)
+    _record_token_usage(chat_session, gpt_response, turn['conversation_type'])
+    
+    # Add bot response to context
+    context.add_message('bot', bot_response_text)
+    
+    # Update chat session
+    chat_session.context_data = json.dumps(context.to_dict())
+    chat_session.mood_detected = sentiment_result.get('sentiment_label')
+    chat_session.sentiment_score = sentiment_result.get('polarity')
+    
+    with timer.stage('persist'):
+        _bound_statement_time(deadline)
+        db.session.commit()
+    
+    # Recommendations were started before the LLM call; usually they are done by now
+    recommendations = []
+    recommendations_deferred = False
+    if turn.get('recommendations_future'):
+        with timer.stage('recommendations_wait'):
+            try:
+                recommendations = turn['recommendations_future'].result(timeout=deadline.remaining())
+            except FuturesTimeoutError:
+                # The client can fetch them from the session recommendations endpoint
+                deadline.degrade('recommendations_deferred')
+                recommendations_deferred = True
+            except Exception as e:
+                print(f"Error generating recommendations: {e}")
+    recommendations = recommendations[:3]  # Limit to 3 recommendations
+    if recommendations and current_user.is_authenticated:
+        with timer.stage('recommendations_store'):
+            recommendations = record_shown_recommendations(current_user.id, recommendations)
+    
+    # Check if escalation is needed
+    escalation_needed = (
+        crisis_check['is_crisis'] or 
+        intent_result.get('urgency_level') == 'high' or
+        sentiment_result.get('risk_level') == 'high'
+    )
+    
+    return {
+        'message': bot_response_text,
+        'sentiment': sentiment_result,
+        'intent': intent_result,
+        'crisis_detected': crisis_check['is_crisis'],
+        'escalation_needed': escalation_needed,
+        'recommendations': recommendations,
+        'recommendations_deferred': recommendations_deferred,
+        'conversation_context': context.get_context_summary(),
+        'timings': timer.as_dict(),
+        'degradations': deadline.degradations
+    }
+
+def _record_token_usage(chat_session, gpt_response, conversation_type):
+    """Add the reply's LLM call to the token ledger, committed with the reply itself"""
+    entry = usage_entry(gpt_response, conversation_type)
+    if entry:
+        db.session.add(TokenUsage(
+            user_id=chat_session.user_id if chat_session else None,
+            session_id=chat_session.session_id if chat_session else None,
+            **entry
+        ))
+
+def _record_background_usage(app, gpt_response, conversation_type):
+    """Ledger an LLM call made outside a chat turn, in its own app context and transaction"""
+    with app.app_context():
+        try:
+            _record_token_usage(None, gpt_response, conversation_type)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+def _bound_statement_time(deadline):
+    """Limit statements in the current transaction to the remaining budget (PostgreSQL only)"""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    # Always allow a second so the reply itself is not lost
+    timeout_ms = max(1000, int(deadline.remaining() * 1000))
+    db.session.execute(text(f'SET LOCAL statement_timeout = {timeout_ms}'))
+
+def _unfinished_stream_response(message_text, conversation_type, sent_text):
+    """Reply for a stream that produced no done event: the text already sent, or the fallback"""
+    if sent_text:
+        return {
+            'response': sent_text,
+            'error': 'Stream ended without a reply',
+            'partial': True,
+            'conversation_type': conversation_type,
+            'timestamp': datetime.now().isoformat()
         }
-        
-        return jsonify(response_data)
-        
-    except Exception as e:
-        db.session.rollback()
-        print(f"Error processing message: {e}")
-        return jsonify({
-            'error': 'Failed to process message',
-            'message': 'I apologize, but I encountered an error. Please try again.'
-        }), 500
+    if gpt_handler:
+        fallback = gpt_handler.get_fallback_response(message_text, conversation_type)
+    else:
+        fallback = _default_gpt_response(conversation_type)
+    return dict(fallback, error='Stream ended without a reply')
+
+def _default_gpt_response(conversation_type):
+    """Response used when the GPT handler could not be initialized"""
+    return {
+        'response': "Thank you for sharing with me. I'm here to listen and support you. While I may not have all the answers, I want you to know that your feelings are valid and there are resources available to help.",
+        'conversation_type': conversation_type,
+        'safety_check': {'is_safe': True, 'confidence': 1.0}
+    }
+
+def _format_sse(event, payload):
+    """Format a Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+@chat_bp.route('/api/session/<session_id>/follow-up/<follow_up_id>')
+def get_follow_up(session_id, follow_up_id):
+    """Poll for the LLM follow-up to a crisis fast-path reply"""
+    chat_session = ChatSession.query.filter_by(session_id=session_id).first()
+    if not chat_session:
+        return jsonify({'error': 'Session not found'}), 404
+    
+    # Check permissions
+    if not chat_session.is_anonymous and current_user.is_authenticated:
+        if chat_session.user_id != current_user.id:
+            return jsonify({'error': 'Access denied'}), 403
+    elif not chat_session.is_anonymous and not current_user.is_authenticated:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    with crisis_follow_ups_lock:
+        entry = dict(crisis_follow_ups.get(follow_up_id) or {})
+    
+    if entry:
+        if entry['session_id'] != session_id:
+            return jsonify({'error': 'Follow-up not found'}), 404
+        return jsonify({'follow_up_id': follow_up_id, 'status': entry['status'], 'message': entry['message']})
+    
+    # Another worker may have produced it; it is saved with the session's messages.
+    # Narrow by the id alone, then check the parsed metadata (the vetted reply carries the id too)
+    candidates = Message.query.filter(
+        Message.session_id == chat_session.id,
+        Message.sender == 'bot',
+        Message.message_metadata.contains(follow_up_id)
+    ).all()
+    for candidate in candidates:
+        metadata = candidate.get_metadata()
+        if metadata.get('crisis_follow_up') and metadata.get('follow_up_id') == follow_up_id:
+            return jsonify({'follow_up_id': follow_up_id, 'status': 'ready', 'message': candidate.content})
+    return jsonify({'follow_up_id': follow_up_id, 'status': 'pending', 'message': None})
 
 @chat_bp.route('/api/session/<session_id>/history')
 def get_chat_history(session_id):
@@ -310,12 +859,22 @@ def get_recommendations(session_id):
     current_context = data.get('current_context', {})
     assessment_results = data.get('assessment_results')
     
-    # Generate recommendations
-    recommendations = recommendation_engine.generate_recommendations(
-        user_profile=user_profile,
-        current_context=current_context,
-        assessment_results=assessment_results
-    )
+    def compute():
+        return recommendation_engine.generate_recommendations(
+            user_profile=user_profile,
+            current_context=current_context,
+            assessment_results=assessment_results
+        )
+    
+    # Signed-in users get cached recommendations until their inputs change; shown ones are
+    # stored so they can be completed and learned from
+    if current_user.is_authenticated:
+        fingerprint = input_fingerprint(user_profile, current_context, assessment_results,
+                                        date.today().isoformat(), recommendation_engine.catalog.fingerprint)
+        recommendations = get_user_recommendation_cache().get(
+            current_user.id, fingerprint, lambda: record_shown_recommendations(current_user.id, compute()))
+    else:
+        recommendations = compute()
     
     return jsonify({
         'recommendations': recommendations,
@@ -480,6 +1039,16 @@ def end_session(session_id):
     
     return jsonify({'message': 'Session ended successfully'})
 
+def _stored_user_profile():
+    """Materialized profile features of the signed-in user, or {} for anonymous users"""
+    if not current_user.is_authenticated:
+        return {}
+    try:
+        return get_user_profile_service().get(current_user.id)
+    except Exception as e:
+        print(f"Error loading user profile: {e}")
+        return {}
+
 def _determine_mental_health_status(mental_health_indicators):
     """Determine mental health status from indicators"""
     if mental_health_indicators.get('crisis_indicators', 0) > 0:
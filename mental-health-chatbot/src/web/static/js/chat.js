@@ -126,26 +126,19 @@ class ChatInterface {
         this.showTypingIndicator();
         
         try {
-            const response = await fetch(`/api/chat/session/${this.sessionId}/message`, {
-                method: 'POST',
-                headers: {
-                    'Content-Type': 'application/json',
-                },
-                body: JSON.stringify({
-                    message: message
-                })
-            });
+            const data = await this.streamMessage(message);
             
-            if (response.ok) {
-                const data = await response.json();
-                this.hideTypingIndicator();
-                this.addMessage('bot', data.message, data);
-                
+            if (data) {
                 // Handle special responses
                 if (data.crisis_detected) {
                     this.handleCrisisResponse();
                 }
                 
+                // The personalized reply to a crisis message arrives after the resources
+                if (data.follow_up_id) {
+                    this.pollFollowUp(data.follow_up_id);
+                }
+                
                 if (data.recommendations && data.recommendations.length > 0) {
                     this.showRecommendations(data.recommendations);
                 }
@@ -160,6 +153,90 @@ class ChatInterface {
         }
     }
     
+    async streamMessage(message) {
+        // Stream the reply over Server-Sent Events so tokens render as they arrive
+        const response = await fetch(`/chat/api/session/${this.sessionId}/message/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify({
+                message: message
+            })
+        });
+        
+        if (!response.ok || !response.body) {
+            return null;
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let contentElement = null;
+        let text = '';
+        let result = null;
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            
+            buffer += decoder.decode(value, { stream: true });
+            const frames = buffer.split('\n\n');
+            buffer = frames.pop();
+            
+            for (const frame of frames) {
+                const eventMatch = frame.match(/^event: (.*)$/m);
+                const dataMatch = frame.match(/^data: (.*)$/m);
+                if (!eventMatch || !dataMatch) continue;
+                
+                const payload = JSON.parse(dataMatch[1]);
+                
+                if (eventMatch[1] === 'token') {
+                    if (!contentElement) {
+                        this.hideTypingIndicator();
+                        contentElement = this.addMessage('bot', '');
+                    }
+                    text += payload.content;
+                    contentElement.textContent = text;
+                    this.scrollToBottom();
+                } else if (eventMatch[1] === 'done') {
+                    // The final message may differ after the safety check
+                    if (!contentElement) {
+                        this.hideTypingIndicator();
+                        contentElement = this.addMessage('bot', payload.message);
+                    }
+                    contentElement.textContent = payload.message;
+                    result = payload;
+                } else if (eventMatch[1] === 'error') {
+                    return null;
+                }
+            }
+        }
+        
+        return result;
+    }
+    
+    async pollFollowUp(followUpId, attempts = 20) {
+        for (let i = 0; i < attempts; i++) {
+            await new Promise(resolve => setTimeout(resolve, 1500));
+            try {
+                const response = await fetch(`/chat/api/session/${this.sessionId}/follow-up/${followUpId}`);
+                if (!response.ok) return;
+                
+                const data = await response.json();
+                if (data.status === 'ready') {
+                    this.addMessage('bot', data.message);
+                    return;
+                }
+                if (data.status !== 'pending') return;
+            } catch (error) {
+                console.error('Error fetching follow-up:', error);
+                return;
+            }
+        }
+    }
+    
     addMessage(sender, content, metadata = {}) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${sender}`;
@@ -197,6 +274,8 @@ class ChatInterface {
             this.messageCount++;
             this.updateStats();
         }
+        
+        return messageContent;
     }
     
     showTypingIndicator() {
@@ -5,5 +5,6 @@ Web Utilities Package
 from .auth_utils import generate_confirmation_token, confirm_token
 from .validators import validate_email, validate_password, validate_username
 from .helpers import send_email, format_datetime, format_duration
+from .timing import StageTimer
 
-__all__ = ['generate_confirmation_token', 'confirm_token', 'validate_email', 'validate_password', 'validate_username', 'send_email', 'format_datetime', 'format_duration']
\ No newline at end of file
+__all__ = ['generate_confirmation_token', 'confirm_token', 'validate_email', 'validate_password', 'validate_username', 'send_email', 'format_datetime', 'format_duration', 'StageTimer']
\ No newline at end of file
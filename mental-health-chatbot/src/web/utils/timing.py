@@ -0,0 +1,37 @@
+"""
+Timing Utilities
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+
+class StageTimer:
+    """Collects wall-clock durations of the named stages of one request"""
+    
+    def __init__(self):
+        """Start timing a request"""
+        self.started_at = time.perf_counter()
+        self._stages = {}
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as ``name``"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+    
+    def record(self, name, seconds):
+        """Add ``seconds`` to a stage"""
+        with self._lock:
+            self._stages[name] = self._stages.get(name, 0.0) + seconds
+    
+    def as_dict(self):
+        """Stage durations in milliseconds, including the total so far"""
+        with self._lock:
+            timings = {name: round(seconds * 1000, 1) for name, seconds in self._stages.items()}
+        timings['total'] = round((time.perf_counter() - self.started_at) * 1000, 1)
+        return timings
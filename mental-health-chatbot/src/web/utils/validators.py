@@ -3,7 +3,6 @@ Validation Utilities
 """
 
 import re
-from typing import bool
 
 def validate_email(email: str) -> bool:
     """Validate email format"""
@@ -0,0 +1,43 @@
+"""
+Tests for batch mental health predictions
+"""
+
+import sys
+import os
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_predict_batch_matches_per_record_rules():
+    """Test that a batch prediction is columnar, consistent with its probabilities and with the scalar risk rules"""
+    from src.ml.models.mental_health_classifier import MentalHealthClassifier
+
+    classifier = MentalHealthClassifier()
+    stressful = {'recent_events': [{'stress_level': 9}] * 3}
+    records = [
+        {'text_features': ['feeling good today'], 'numerical_features': {'mood_score': 8, 'stress_level': 2}},
+        {'text_features': ['want to die', 'hopeless'], 'numerical_features': {'mood_score': 1, 'sleep_hours': 11}},
+        {'text_features': ['panic all the time'], 'context_features': stressful},
+        {'text_features': []}
+    ]
+
+    batch = classifier.predict_batch(records)
+    assert len(batch) == len(records)
+    assert batch.probabilities.shape == (len(records), len(batch.classes))
+    assert np.allclose(batch.probabilities.sum(axis=1), 1.0)
+    assert list(batch.predicted_class) == list(batch.classes[batch.probabilities.argmax(axis=1)])
+    assert np.array_equal(batch.confidence, batch.probabilities.max(axis=1))
+    for row, record in enumerate(records):
+        expected = classifier._assess_enhanced_risk_level(batch.predicted_class[row], batch.confidence[row],
+                                                          record.get('context_features'))
+        assert batch.risk_level[row] == expected
+
+    # The vectorized thresholds on their own, including the stressful-events bump
+    codes = MentalHealthClassifier._risk_codes(
+        np.array(['severe_depression', 'bipolar', 'healthy', 'bipolar', 'severe_anxiety']),
+        np.array([0.9, 0.65, 0.9, 0.65, 0.5]),
+        np.array([0, 0, 3, 3, 3])
+    )
+    assert list(codes) == [2, 1, 1, 2, 1]
+    assert len(classifier.predict_batch([])) == 0
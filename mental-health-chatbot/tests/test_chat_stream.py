@@ -0,0 +1,54 @@
+"""
+Tests for the streamed chat endpoint
+"""
+
+import json
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_stream_without_done_event_still_finishes_the_turn():
+    """Test that a reply stream which breaks off or never sends done still ends with a saved, done turn"""
+    from src.web.app import create_app
+    from src.db.models import ChatSession, Message, db
+    from src.web.routes import chat
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        db.session.add(ChatSession(session_id='stream', is_anonymous=True))
+        db.session.commit()
+
+    def broken_stream(**kwargs):
+        yield {'type': 'token', 'content': 'Work stress can '}
+        raise RuntimeError("connection reset")
+
+    def silent_stream(**kwargs):
+        return iter(())
+
+    def done_payload(body):
+        frames = [frame for frame in body.split('\n\n') if frame.startswith('event: done')]
+        return json.loads(frames[-1].split('data: ', 1)[1])
+
+    original = chat.gpt_handler.stream_response
+    client = app.test_client()
+    try:
+        chat.gpt_handler.stream_response = broken_stream
+        body = client.post('/chat/api/session/stream/message/stream',
+                           json={'message': 'I have been stressed about work lately'}).get_data(as_text=True)
+        assert done_payload(body)['message'] == 'Work stress can'
+
+        chat.gpt_handler.stream_response = silent_stream
+        body = client.post('/chat/api/session/stream/message/stream',
+                           json={'message': 'I have been stressed about work lately'}).get_data(as_text=True)
+        assert 'event: token' in body
+        assert done_payload(body)['message']
+    finally:
+        chat.gpt_handler.stream_response = original
+
+    with app.app_context():
+        saved = [message.get_metadata()['gpt_metadata'] for message in Message.query.filter_by(sender='bot')]
+        assert saved[0]['partial'] is True
+        assert all(metadata['error'] for metadata in saved)
@@ -0,0 +1,36 @@
+"""
+Tests for sparse classifier feature assembly
+"""
+
+import sys
+import os
+import numpy as np
+from scipy import sparse
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_features_stay_sparse_through_training():
+    """Test that assembled features are CSR, match the dense layout and are densified only when required"""
+    from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+    from src.ml.models.mental_health_classifier import assemble_features, estimator_input
+    from src.ml.training.data_preprocessing import DataPreprocessor
+
+    text = sparse.csr_matrix(np.array([[0.0, 0.5, 0.0], [0.7, 0.0, 0.0]]))
+    numerical = np.array([[1.0, -1.0], [0.5, 2.0]])
+    features = assemble_features(text, numerical)
+    assert sparse.isspmatrix_csr(features)
+    assert np.array_equal(features.toarray(), np.hstack([text.toarray(), numerical]))
+    assert estimator_input(RandomForestClassifier(), features) is features
+    assert isinstance(estimator_input(HistGradientBoostingClassifier(), features), np.ndarray)
+
+    preprocessor = DataPreprocessor(max_features=50)
+    data = [{'text': f"feeling {word} today", 'mood_score': mood, 'label': label}
+            for word, mood, label in [('good', 8, 'healthy'), ('hopeless', 2, 'depression'),
+                                      ('great', 9, 'healthy'), ('empty', 3, 'depression')]]
+    X, y = preprocessor.preprocess_mental_health_data(data)
+    assert sparse.isspmatrix_csr(X)
+    assert X.shape == (4, len(preprocessor.text_vectorizer.vocabulary_) + 6)
+
+    model = RandomForestClassifier(n_estimators=5, random_state=42).fit(X, y)
+    assert model.predict_proba(preprocessor.transform_new_data(data[:1])).shape == (1, 2)
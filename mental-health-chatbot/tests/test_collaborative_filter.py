@@ -0,0 +1,116 @@
+"""
+Tests for the collaborative-filtering recommender
+"""
+
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_chunked_training_and_blended_scoring(tmp_path):
+    """Test that chunked training is exact and that co-completed items score higher for similar users"""
+    import numpy as np
+    from src.ml.models.collaborative_filter import (CollaborativeScorer, item_gram_matrix, load_collaborative_model,
+                                                    train_collaborative_model)
+    from src.ml.models.recommendation_engine import RecommendationEngine
+
+    engine = RecommendationEngine()
+    item_keys = [item.key for item in engine.catalog.items]
+
+    # Two cohorts: stress management goes with evening reflection, social connection with morning routines
+    interactions = []
+    for user_id in range(1, 41):
+        if user_id % 2:
+            interactions += [(user_id, 'evening_reflection', 3), (user_id, 'stress_management_techniques', 1)]
+        else:
+            interactions += [(user_id, 'connect_with_others', 2), (user_id, 'morning_mindfulness', 1)]
+    interactions.append((41, 'retired_item', 5))
+
+    full, users = item_gram_matrix(interactions, item_keys, chunk_size=10 ** 6)
+    chunked, chunked_users = item_gram_matrix(interactions, item_keys, chunk_size=3)
+    assert users == chunked_users == 40
+    assert np.allclose(full, chunked)
+
+    model = train_collaborative_model(interactions, item_keys, factors=4)
+    model.save(str(tmp_path / 'model.npz'))
+    model = load_collaborative_model(str(tmp_path / 'model.npz'))
+    assert model.factors == 2
+
+    scorer = CollaborativeScorer(model, engine.catalog)
+    scores = scorer.score({'evening_reflection': 1})
+    by_key = engine.catalog.by_key
+    assert scores[by_key['stress_management_techniques']] > 0.3
+    assert scores[by_key['connect_with_others']] < 0.05
+    assert scores[by_key['evening_reflection']] == 0.0
+    assert scores.max() == 1.0
+    assert scorer.score({'retired_item': 2}) is None
+
+    engine.collaborative = scorer
+    profile = {'mental_health_status': 'anxiety', 'mood_score': 5, 'stress_level': 8}
+    context = {'available_time': 60}
+    candidate_ids = frozenset({by_key['stress_management_techniques'], by_key['connect_with_others']})
+    plain_ids, plain = engine._rank_candidates(candidate_ids, profile, context, limit=2)
+    ids, blended = engine._rank_candidates(candidate_ids, dict(profile, completed_items={'evening_reflection': 2}),
+                                           context, limit=2)
+    plain_by_id = dict(zip(plain_ids.tolist(), plain.tolist()))
+    blended_by_id = dict(zip(ids.tolist(), blended.tolist()))
+    assert blended_by_id[by_key['stress_management_techniques']] > plain_by_id[by_key['stress_management_techniques']]
+    assert blended_by_id[by_key['connect_with_others']] < plain_by_id[by_key['connect_with_others']]
+
+def test_shown_recommendations_are_stored_and_learned_from():
+    """Test that API recommendations are persisted with their catalog key and that their completions train the model"""
+    import numpy as np
+    from flask_jwt_extended import create_access_token
+    from src.web.app import create_app
+    from src.db.models import User, Recommendation, db
+    from src.db import user_profile_service as profiles
+    from src.ml.models.collaborative_filter import CollaborativeScorer, completion_interactions, train_collaborative_model
+    from src.ml.models.recommendation_engine import RecommendationEngine
+
+    app = create_app('testing')
+    client = app.test_client()
+    body = {'user_profile': {'mental_health_status': 'anxiety', 'mood_score': 4},
+            'current_context': {'available_time': 45, 'time_of_day': 'afternoon'}}
+    with app.app_context():
+        db.create_all()
+        profiles.user_profile_service = profiles.UserProfileService()
+        users = [User(username=f"learner{n}", email=f"learner{n}@example.com", password_hash='x') for n in range(6)]
+        db.session.add_all(users)
+        db.session.commit()
+        user_ids = [user.id for user in users]
+        tokens = {user_id: create_access_token(identity=str(user_id)) for user_id in user_ids}
+
+    shown = {}
+    for user_id in user_ids:
+        response = client.get('/api/recommendations', json=body, headers={'Authorization': f"Bearer {tokens[user_id]}"})
+        shown[user_id] = response.get_json()['recommendations']
+        assert shown[user_id] and all(rec.get('recommendation_id') for rec in shown[user_id])
+
+    with app.app_context():
+        # Each user completes two of the items they were shown, through the stored rows
+        for user_id in user_ids:
+            for rec in shown[user_id][:2]:
+                db.session.get(Recommendation, rec['recommendation_id']).mark_completed()
+        db.session.commit()
+        assert Recommendation.query.filter(Recommendation.catalog_key.is_(None)).count() == 0
+
+        engine = RecommendationEngine()
+        item_keys = [item.key for item in engine.catalog.items]
+        model = train_collaborative_model(list(completion_interactions()), item_keys)
+        assert model is not None
+
+    scorer = CollaborativeScorer(model, engine.catalog)
+    learned = {shown[user_ids[0]][0]['id'], shown[user_ids[0]][1]['id']}
+    assert all(scorer.known[engine.catalog.by_key[key]] for key in learned)
+
+    # Items the model never saw keep their content score when the blend applies
+    engine.collaborative = scorer
+    profile = dict(body['user_profile'], completed_items={key: 1 for key in learned})
+    candidate_ids = frozenset(range(len(item_keys)))
+    plain_ids, plain = engine._rank_candidates(candidate_ids, body['user_profile'], body['current_context'], len(item_keys))
+    ids, blended = engine._rank_candidates(candidate_ids, profile, body['current_context'], len(item_keys))
+    plain_by_id = dict(zip(plain_ids.tolist(), plain.tolist()))
+    unknown = [item_id for item_id in ids.tolist() if not scorer.known[item_id]]
+    assert unknown
+    assert all(np.isclose(dict(zip(ids.tolist(), blended.tolist()))[item_id], plain_by_id[item_id]) for item_id in unknown)
@@ -0,0 +1,34 @@
+"""
+Tests for conversation context records
+"""
+
+import json
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_records_round_trip_through_json():
+    """Test that compact records survive the JSON storage boundary"""
+    from src.nlp.conversation_context import ConversationContext, MessageRecord, SentimentRecord
+
+    context = ConversationContext()
+    context.initialize_session('session-1', user_id=7)
+    context.add_message('user', 'I feel anxious')
+    context.update_sentiment({'polarity': -0.4, 'sentiment_label': 'negative', 'risk_level': 'medium'})
+    context.update_intent({'primary_intent': 'anxiety', 'confidence': 0.8, 'urgency_level': 'medium'})
+
+    stored = json.loads(json.dumps(context.to_dict()))
+    assert stored['conversation_history'][0]['sender'] == 'user'
+    assert isinstance(stored['conversation_history'][0]['timestamp'], str)
+
+    restored = ConversationContext()
+    restored.from_dict(stored)
+
+    message = restored.context['conversation_history'][0]
+    sentiment = restored.context['sentiment_history'][0]
+    assert isinstance(message, MessageRecord)
+    assert isinstance(sentiment, SentimentRecord)
+    assert sentiment.sentiment_label is context.context['sentiment_history'][0].sentiment_label
+    assert restored.get_context_summary()['most_common_intent'] == 'anxiety'
@@ -0,0 +1,32 @@
+"""
+Tests for the single-pass crisis scanner
+"""
+
+import sys
+import os
+import json
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'crisis_corpus.json')
+
+def test_crisis_corpus_recall_and_false_positives():
+    """Test that every labelled crisis message is flagged and no benign message is"""
+    from src.nlp.crisis_detection import scan_for_crisis
+
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        corpus = json.load(f)
+
+    missed = [text for text in corpus['crisis'] if not scan_for_crisis(text).is_crisis]
+    false_positives = [text for text in corpus['non_crisis'] if scan_for_crisis(text).is_crisis]
+
+    assert missed == []
+    assert false_positives == []
+
+    # Word boundaries and negation
+    assert scan_for_crisis("I'm on a diet and my phone died").keywords == []
+    negated = scan_for_crisis("I don't want to die, I just feel tired")
+    assert not negated.is_crisis
+    assert negated.negated
+    assert scan_for_crisis("I want to die").severity == 'high'
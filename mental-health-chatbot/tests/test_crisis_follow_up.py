@@ -0,0 +1,78 @@
+"""
+Tests for crisis follow-up delivery
+"""
+
+import json
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_follow_up_is_found_by_id_and_checks_session_owner():
+    """Test that a saved follow-up is matched on its id whatever the JSON layout, for the session owner only"""
+    from src.web.app import create_app
+    from src.db.models import User, ChatSession, Message, db
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        owner = User(username='owner', email='owner@example.com', password_hash='x')
+        db.session.add(owner)
+        db.session.commit()
+        private = ChatSession(session_id='private', user_id=owner.id, is_anonymous=False)
+        anonymous = ChatSession(session_id='anonymous', is_anonymous=True)
+        db.session.add_all([private, anonymous])
+        db.session.commit()
+
+        db.session.add_all([
+            Message(session_id=anonymous.id, sender='bot', content='Vetted reply', message_type='text',
+                    message_metadata=json.dumps({'crisis_fast_path': True, 'follow_up_id': 'abc'})),
+            Message(session_id=anonymous.id, sender='bot', content='Personal follow-up', message_type='text',
+                    message_metadata=json.dumps({'follow_up_id': 'abc', 'gpt_metadata': {}, 'crisis_follow_up': True},
+                                                separators=(',', ':')))
+        ])
+        db.session.commit()
+
+    client = app.test_client()
+    ready = client.get('/chat/api/session/anonymous/follow-up/abc').get_json()
+    assert ready['status'] == 'ready'
+    assert ready['message'] == 'Personal follow-up'
+
+    pending = client.get('/chat/api/session/anonymous/follow-up/other').get_json()
+    assert pending['status'] == 'pending'
+
+    assert client.get('/chat/api/session/private/follow-up/abc').status_code == 401
+    assert client.get('/chat/api/session/missing/follow-up/abc').status_code == 404
+
+def test_crisis_reply_survives_fast_path_failures():
+    """Test that a failure while recording a crisis turn still returns the vetted crisis reply"""
+    from src.web.app import create_app
+    from src.db.models import ChatSession, db
+    from src.nlp.crisis_detection import CRISIS_RESPONSE
+    from src.web.routes import chat
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        db.session.add(ChatSession(session_id='crisis', is_anonymous=True))
+        db.session.commit()
+
+    class BrokenExecutor:
+        def submit(self, *args, **kwargs):
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+    executor = chat.background_executor
+    chat.background_executor = BrokenExecutor()
+    try:
+        client = app.test_client()
+        response = client.post('/chat/api/session/crisis/message', json={'message': 'I want to kill myself'})
+        assert response.status_code == 200
+        assert response.get_json()['message'] == CRISIS_RESPONSE
+        assert response.get_json()['degradations'] == ['crisis_turn_not_saved']
+
+        streamed = client.post('/chat/api/session/crisis/message/stream', json={'message': 'I want to kill myself'})
+        assert streamed.status_code == 200
+        assert CRISIS_RESPONSE in streamed.get_data(as_text=True)
+    finally:
+        chat.background_executor = executor
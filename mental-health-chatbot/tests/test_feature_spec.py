@@ -0,0 +1,46 @@
+"""
+Tests for the shared classifier feature spec
+"""
+
+import sys
+import os
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_feature_spec_shared_by_training_and_serving(tmp_path, monkeypatch):
+    """Test spec filling and round trips, and that served predictions use the model instead of the fallback"""
+    from src.ml.models.feature_spec import FeatureSpec, FEATURE_SPEC_VERSION
+    from src.ml.models.mental_health_classifier import MentalHealthClassifier
+
+    spec = FeatureSpec(text_width=3)
+    buffer = np.full((3, spec.numerical_width), -1.0)
+    filled = spec.fill([{'mood_score': 12, 'sleep_hours': 6}, None, {'stress_level': 0.5}], out=buffer)
+    assert filled is buffer
+    assert list(buffer[0]) == [10, 5, 6, 5, 5, 5]
+    assert list(buffer[1]) == list(spec.defaults)
+    assert buffer[2][1] == 1
+    assert FeatureSpec.from_dict(spec.to_dict()).to_dict() == spec.to_dict()
+
+    # Train into a scratch directory; the spec is saved with the model and served from it
+    monkeypatch.chdir(tmp_path)
+    classifier = MentalHealthClassifier()
+    saved = FeatureSpec.load(classifier.feature_spec_path)
+    assert saved.version == FEATURE_SPEC_VERSION
+    assert saved.check(classifier.model, classifier.vectorizer, classifier.scaler) is None
+
+    result = classifier.predict_mental_health_status(
+        ['want to die', 'hopeless'],
+        {'mood_score': 1, 'sleep_hours': 11, 'appetite_score': 2},
+        {'time_of_day': 'evening'}
+    )
+    assert 'severity_indicators' in result
+    assert set(result['class_probabilities']) == set(classifier.label_encoder.classes_)
+
+    # A spec that no longer describes the saved components makes the next load retrain
+    FeatureSpec(text_width=saved.text_width + 1).save(classifier.feature_spec_path)
+    stale = FeatureSpec.load(classifier.feature_spec_path)
+    assert stale.check(classifier.model, classifier.vectorizer, classifier.scaler).startswith('vectorizer has')
+    reloaded = MentalHealthClassifier()
+    assert FeatureSpec.load(reloaded.feature_spec_path).text_width == len(reloaded.vectorizer.vocabulary_)
@@ -0,0 +1,93 @@
+"""
+Tests for intent- and risk-aware model routing
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_routes_by_risk_and_falls_back_when_slow():
+    """Test route selection and that a slow primary model hands over to its fallback"""
+    import httpx
+    import openai
+    from src.nlp.gpt_handler import GPTHandler
+    from src.nlp.model_router import ModelRouter, Route
+    from src.nlp.resilience import CircuitBreaker
+
+    router = ModelRouter({
+        'crisis': Route('crisis', 'strong', 600, 0.3, ('fast',), 5.0),
+        'clinical': Route('clinical', 'strong', 800, 0.5, ('fast',), 5.0),
+        'supportive': Route('supportive', 'fast', 500, 0.7),
+        'light': Route('light', 'fast', 250, 0.7)
+    })
+    assert router.select('greeting').name == 'light'
+    assert router.select('anxiety', urgency_level='medium').name == 'supportive'
+    assert router.select('general', risk_level='high').name == 'clinical'
+    assert router.select('depression').name == 'clinical'
+    assert router.select_for_context('general', {'crisis_indicators': {'is_crisis': True}}).name == 'crisis'
+
+    calls = []
+
+    class SlowPrimaryCompletions:
+        def create(self, **kwargs):
+            calls.append((kwargs['model'], kwargs['max_tokens'], kwargs['timeout']))
+            if kwargs['model'] == 'strong':
+                raise openai.APITimeoutError(request=httpx.Request('POST', 'http://test'))
+            message = SimpleNamespace(content="I'm sorry you're feeling this way. I'm here to listen.")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)],
+                                   usage=SimpleNamespace(prompt_tokens=90, completion_tokens=30, total_tokens=120))
+
+    class FakeClient:
+        class chat:
+            completions = SlowPrimaryCompletions()
+
+    handler = GPTHandler()
+    handler.client = FakeClient()
+    handler.router = router
+    handler.breaker = CircuitBreaker('test', failure_threshold=10, recovery_timeout=60)
+
+    result = handler.generate_response("I've been so depressed lately", conversation_type='depression')
+
+    assert result['model'] == 'fast'
+    assert result['route'] == 'clinical'
+    assert calls[0] == ('strong', 800, 5.0)
+    assert calls[1][:2] == ('fast', 800)
+
+    metrics = router.get_metrics()['clinical']
+    assert metrics['calls'] == 2
+    assert metrics['failures'] == 1
+    assert metrics['fallback_calls'] == 1
+    assert metrics['tokens'] == 120
+
+def test_too_short_reply_is_recorded_once_as_failed():
+    """Test that a reply rejected by validation is recorded as one failed call, never also as a success"""
+    from src.nlp.gpt_handler import GPTHandler
+    from src.nlp.model_router import ModelRouter, Route
+    from src.nlp.resilience import CircuitBreaker
+
+    class ShortCompletions:
+        def create(self, **kwargs):
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="Ok."))],
+                                   usage=SimpleNamespace(prompt_tokens=90, completion_tokens=2, total_tokens=92))
+
+    class FakeClient:
+        class chat:
+            completions = ShortCompletions()
+
+    router = ModelRouter({'light': Route('light', 'fast', 250, 0.7)})
+    handler = GPTHandler()
+    handler.client = FakeClient()
+    handler.router = router
+    handler.breaker = CircuitBreaker('test', failure_threshold=10, recovery_timeout=60)
+    handler.max_backoff = 0.01
+
+    result = handler.generate_response("I feel anxious", conversation_type='anxiety')
+
+    assert 'error' in result
+    metrics = router.get_metrics()['light']
+    assert metrics['calls'] == handler.max_retries
+    assert metrics['failures'] == handler.max_retries
+    assert handler.breaker.get_metrics()['successes'] == 0
@@ -0,0 +1,25 @@
+"""
+Tests for the OpenAI rate limiter
+"""
+
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_sheds_when_budget_would_not_recover_in_time():
+    """Test RPM/TPM buckets grant, shed and refund"""
+    from src.nlp.rate_limiter import RateLimiter
+
+    limiter = RateLimiter({'chat.completions': {'rpm': 2, 'tpm': 1000}})
+
+    assert limiter.acquire('chat.completions', 400)
+    assert limiter.acquire('chat.completions', 400)
+    assert not limiter.acquire('chat.completions', 100, max_wait=0.1)
+
+    limiter.refund('chat.completions', 300)
+    utilization = limiter.get_utilization()['chat.completions']
+    assert utilization['rpm_utilization'] == 1.0
+    assert 0.49 <= utilization['tpm_utilization'] <= 0.5
+    assert utilization['shed'] == 1
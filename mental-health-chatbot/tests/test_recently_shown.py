@@ -0,0 +1,41 @@
+"""
+Tests for the per-user recently shown filter
+"""
+
+import sys
+import os
+from datetime import date, timedelta
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_recently_shown_window_and_rotation():
+    """Test that shown items expire with the window and that the engine rotates past them"""
+    from src.ml.models.recently_shown import RecentlyShown
+    from src.ml.models.recommendation_engine import RecommendationEngine
+
+    shown = RecentlyShown(window_days=3)
+    today = date(2024, 3, 6)
+    shown.record(7, [1, 4], fingerprint=11, today=today - timedelta(days=2))
+    shown.record(7, [9], fingerprint=11, today=today)
+    assert shown.shown_mask(7, 11, today) == (1 << 1) | (1 << 4) | (1 << 9)
+    assert RecentlyShown.exclude(frozenset({1, 2, 9}), shown.shown_mask(7, 11, today)) == frozenset({2})
+
+    # Three days on, the first day's slot is out of the window and then reused
+    later = today + timedelta(days=1)
+    assert shown.shown_mask(7, 11, later) == 1 << 9
+    shown.record(7, [3], fingerprint=11, today=later)
+    assert shown.shown_mask(7, 11, later) == (1 << 9) | (1 << 3)
+    assert len(shown._get_record(7)['slots']) == 3
+    assert shown.shown_mask(7, 12, later) == 0
+
+    engine = RecommendationEngine()
+    engine.recently_shown = RecentlyShown()
+    profile = {'user_id': 42, 'mental_health_status': 'anxiety', 'mood_score': 2, 'stress_level': 8}
+    context = {'available_time': 60}
+    first = [rec['id'] for rec in engine.generate_recommendations(profile, context)]
+    second = [rec['id'] for rec in engine.generate_recommendations(profile, context)]
+    assert len(first) == len(second) == 5
+    candidates = len(engine._select_candidates(profile, context, None))
+    assert len(set(first) & set(second)) == max(0, 10 - candidates)
+    assert [rec['id'] for rec in engine.generate_recommendations(dict(profile, user_id='anonymous'), context)] == first
@@ -0,0 +1,153 @@
+"""
+Tests for the profile-bucket recommendation cache
+"""
+
+import sys
+import os
+import time
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_stale_bucket_is_served_while_refreshing():
+    """Test that similar profiles share a bucket and stale entries refresh in the background"""
+    from src.nlp.recommendation_cache import RecommendationCache, profile_bucket
+
+    calls = []
+
+    def compute(bucket):
+        calls.append(bucket)
+        return [{'title': f'Recommendation {len(calls)}'}]
+
+    cache = RecommendationCache(ttl=0.1, stale_ttl=60)
+    first = profile_bucket({'mental_health_status': 'anxiety', 'mood_score': 3, 'stress_level': 8}, 'negative')
+    similar = profile_bucket({'mental_health_status': 'anxiety', 'mood_score': 2, 'stress_level': 9}, 'negative')
+    assert first == similar
+
+    assert cache.get(first, compute)[0]['title'] == 'Recommendation 1'
+    assert cache.get(similar, compute)[0]['title'] == 'Recommendation 1'
+
+    time.sleep(0.15)
+    assert cache.get(first, compute)[0]['title'] == 'Recommendation 1'
+
+    # Let the background refresh finish
+    cache._executor.shutdown(wait=True)
+    assert cache.get(first, compute)[0]['title'] == 'Recommendation 2'
+
+    metrics = cache.get_metrics()
+    assert metrics['misses'] == 1
+    assert metrics['stale_hits'] == 1
+    assert metrics['refreshes'] == 1
+
+def test_user_recommendations_cached_until_inputs_change():
+    """Test that /api/recommendations is served from cache until a new mood entry invalidates it"""
+    from flask_jwt_extended import create_access_token
+    from src.web.app import create_app
+    from src.db.models import User, MoodEntry, db
+    from src.nlp import recommendation_cache
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        user = User(username='cached', email='cached@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        headers = {'Authorization': f"Bearer {create_access_token(identity=str(user_id))}"}
+
+    cache = recommendation_cache.user_recommendation_cache = recommendation_cache.UserRecommendationCache()
+    client = app.test_client()
+    request_body = {'current_context': {'available_time': 30}, 'user_profile': {'mental_health_status': 'stress'}}
+
+    first = client.get('/api/recommendations', json=request_body, headers=headers).get_json()
+    assert first['recommendations']
+    assert client.get('/api/recommendations', json=request_body, headers=headers).get_json() == first
+    assert cache.get_metrics()['hits'] == 1
+
+    other_context = dict(request_body, current_context={'available_time': 10})
+    client.get('/api/recommendations', json=other_context, headers=headers)
+    assert cache.get_metrics()['changed_inputs'] == 1
+
+    with app.app_context():
+        db.session.add(MoodEntry(user_id=user_id, mood_score=2, energy_level=3, stress_level=9))
+        db.session.commit()
+    client.get('/api/recommendations', json=other_context, headers=headers)
+
+    metrics = cache.get_metrics()
+    assert metrics['invalidations'] == 1
+    assert metrics['misses'] == 2
+    assert metrics['hit_rate'] == 0.25
+
+def test_bucket_generation_goes_through_breaker_router_and_ledger():
+    """Test that bucket recommendations use the routed, breaker-guarded path and reach the token ledger"""
+    from types import SimpleNamespace
+    from src.web.app import create_app
+    from src.db.models import TokenUsage, db
+    from src.nlp.gpt_handler import GPTHandler
+    from src.nlp.model_router import ModelRouter
+    from src.nlp.recommendation_cache import profile_bucket
+    from src.nlp.resilience import CircuitBreaker
+    from src.web.routes.chat import _record_background_usage
+
+    calls = []
+
+    class Completions:
+        def create(self, **kwargs):
+            calls.append(kwargs['model'])
+            content = "1. Evening walk\nType: exercise\nDescription: A short walk after dinner."
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+                                   usage=SimpleNamespace(prompt_tokens=200, completion_tokens=40, total_tokens=240))
+
+    class FakeClient:
+        class chat:
+            completions = Completions()
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+
+    handler = GPTHandler()
+    handler.client = FakeClient()
+    handler.router = ModelRouter()
+    handler.usage_recorder = lambda response, conversation_type: _record_background_usage(app, response, conversation_type)
+    bucket = profile_bucket({'mood_score': 4, 'stress_level': 7}, 'sad')
+
+    handler.breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=60)
+    handler.breaker.record_failure()
+    try:
+        handler.generate_bucket_recommendations(bucket)
+        assert False, "an open breaker must stop bucket generation"
+    except RuntimeError:
+        pass
+    assert calls == []
+
+    handler.breaker = CircuitBreaker('test', failure_threshold=10, recovery_timeout=60)
+    recommendations = handler.generate_bucket_recommendations(bucket)
+    assert recommendations[0]['title'] == 'Evening walk'
+    assert calls == [handler.router.routes['recommendations'].model]
+    assert handler.router.get_metrics()['recommendations']['calls'] == 1
+
+    with app.app_context():
+        entry = TokenUsage.query.one()
+        assert entry.route == 'recommendations'
+        assert entry.conversation_type == 'recommendations'
+        assert entry.total_tokens == 240
+        assert entry.user_id is None
+
+def test_memory_store_expires_and_caps_entries():
+    """Test that the in-memory store honours expiry and keeps at most max_entries, least recently used first out"""
+    from src.nlp.recommendation_cache import MemoryEntryStore
+
+    store = MemoryEntryStore(max_entries=2)
+    store.set('expired', {'n': 0}, -1)
+    assert store.get('expired') is None
+    assert len(store) == 0
+
+    store.set('user:1', {'n': 1}, 60)
+    store.set('user:2', {'n': 2}, 60)
+    assert store.get('user:1') == {'n': 1}
+    store.set('user:3', {'n': 3}, 60)
+    assert len(store) == 2
+    assert store.get('user:2') is None
+    assert store.get('user:1') == {'n': 1}
+    assert store.get('user:3') == {'n': 3}
@@ -0,0 +1,69 @@
+"""
+Tests for the indexed recommendation catalog
+"""
+
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_catalog_selection_matches_state_and_constraints():
+    """Test that candidates come from index lookups and respect time and preference constraints"""
+    from src.ml.models.recommendation_catalog import load_catalog
+    from src.ml.models.recommendation_engine import RecommendationEngine
+
+    catalog = load_catalog()
+    keys = lambda ids: {catalog.items[item_id].key for item_id in ids}
+
+    assert keys(catalog.select(context='emergency')) == {
+        'crisis_support_resources', 'emergency_mental_health_services', 'reach_out_support_system'}
+    # Professional support for depression needs both the condition and a moderate or worse severity
+    assert 'depression_professional_support' not in keys(catalog.select(context='chat', status='depression', severity='mild'))
+    assert 'depression_professional_support' in keys(catalog.select(context='chat', status='depression', severity='severe'))
+    assert keys(catalog.not_fitting(10)) >= {'deep_relaxation', 'gentle_activity'}
+    assert 'quick_stress_relief' in keys(catalog.not_fitting(45))
+
+    engine = RecommendationEngine()
+    profile = {'mental_health_status': 'anxiety', 'mood_score': 2, 'stress_level': 8,
+               'preferences': {'likes_meditation': False}, 'goals': ['sleep better']}
+    recommendations = engine.generate_recommendations(profile, {'time_of_day': 'evening', 'available_time': 20})
+    titles = {rec['title'] for rec in recommendations}
+
+    assert 'Quick Stress Relief' in titles
+    assert 'Deep Relaxation Session' not in titles
+    assert all('meditation' not in rec['tags'] for rec in recommendations)
+    assert recommendations[0]['priority'] == 1
+
+    goal = engine.generate_recommendations(dict(profile, stress_level=3), {'available_time': 60})
+    assert any(rec['content'].startswith('Focus on: sleep better.') for rec in goal)
+
+    assert [rec['title'] for rec in engine.get_emergency_recommendations()][0] == 'Crisis Support Resources'
+    assert len(engine.get_weekly_recommendations('1')) == 2
+
+def test_vectorized_ranking_matches_full_sort():
+    """Test that argpartition top-k equals a full sort by priority, score and catalog order"""
+    import numpy as np
+    from src.ml.models.recommendation_engine import RecommendationEngine
+
+    engine = RecommendationEngine()
+    catalog = engine.catalog
+    profile = {'mental_health_status': 'depression', 'mood_score': 2, 'stress_level': 8,
+               'preferences': {'likes_social': True}}
+    context = {'available_time': 60}
+    candidate_ids = catalog.select(context='chat', mood='low', stress='high', status='depression',
+                                   severity='mild', activity_level='moderate')
+
+    top_ids, scores = engine._rank_candidates(candidate_ids, profile, context, limit=3)
+
+    all_scores = np.clip(0.5 + catalog.features @ engine._preference_vector(profile, context), 0.0, 1.0)
+    expected = sorted(candidate_ids, key=lambda i: (catalog.priorities[i], -all_scores[i], i))[:3]
+    assert top_ids.tolist() == expected
+    assert scores.tolist() == [all_scores[i] for i in expected]
+    # Social connection is favoured over other priority-2 items for a user who likes social activities
+    assert catalog.items[top_ids[2]].key == 'connect_with_others'
+
+    # Negative preference weights cannot push a score below 0 and past a priority step
+    engine._preference_vector = lambda profile, context: np.full(len(catalog.feature_columns), -10.0, dtype=np.float32)
+    _, penalized_scores = engine._rank_candidates(candidate_ids, profile, context, limit=len(candidate_ids))
+    assert penalized_scores.min() == 0.0
@@ -0,0 +1,73 @@
+"""
+Tests for the nightly recommendation precompute job
+"""
+
+import sys
+import os
+from datetime import date
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_precompute_resumes_from_checkpoint_and_replaces_rows(tmp_path):
+    """Test partitioned precompute, resuming after an interruption and idempotent reruns"""
+    from src.web.app import create_app
+    from src.db.models import User, MoodEntry, Recommendation, db
+    from src.db import user_profile_service as profiles
+    from src.ml.models.recommendation_precompute import (precompute_recommendations, stored_recommendations,
+                                                         load_checkpoint, week_start)
+
+    app = create_app('testing')
+    day = date(2024, 3, 6)
+    checkpoint = str(tmp_path / 'checkpoint.json')
+    with app.app_context():
+        db.create_all()
+        profiles.user_profile_service = profiles.UserProfileService()
+        users = [User(username=f"user{n}", email=f"user{n}@example.com", password_hash='x') for n in range(5)]
+        db.session.add_all(users)
+        db.session.commit()
+        stressed = users[0].id
+        db.session.add(MoodEntry(user_id=stressed, mood_score=3, energy_level=4, stress_level=9))
+        db.session.commit()
+
+        class Interrupted(Exception):
+            pass
+
+        def stop_after_first_partition(report):
+            raise Interrupted()
+
+        with pytest.raises(Interrupted):
+            precompute_recommendations(day=day, workers=0, partition_size=2, checkpoint_path=checkpoint,
+                                       progress=stop_after_first_partition)
+        assert load_checkpoint(checkpoint, day)['last_user_id'] == users[1].id
+
+        report = precompute_recommendations(day=day, workers=0, partition_size=2, checkpoint_path=checkpoint)
+        assert report['resumed_from'] == users[1].id
+        assert report['users'] == 3
+        assert report['completed'] is True
+        assert load_checkpoint(checkpoint, day)['users'] == 5
+
+        stored = stored_recommendations(stressed, day)
+        assert {rec.cadence for rec in stored} == {'daily', 'weekly'}
+        assert [rec.priority for rec in stored] == sorted(rec.priority for rec in stored)
+        assert 'weekly_stress_plan' in {rec.catalog_key for rec in stored}
+        assert all(rec.valid_for == week_start(day) for rec in stored if rec.cadence == 'weekly')
+        calm = {rec.catalog_key for rec in stored_recommendations(users[1].id, day)}
+        assert 'weekly_stress_plan' not in calm
+
+        # Completed rows survive a full rerun in worker processes; open rows are replaced, not duplicated,
+        # and an item already completed for the day gets no second, open row
+        total = Recommendation.query.count()
+        completed = stored[0]
+        completed.mark_completed()
+        db.session.commit()
+        report = precompute_recommendations(day=day, workers=2, partition_size=2, checkpoint_path=checkpoint,
+                                            resume=False)
+        assert report['users'] == 5
+        assert Recommendation.query.count() == total
+        assert Recommendation.query.filter_by(is_completed=True).count() == 1
+        assert Recommendation.query.filter_by(user_id=stressed, cadence=completed.cadence,
+                                              catalog_key=completed.catalog_key,
+                                              valid_for=completed.valid_for).count() == 1
@@ -0,0 +1,167 @@
+"""
+Tests for OpenAI resilience handling
+"""
+
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_circuit_breaker_opens_and_recovers():
+    """Test breaker state transitions"""
+    from src.nlp.resilience import CircuitBreaker
+
+    breaker = CircuitBreaker('test', failure_threshold=2, recovery_timeout=0)
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.get_metrics()['times_opened'] == 1
+
+    # Zero recovery timeout moves straight to half-open with a single trial
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_open_breaker_serves_fallback_without_calling_api():
+    """Test that GPTHandler short-circuits while the breaker is open"""
+    from src.nlp.gpt_handler import GPTHandler
+    from src.nlp.resilience import CircuitBreaker
+
+    class FailingCompletions:
+        calls = 0
+
+        def create(self, **kwargs):
+            FailingCompletions.calls += 1
+            raise AssertionError("API must not be called while the breaker is open")
+
+    class FakeClient:
+        class chat:
+            completions = FailingCompletions()
+
+    handler = GPTHandler()
+    handler.client = FakeClient()
+    handler.breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=60)
+    handler.breaker.record_failure()
+
+    result = handler.generate_response("I feel anxious", conversation_type='anxiety')
+
+    assert result['circuit_open'] is True
+    assert result['fallback_mode'] is True
+    assert FailingCompletions.calls == 0
+
+def test_breaker_checked_before_capacity_and_failed_attempts_refunded():
+    """Test that an open breaker reserves no capacity and that failed attempts give their tokens back"""
+    import openai
+    from src.nlp.gpt_handler import GPTHandler
+    from src.nlp.rate_limiter import RateLimiter
+    from src.nlp.resilience import CircuitBreaker, RetryBudget
+
+    class TimingOutCompletions:
+        calls = 0
+
+        def create(self, **kwargs):
+            TimingOutCompletions.calls += 1
+            raise openai.APIConnectionError(request=None)
+
+    class FakeClient:
+        class chat:
+            completions = TimingOutCompletions()
+
+    handler = GPTHandler()
+    handler.client = FakeClient()
+    handler.rate_limiter = RateLimiter({'chat.completions': {'rpm': 100, 'tpm': 100000}})
+    handler.retry_budget = RetryBudget(min_tokens=10)
+    handler.max_backoff = 0.01
+
+    def tpm_in_use():
+        return handler.rate_limiter.get_utilization()['chat.completions']['tpm_utilization']
+
+    handler.breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=60)
+    handler.breaker.record_failure()
+    assert handler.generate_response("I feel anxious", conversation_type='anxiety')['circuit_open'] is True
+    assert handler.rate_limiter.get_utilization()['chat.completions']['granted'] == 0
+
+    handler.breaker = CircuitBreaker('test', failure_threshold=100, recovery_timeout=60)
+    result = handler.generate_response("I feel anxious", conversation_type='anxiety')
+    assert 'error' in result
+    assert TimingOutCompletions.calls == handler.max_retries
+    assert tpm_in_use() < 0.01
+
+    # A half-open trial that is shed for capacity is released for the next caller
+    handler.breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=0)
+    handler.breaker.record_failure()
+    handler.rate_limiter = RateLimiter({'chat.completions': {'rpm': 1, 'tpm': 100000}})
+    handler.rate_limiter.acquire('chat.completions', 0)
+    handler.rate_limit_max_wait = 0
+    assert handler.generate_response("I feel anxious", conversation_type='anxiety')['rate_limited'] is True
+    assert handler.breaker.allow_request()
+
+def test_client_errors_do_not_trip_the_breaker():
+    """Test that rejected requests (4xx) are not counted as provider failures"""
+    import httpx
+    import openai
+    from src.nlp.gpt_handler import GPTHandler
+    from src.nlp.resilience import CircuitBreaker
+
+    class RejectingCompletions:
+        def create(self, **kwargs):
+            request = httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')
+            response = httpx.Response(401, request=request)
+            raise openai.AuthenticationError('Incorrect API key', response=response, body=None)
+
+    class FakeClient:
+        class chat:
+            completions = RejectingCompletions()
+
+    handler = GPTHandler()
+    handler.client = FakeClient()
+    handler.breaker = CircuitBreaker('test', failure_threshold=1, recovery_timeout=0)
+
+    assert 'error' in handler.generate_response("I feel anxious", conversation_type='anxiety')
+    assert handler.breaker.get_metrics()['failures'] == 0
+    assert handler.breaker.allow_request()
+
+def test_stream_failing_midway_ends_as_partial_error():
+    """Test that a stream cut off after some tokens is reported as a partial error, not a complete reply"""
+    from types import SimpleNamespace
+    import openai
+    from src.nlp.gpt_handler import GPTHandler
+    from src.nlp.model_router import ModelRouter, Route
+    from src.nlp.resilience import CircuitBreaker
+    from src.nlp.response_cache import SemanticResponseCache
+
+    def chunk(content):
+        return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+    class BrokenStreamCompletions:
+        def create(self, **kwargs):
+            yield chunk("That sounds really ")
+            yield chunk("hard, and ")
+            raise openai.APIConnectionError(request=None)
+
+    class FakeClient:
+        class chat:
+            completions = BrokenStreamCompletions()
+
+    router = ModelRouter({'light': Route('light', 'fast', 250, 0.7)})
+    handler = GPTHandler()
+    handler.client = FakeClient()
+    handler.router = router
+    handler.breaker = CircuitBreaker('test', failure_threshold=10, recovery_timeout=60)
+    handler.semantic_cache = SemanticResponseCache()
+
+    events = list(handler.stream_response("I feel anxious", [], conversation_type='anxiety'))
+    done = events[-1]
+
+    assert [event['content'] for event in events[:-1]] == ["That sounds really ", "hard, and "]
+    assert done['type'] == 'done'
+    assert done['partial'] is True
+    assert 'error' in done
+    assert done['response'] == "That sounds really hard, and"
+    metrics = router.get_metrics()['light']
+    assert metrics['calls'] == 1
+    assert metrics['failures'] == 1
+    assert handler.breaker.get_metrics()['failures'] == 1
+    assert handler.semantic_cache.get_metrics()['stores'] == 0
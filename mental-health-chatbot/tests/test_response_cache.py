@@ -0,0 +1,93 @@
+"""
+Tests for the semantic response cache
+"""
+
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_similar_message_hits_and_crisis_bypasses():
+    """Test that near-identical messages hit while crisis messages never do"""
+    from src.nlp.gpt_handler import GPTHandler
+    from src.nlp.response_cache import SemanticResponseCache
+
+    class Completions:
+        calls = 0
+
+        def create(self, **kwargs):
+            Completions.calls += 1
+            message = type('Message', (), {'content': "That sounds really hard. What has been on your mind?"})
+            choice = type('Choice', (), {'message': message})
+            return type('Response', (), {'choices': [choice], 'usage': None})
+
+    class FakeClient:
+        class chat:
+            completions = Completions()
+
+    handler = GPTHandler()
+    handler.client = FakeClient()
+    handler.semantic_cache = SemanticResponseCache(similarity_threshold=0.8)
+    history = [{'sender': 'user', 'content': 'I feel anxious'}]
+
+    first = handler.generate_response("I feel anxious", history, conversation_type='anxiety')
+    second = handler.generate_response("i feel anxious!!", history, conversation_type='anxiety')
+    assert 'cache_hit' not in first
+    assert second['cache_hit'] is True
+    assert second['response'] == first['response']
+    assert Completions.calls == 1
+
+    handler.generate_response("I want to end it all", history, conversation_type='anxiety')
+    handler.generate_response("I want to end it all", history, conversation_type='anxiety')
+    assert Completions.calls == 3
+
+    metrics = handler.get_cache_metrics()
+    assert metrics['hits'] == 1
+    assert metrics['hit_rate'] == 0.5
+
+def test_entries_expire():
+    """Test that cached entries are not served after their TTL"""
+    from src.nlp.response_cache import SemanticResponseCache
+
+    cache = SemanticResponseCache(ttl_seconds=0)
+    cache.store('general', "I can't sleep", "Sleep troubles can be exhausting.")
+    assert cache.lookup('general', "I can't sleep") is None
+
+def test_embedder_failure_is_a_miss_and_expired_rows_are_skipped():
+    """Test that a failing embedder never fails the request and an expired best match does not hide a live one"""
+    import time
+    from src.nlp.gpt_handler import GPTHandler
+    from src.nlp.response_cache import SemanticResponseCache, HashingEmbedder
+
+    class FailingEmbedder:
+        def embed(self, text, timeout=None):
+            raise TimeoutError("embeddings timed out")
+
+    class Completions:
+        def create(self, **kwargs):
+            message = type('Message', (), {'content': "That sounds really hard. What has been on your mind?"})
+            choice = type('Choice', (), {'message': message})
+            return type('Response', (), {'choices': [choice], 'usage': None})
+
+    class FakeClient:
+        class chat:
+            completions = Completions()
+
+    handler = GPTHandler()
+    handler.client = FakeClient()
+    handler.semantic_cache = SemanticResponseCache(embedder=FailingEmbedder())
+    response = handler.generate_response("I feel anxious", [], conversation_type='anxiety')
+    assert response['response'].startswith("That sounds really hard")
+    metrics = handler.get_cache_metrics()
+    assert metrics['embedding_errors'] == 2
+    assert metrics['lookups'] == metrics['misses'] == 1
+    assert metrics['hit_rate'] == 0.0
+
+    cache = SemanticResponseCache(embedder=HashingEmbedder(), similarity_threshold=0.99)
+    cache.store('general', "I can't sleep at night", "Expired answer.")
+    cache.store('general', "I can't sleep at all at night", "Live answer.")
+    cache.similarity_threshold = 0.3
+    cache._partitions['general']['expires'][0] = time.time() - 1
+    hit = cache.lookup('general', "I can't sleep at night")
+    assert hit['response'] == "Live answer."
@@ -0,0 +1,38 @@
+"""
+Tests for template replies to low-risk turns
+"""
+
+import sys
+import os
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_template_policy_and_share_without_llm():
+    """Test that clear greetings get templates while ambiguous or risky turns go to the LLM"""
+    from src.nlp.template_responses import TemplateResponder, TEMPLATE_VARIANTS
+
+    responder = TemplateResponder(seed=1)
+    calm = {'sentiment_label': 'neutral', 'risk_level': 'low'}
+    no_crisis = {'is_crisis': False, 'keywords': []}
+
+    greeting = {'primary_intent': 'greeting', 'confidence': 0.49, 'urgency_level': 'low',
+                'all_intents': {'greeting': 0.49, 'general_question': 0.25}}
+    reply = responder.respond('hey, how are you?', greeting, calm, no_crisis)
+    assert reply['response'] in TEMPLATE_VARIANTS['greeting']
+    assert reply['tokens_used'] == 0
+
+    thanks = {'primary_intent': 'farewell', 'confidence': 0.27, 'urgency_level': 'low', 'all_intents': {'farewell': 0.27}}
+    assert responder.respond('thank you so much', thanks, calm, no_crisis)['template'] == 'gratitude'
+    assert responder.respond('thanks, bye', thanks, calm, no_crisis)['template'] == 'farewell'
+
+    # Greeting by a narrow margin, negative sentiment or crisis language all need the LLM
+    mixed = {'primary_intent': 'greeting', 'confidence': 0.26, 'urgency_level': 'low',
+             'all_intents': {'greeting': 0.26, 'depression': 0.2}}
+    assert responder.respond('hi, I feel really depressed', mixed, calm, no_crisis) is None
+    assert responder.respond('hi', greeting, {'sentiment_label': 'negative', 'risk_level': 'low'}, no_crisis) is None
+    assert responder.respond('bye', thanks, calm, {'is_crisis': True, 'keywords': ['suicide']}) is None
+
+    for source in ('template', 'template', 'llm', 'crisis_fast_path'):
+        responder.record(source)
+    assert responder.get_metrics()['share_without_llm'] == 0.75
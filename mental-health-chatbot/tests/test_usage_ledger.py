@@ -0,0 +1,43 @@
+"""
+Tests for the token usage ledger and capacity report
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_ledger_entries_and_rollups():
+    """Test that only LLM replies are ledgered and that rollups and capacity figures add up"""
+    from src.nlp.usage_ledger import usage_entry, estimate_cost, build_usage_report
+
+    assert usage_entry({'response': 'Hello!', 'template': 'greeting', 'tokens_used': 0}) is None
+    assert usage_entry({'response': 'cached', 'model': 'gpt-4', 'cache_hit': True}) is None
+
+    entry = usage_entry({'model': 'gpt-4-0613', 'route': 'clinical', 'tokens_used': 1500,
+                         'prompt_tokens': 1000, 'completion_tokens': 500, 'latency_ms': 2400.0}, 'depression')
+    assert entry['conversation_type'] == 'depression'
+    assert entry['cost_usd'] == 0.06
+    assert estimate_cost('gpt-4o-mini-2024-07-18', 1000, 1000) == 0.00075
+    assert estimate_cost('unknown-model', 1000, 1000) == 0.0
+
+    since = datetime(2026, 10, 19, 9, 0)
+    rows = []
+    for i in range(20):
+        rows.append(dict(entry, created_at=since + timedelta(minutes=10 * i)))
+        rows.append(dict(usage_entry({'model': 'gpt-3.5-turbo', 'route': 'light', 'tokens_used': 200,
+                                      'prompt_tokens': 150, 'completion_tokens': 50, 'latency_ms': 600.0 + i}),
+                         created_at=since + timedelta(minutes=10 * i)))
+
+    report = build_usage_report(rows, since, since + timedelta(hours=4))
+
+    assert report['totals']['calls'] == 40
+    assert report['by_model']['gpt-4-0613']['total_tokens'] == 30000
+    assert report['by_conversation_type']['depression']['calls'] == 20
+    assert [hour['calls'] for hour in report['by_hour']] == [12, 12, 12, 4]
+    assert [band['tokens'] for band in report['latency_by_tokens']] == ['0-249', '1000-1999']
+    assert report['latency_by_tokens'][0]['latency_p95_ms'] == 618.0
+    assert report['capacity']['peak_requests_per_minute'] == 0.2
+    assert report['capacity']['projected_daily_cost_usd'] == round(report['totals']['cost_usd'] * 6, 2)
@@ -0,0 +1,92 @@
+"""
+Tests for materialized user profiles
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+def test_profiles_load_in_bulk_and_follow_committed_writes():
+    """Test grouped bulk loading and incremental updates from inserts, edits and completions"""
+    from sqlalchemy import event
+    from src.web.app import create_app
+    from src.db.models import User, MoodEntry, Assessment, Recommendation, db
+    from src.db import user_profile_service as profiles
+
+    app = create_app('testing')
+    with app.app_context():
+        db.create_all()
+        users = [User(username=f"user{n}", email=f"user{n}@example.com", password_hash='x') for n in range(3)]
+        db.session.add_all(users)
+        db.session.commit()
+        first, second, third = (user.id for user in users)
+
+        old = datetime.utcnow() - timedelta(days=30)
+        db.session.add_all([
+            MoodEntry(user_id=first, mood_score=4, energy_level=5, stress_level=8, sleep_hours=6.0),
+            MoodEntry(user_id=first, mood_score=6, energy_level=7, stress_level=6),
+            MoodEntry(user_id=first, mood_score=1, energy_level=1, stress_level=1, created_at=old),
+            MoodEntry(user_id=second, mood_score=8, energy_level=8, stress_level=2, sleep_hours=8.0),
+            Assessment(user_id=second, assessment_type='PHQ-9', responses='{}', total_score=16,
+                       severity_level='moderately severe'),
+            Recommendation(user_id=second, recommendation_type='exercise', title='Walk', description='Walk',
+                           is_completed=True)
+        ])
+        db.session.commit()
+
+        service = profiles.user_profile_service = profiles.UserProfileService()
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+        loaded = service.load_many([first, second, third])
+        assert len(statements) == 3
+
+        assert loaded[first]['mood_entries'] == 2
+        assert loaded[first]['mood_score'] == 5.0
+        assert loaded[first]['stress_level'] == 7.0
+        assert loaded[first]['sleep_hours'] == 6.0
+        assert loaded[first]['mental_health_status'] == 'stress'
+        assert loaded[second]['mental_health_status'] == 'depression'
+        assert loaded[second]['activities_completed'] == ['exercise']
+        assert loaded[third]['mood_score'] is None
+        assert loaded[third]['mental_health_status'] == 'healthy'
+
+        # Inserts are folded into cached profiles without touching the database
+        db.session.add(MoodEntry(user_id=first, mood_score=2, energy_level=4, stress_level=10))
+        db.session.add(Assessment(user_id=first, assessment_type='GAD-7', responses='{}', total_score=12,
+                                  severity_level='moderate'))
+        db.session.commit()
+        statements.clear()
+        updated = service.get(first)
+        assert statements == []
+        assert updated['mood_entries'] == 3
+        assert updated['mood_score'] == 4.0
+        assert updated['mental_health_status'] == 'anxiety'
+
+        recommendation = Recommendation(user_id=first, recommendation_type='meditation', title='Breathe',
+                                        description='Breathe', catalog_key='quick_stress_relief')
+        db.session.add(recommendation)
+        db.session.commit()
+        recommendation.mark_completed()
+        db.session.commit()
+        assert service.get(first)['completed_types'] == {'meditation': 1}
+        assert service.get(first)['completed_items'] == {'quick_stress_relief': 1}
+
+        # Edits drop the profile, so the next read reloads it
+        entry = MoodEntry.query.filter_by(user_id=second).first()
+        entry.mood_score = 2
+        db.session.commit()
+        assert service.get(second)['mood_score'] == 2.0
+
+        # Rolled back writes never reach the profile
+        db.session.add(MoodEntry(user_id=third, mood_score=9, energy_level=9, stress_level=1))
+        db.session.flush()
+        db.session.rollback()
+        assert service.get(third)['mood_entries'] == 0
+
+        metrics = service.get_metrics()
+        assert metrics['incremental_updates'] == 3
+        assert metrics['invalidations'] == 1
+        assert metrics['backend'] == 'memory'